@@ -1,5 +1,5 @@
 """Remaining API stubs for modeling, agents builder, and governance endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pydantic import BaseModel
@@ -12,6 +12,8 @@ from app.db.models import (
     ModelRegistryEntry, AgentWorkflow, WorkflowRun, AuditEvent, 
     AutonomyLevel, AgentStatus, EntityType, RelationshipType
 )
+from app.services.connectors.uploads import UPLOAD_OPENAPI, stage_upload
+from app.services.jobs.queue import jobs
 from app.services.llm.client import LLMClient
 
 log = structlog.get_logger()
@@ -38,7 +40,7 @@ async def list_models(db: AsyncSession = Depends(get_db)):
 
 
 @modeling_router.post("/train")
-async def train_model(body: ModelTrainRequest, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+async def train_model(body: ModelTrainRequest, db: AsyncSession = Depends(get_db)):
     entry = ModelRegistryEntry(
         id=str(uuid.uuid4()), tenant_id="default",
         name=body.name, task_type=body.task_type,
@@ -47,12 +49,19 @@ async def train_model(body: ModelTrainRequest, background_tasks: BackgroundTasks
     )
     db.add(entry)
     await db.commit()
-    background_tasks.add_task(run_automl, entry.id, body)
-    return {"model_id": entry.id, "status": "training", "message": "AutoML job queued"}
+    job_id = await jobs.enqueue("modeling.automl", args=[entry.id, body.model_dump()])
+    return {
+        "model_id": entry.id, "job_id": job_id, "status": "training",
+        "message": "AutoML job queued",
+    }
 
 
-async def run_automl(model_id: str, body: ModelTrainRequest, session_id: Optional[str] = None):
+async def run_automl(
+    model_id: str, body: ModelTrainRequest | dict, session_id: Optional[str] = None,
+):
     """Refined AutoML using ModelingAgent to generate high-granularity results."""
+    if isinstance(body, dict):  # as queued by train_model
+        body = ModelTrainRequest(**body)
     from app.services.agents.modeling_agent import ModelingAgent
     from app.db.models import SessionArtifact
     
@@ -183,14 +192,15 @@ async def activate_workflow(workflow_id: str, db: AsyncSession = Depends(get_db)
 
 
 @agents_router.post("/{workflow_id}/run")
-async def run_workflow(workflow_id: str, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+async def run_workflow(workflow_id: str, db: AsyncSession = Depends(get_db)):
     w = await db.get(AgentWorkflow, workflow_id)
     if not w:
         raise HTTPException(404, "Workflow not found")
     run = WorkflowRun(id=str(uuid.uuid4()), workflow_id=workflow_id, trigger_type="manual")
     db.add(run)
     await db.commit()
-    return {"run_id": run.id, "status": "running"}
+    job_id = await jobs.enqueue("workflow.run", args=[workflow_id, run.id])
+    return {"run_id": run.id, "job_id": job_id, "status": "queued"}
 
 
 @agents_router.get("/{workflow_id}/runs")
@@ -257,7 +267,7 @@ async def run_eda(payload: dict):
     """Run EDA directly on provided data or a snapshot."""
     question = payload.get("question", "Describe this data")
     domain = payload.get("domain", "generic")
-    llm = LLMClient()
+    llm = LLMClient(agent_id="analytics_eda")
     result = await llm.json_chat(
         messages=[{"role": "user", "content": f"Domain: {domain}. Q: {question}. Run a comprehensive EDA."}],
         system_prompt="You are an EDA specialist. Return JSON with: eda_summary, key_findings, anomalies_detected, recommended_analyses, chart_specs.",
@@ -284,77 +294,64 @@ uploads_router = APIRouter()
 class UploadResponse(BaseModel):
     connector_id: str
     table_name: str
-    row_count: int
-    profile: dict
-    semantic_pack: dict
-
-
-@uploads_router.post("/csv", response_model=UploadResponse)
+    run_id: str
+    job_id: str
+    status: str
+    status_url: str
+    sha256: str
+    size_bytes: int
+    deduplicated: bool
+
+
+@uploads_router.post(
+    "/csv", response_model=UploadResponse, status_code=status.HTTP_202_ACCEPTED,
+    openapi_extra=UPLOAD_OPENAPI,
+)
 async def upload_csv(
-    file: UploadFile = File(...),
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ):
-    """Handle CSV file upload via form-data, save to staging, and profile."""
-    import pandas as pd
-    import os
-    import shutil
+    """
+    Stream a CSV upload to staging and profile it in the background; poll status_url
+    for the result.
+    """
     from app.db.models import DataConnector, ConnectorType, ConnectorStatus, SyncRun
-    from app.services.connectors.csv_connector import CSVConnector
-    from datetime import datetime
 
-    # 1. Create staging directory if not exists
-    staging_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../staging"))
-    os.makedirs(staging_path, exist_ok=True)
-    
-    # 2. Save file to staging
-    file_id = str(uuid.uuid4())
-    filename = f"{file_id}_{file.filename}"
-    full_path = os.path.join(staging_path, filename)
-    
-    with open(full_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # 3. Create connector record
+    # 1. Bytes go straight to a content-addressed file; identical uploads share one copy
+    staged = await stage_upload(request)
+
+    # 2. Create connector record
     connector = DataConnector(
         id=str(uuid.uuid4()), tenant_id="default",
-        name=file.filename or "CSV Upload", 
+        name=staged.filename or "CSV Upload",
         connector_type=ConnectorType.csv,
-        status=ConnectorStatus.connected, 
-        config={"file_path": full_path, "table_name": file.filename.split('.')[0] if file.filename else "uploaded_data"},
+        status=ConnectorStatus.syncing,
+        config={
+            "file_path": staged.path,
+            "table_name": staged.filename.split('.')[0] if staged.filename else "uploaded_data",
+            "sha256": staged.sha256,
+        },
     )
+    run = SyncRun(id=str(uuid.uuid4()), connector_id=connector.id)
     db.add(connector)
-    await db.commit()
-    await db.refresh(connector)
-
-    # 4. Profile the data immediately
-    csv_service = CSVConnector()
-    # We use sync logic to profile
-    sync_result = await csv_service.sync(connector.config, None, False, str(uuid.uuid4()))
-    
-    # Update connector with sync info
-    connector.last_sync_at = datetime.utcnow()
-    connector.schema_manifest = sync_result.get("semantic_pack")
-    
-    # Create sync run record
-    run = SyncRun(
-        id=str(uuid.uuid4()),
-        connector_id=connector.id,
-        status="succeeded",
-        rows_read=sync_result.get("rows_read", 0),
-        rows_written=sync_result.get("rows_written", 0),
-        profile_report=sync_result.get("profile_report"),
-        semantic_pack=sync_result.get("semantic_pack"),
-        finished_at=datetime.utcnow()
-    )
     db.add(run)
     await db.commit()
 
+    # 3. Profiling and snapshotting run as a regular sync job
+    job_id = await jobs.enqueue("connector.sync", args=[connector.id, run.id, False])
+
     return {
         "connector_id": connector.id,
         "table_name": connector.config["table_name"],
-        "row_count": sync_result.get("rows_read", 0),
-        "profile": sync_result.get("profile_report", {}),
-        "semantic_pack": sync_result.get("semantic_pack", {})
+        "run_id": run.id,
+        "job_id": job_id,
+        "status": run.status,
+        "status_url": request.app.url_path_for(
+            "get_sync_run", connector_id=connector.id, run_id=run.id,
+        ),
+        "sha256": staged.sha256,
+        "size_bytes": staged.size_bytes,
+        "deduplicated": staged.deduplicated,
     }
 
 
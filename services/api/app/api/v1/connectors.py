@@ -1,22 +1,37 @@
 """
 Connector Catalog API — CRUD for data connectors + sync management.
 """
+import asyncio
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, field_validator
+from datetime import datetime, timezone
 from typing import Optional
 import structlog
 
+from app.core.config import settings
 from app.db.session import get_db
 from app.db.models import DataConnector, SyncRun, ConnectorType, ConnectorStatus
 from app.services.connectors.registry import ConnectorRegistry
+from app.services.connectors.sample_cache import frame_to_sample, sample_cache
+from app.services.connectors.watermarks import clear_watermarks, load_watermarks, save_watermarks
+from app.services.jobs.queue import jobs
+from app.services.profiling.incremental import merge_reports
+from app.services.retrieval.service import drop_indexes, index_snapshots
+from app.services.snapshots.store import (
+    SnapshotReader, delete_snapshot_files, discard_run, latest_snapshots, prune_snapshots,
+    record_snapshots,
+)
 
 log = structlog.get_logger()
 router = APIRouter()
 
+# execute_sync marks runs "completed"; CSV uploads from before they synced in the
+# background were recorded as "succeeded"
+SUCCESSFUL_RUN_STATUSES = ("completed", "succeeded")
+
 
 class ConnectorCreate(BaseModel):
     name: str
@@ -48,10 +63,17 @@ class SyncRunResponse(BaseModel):
     finished_at: Optional[datetime]
     profile_report: Optional[dict]
     semantic_pack: Optional[dict]
+    job_id: Optional[str] = None  # set when the run was just queued
 
     class Config:
         from_attributes = True
 
+    @field_validator("profile_report")
+    @classmethod
+    def _drop_sketches(cls, v: Optional[dict]) -> Optional[dict]:
+        # Sketches are for merging profiles server-side, not for clients
+        return {k: val for k, val in v.items() if k != "sketches"} if v else v
+
 
 class TestConnectionResult(BaseModel):
     success: bool
@@ -95,20 +117,51 @@ async def list_connectors(db: AsyncSession = Depends(get_db)):
 @router.get("/{connector_id}/sample")
 async def get_connector_sample(
     connector_id: str,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=settings.SAMPLE_MAX_ROWS),
+    table: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
 ):
-    """Retrieve a sample of data from a connector for the Data Explorer."""
+    """
+    Retrieve a sample of data from a connector for the Data Explorer.
+
+    Served from the snapshot of the latest successful sync (cached until the next
+    one); connectors that have never synced get a LIMIT-style read from the source.
+    """
     connector = await _get_or_404(db, connector_id)
+    run_id = await db.scalar(
+        select(SyncRun.id)
+        .where(SyncRun.connector_id == connector_id, SyncRun.status.in_(SUCCESSFUL_RUN_STATUSES))
+        .order_by(SyncRun.finished_at.desc().nulls_last())
+        .limit(1)
+    )
+    cached = sample_cache.get(connector_id, run_id, limit, table)
+    if cached is not None:
+        return cached
+
     try:
-        impl = ConnectorRegistry.get(connector.connector_type)
-        # Use sync logic but just for sampling
-        result = await impl.sync(connector.config, connector.secret_ref, False, str(uuid.uuid4()))
-        data = result.get("sample_data", [])[:limit]
-        return {"data": data, "columns": list(data[0].keys()) if data else []}
+        snapshots = await latest_snapshots([connector_id]) if run_id else []
+        snapshots = sorted(snapshots, key=lambda s: s.table_name)
+        if table:
+            snap = next((s for s in snapshots if s.table_name == table), None)
+        else:
+            snap = snapshots[0] if snapshots else None
+        if snap is not None:
+            df = await asyncio.to_thread(SnapshotReader(snap.storage_path).head, limit)
+            sample = {**frame_to_sample(df), "table": snap.table_name, "source": "snapshot"}
+            sample["complete"] = len(df) >= snap.row_count
+        else:
+            impl = ConnectorRegistry.get(connector.connector_type)
+            df = await impl.sample(connector.config, connector.secret_ref, limit)
+            sample = {
+                **frame_to_sample(df), "table": table, "source": "connector",
+                "complete": len(df) < limit,
+            }
     except Exception as e:
         raise HTTPException(500, f"Failed to fetch sample: {str(e)}")
 
+    sample_cache.set(connector_id, run_id, sample, table)
+    return sample
+
 
 @router.get("/{connector_id}", response_model=ConnectorResponse)
 async def get_connector(connector_id: str, db: AsyncSession = Depends(get_db)):
@@ -134,7 +187,6 @@ async def test_connection(connector_id: str, db: AsyncSession = Depends(get_db))
 @router.post("/{connector_id}/sync", response_model=SyncRunResponse)
 async def trigger_sync(
     connector_id: str,
-    background_tasks: BackgroundTasks,
     incremental: bool = True,
     db: AsyncSession = Depends(get_db),
 ):
@@ -145,42 +197,108 @@ async def trigger_sync(
     await db.commit()
     await db.refresh(run)
 
-    background_tasks.add_task(
-        execute_sync, connector_id, run.id, incremental
-    )
-    return run
+    job_id = await jobs.enqueue("connector.sync", args=[connector_id, run.id, incremental])
+    response = SyncRunResponse.model_validate(run)
+    response.job_id = job_id
+    return response
 
 
 async def execute_sync(connector_id: str, run_id: str, incremental: bool):
-    """Background sync execution."""
+    """Sync execution, run as a "connector.sync" job."""
     from app.db.session import AsyncSessionLocal
     async with AsyncSessionLocal() as db:
         connector = await db.get(DataConnector, connector_id)
         run = await db.get(SyncRun, run_id)
+        snapshots, pruned = [], []
         try:
             impl = ConnectorRegistry.get(connector.connector_type)
+            watermarks = await load_watermarks(db, connector_id) if incremental else {}
             result = await impl.sync(
                 config=connector.config,
                 secret_ref=connector.secret_ref,
                 incremental=incremental,
                 run_id=run_id,
+                watermarks=watermarks,
             )
+            profile = result.get("profile_report")
+            if result.get("incremental") and profile:
+                # The connector profiled only the delta; fold it into the last full profile
+                profile = _merge_incremental(await _last_profile(db, connector_id, run_id), profile)
             run.rows_read = result.get("rows_read", 0)
             run.rows_written = result.get("rows_written", 0)
             run.status = "completed"
-            run.profile_report = result.get("profile_report")
+            run.profile_report = profile
             run.semantic_pack = result.get("semantic_pack")
+            if run.semantic_pack:
+                # NLQ grounding (SemanticMapper) reads the latest pack off the connector
+                connector.schema_manifest = run.semantic_pack
+            snapshots = await record_snapshots(
+                db, connector_id, result.get("snapshots", []), connector.tenant_id,
+            )
+            await save_watermarks(db, connector_id, run_id, result.get("watermarks", {}))
+            pruned = await prune_snapshots(db, connector_id)
             connector.status = ConnectorStatus.connected
-            from datetime import datetime, timezone
             connector.last_sync_at = datetime.now(timezone.utc)
             run.finished_at = datetime.now(timezone.utc)
+        except asyncio.CancelledError:
+            # Job cancelled: record it, then let the cancellation propagate. Nothing the
+            # run recorded is kept, since its snapshot files are discarded below.
+            await db.rollback()
+            connector = await db.get(DataConnector, connector_id)
+            run = await db.get(SyncRun, run_id)
+            run.status = "cancelled"
+            run.finished_at = datetime.now(timezone.utc)
+            connector.status = (
+                ConnectorStatus.connected if connector.last_sync_at else ConnectorStatus.pending
+            )
+            await db.commit()
+            await asyncio.to_thread(discard_run, run_id)
+            raise
         except Exception as e:
+            await db.rollback()
+            connector = await db.get(DataConnector, connector_id)
+            run = await db.get(SyncRun, run_id)
             run.status = "failed"
             run.error_log = str(e)
             connector.status = ConnectorStatus.error
             connector.last_error = str(e)
             log.error("sync.failed", connector_id=connector_id, error=str(e))
         await db.commit()
+        if run.status == "completed":
+            sample_cache.invalidate(connector_id)
+            if pruned:
+                await asyncio.to_thread(delete_snapshot_files, [s.storage_path for s in pruned])
+                await asyncio.to_thread(drop_indexes, [s.id for s in pruned])
+            await index_snapshots(snapshots)
+        else:
+            await asyncio.to_thread(discard_run, run_id)
+
+
+def _merge_incremental(last: Optional[dict], profile: dict) -> dict:
+    if "columns" in profile:
+        return merge_reports(last, profile)
+    if "tables" in profile:
+        # Multi-table reports flag which tables were read as a delta
+        previous = (last or {}).get("tables") or {}
+        tables = {
+            name: merge_reports(previous.get(name), report) if report.get("incremental") else report
+            for name, report in profile["tables"].items()
+        }
+        return {**profile, "tables": tables}
+    return profile
+
+
+async def _last_profile(db: AsyncSession, connector_id: str, exclude_run_id: str) -> Optional[dict]:
+    return await db.scalar(
+        select(SyncRun.profile_report)
+        .where(
+            SyncRun.connector_id == connector_id,
+            SyncRun.status.in_(SUCCESSFUL_RUN_STATUSES),
+            SyncRun.id != exclude_run_id,
+        )
+        .order_by(SyncRun.finished_at.desc().nulls_last())
+        .limit(1)
+    )
 
 
 @router.get("/{connector_id}/runs", response_model=list[SyncRunResponse])
@@ -192,13 +310,21 @@ async def get_sync_runs(connector_id: str, db: AsyncSession = Depends(get_db)):
     return result.scalars().all()
 
 
+@router.get("/{connector_id}/runs/{run_id}", response_model=SyncRunResponse)
+async def get_sync_run(connector_id: str, run_id: str, db: AsyncSession = Depends(get_db)):
+    run = await db.get(SyncRun, run_id)
+    if not run or run.connector_id != connector_id:
+        raise HTTPException(status_code=404, detail="Sync run not found")
+    return run
 
 
 @router.delete("/{connector_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_connector(connector_id: str, db: AsyncSession = Depends(get_db)):
     connector = await _get_or_404(db, connector_id)
+    await clear_watermarks(db, connector_id)
     await db.delete(connector)
     await db.commit()
+    sample_cache.invalidate(connector_id)
 
 
 async def _get_or_404(db: AsyncSession, connector_id: str) -> DataConnector:
@@ -0,0 +1,67 @@
+"""
+Jobs API — status, progress and cancellation of background jobs.
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+from app.db.session import get_db
+from app.db.models import Job
+from app.services.jobs.queue import jobs
+
+router = APIRouter()
+
+
+class JobResponse(BaseModel):
+    id: str
+    name: str
+    queue: str
+    status: str
+    attempts: int
+    max_attempts: int
+    cancel_requested: bool
+    progress: Optional[dict]
+    result: Optional[dict]
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+@router.get("/", response_model=list[JobResponse])
+async def list_jobs(
+    status: Optional[str] = None,
+    name: Optional[str] = None,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_db),
+):
+    q = select(Job)
+    if status:
+        q = q.where(Job.status == status)
+    if name:
+        q = q.where(Job.name == name)
+    result = await db.execute(q.order_by(Job.created_at.desc()).limit(max(1, min(limit, 200))))
+    return result.scalars().all()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    job = await db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(job_id: str, db: AsyncSession = Depends(get_db)):
+    """Cancel a job: queued jobs never start, running ones stop at their next await."""
+    job = await jobs.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return await db.get(Job, job_id)
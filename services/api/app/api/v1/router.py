@@ -3,6 +3,7 @@ from fastapi import APIRouter
 from app.api.v1.sessions import router as sessions_router
 from app.api.v1.connectors import router as connectors_router
 from app.api.v1.semantic import router as semantic_router
+from app.api.v1.jobs import router as jobs_router
 from app.api.v1.api_routes import (
     modeling_router, agents_router, governance_router, analytics_router,
     uploads_router, auth_router,
@@ -19,3 +20,4 @@ api_router.include_router(agents_router, prefix="/agents", tags=["agents"])
 api_router.include_router(governance_router, prefix="/governance", tags=["governance"])
 api_router.include_router(analytics_router, prefix="/analytics", tags=["analytics"])
 api_router.include_router(uploads_router, prefix="/uploads", tags=["uploads"])
+api_router.include_router(jobs_router, prefix="/jobs", tags=["jobs"])
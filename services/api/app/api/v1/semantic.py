@@ -2,8 +2,9 @@
 Semantic Layer API — Entity types, relationship types, metric definitions,
 AI-assisted mapping suggestions, and synonym management.
 """
+import time
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pydantic import BaseModel
@@ -15,6 +16,8 @@ from app.db.session import get_db
 from app.db.models import EntityType, RelationshipType, MetricDefinition, MetricStatus
 from app.services.semantic.mapper import SemanticMapper
 from app.services.semantic.metric_compiler import MetricCompiler
+from app.services.retrieval.service import retrieve
+from app.services.jobs.queue import jobs
 
 log = structlog.get_logger()
 router = APIRouter()
@@ -221,7 +224,6 @@ class MappingSuggestRequest(BaseModel):
 @router.post("/mapping/suggest")
 async def suggest_mappings(
     body: MappingSuggestRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -229,9 +231,11 @@ async def suggest_mappings(
     Runs join inference, entity mapping, and synonym discovery.
     Returns candidates in the suggestion queue.
     """
+    # The mapper tags its suggestions with the id of the job that produced them
     suggestion_job_id = str(uuid.uuid4())
-    background_tasks.add_task(
-        run_mapping_inference, body.connector_id, body.table_name, suggestion_job_id
+    await jobs.enqueue(
+        "semantic.mapping", args=[body.connector_id, body.table_name, suggestion_job_id],
+        job_id=suggestion_job_id,
     )
     return {"job_id": suggestion_job_id, "status": "queued", "message": "Mapping inference started. Check /mapping/suggestions for results."}
 
@@ -278,6 +282,28 @@ async def ground_nlq(body: NLQGroundRequest, db: AsyncSession = Depends(get_db))
     return result
 
 
+# ---------------------------------------------------------------------------
+# Document Search
+# ---------------------------------------------------------------------------
+
+class SearchRequest(BaseModel):
+    query: str
+    k: int = 10
+    connector_ids: Optional[list[str]] = None  # default: every connector's latest chunk snapshot
+    snapshot_ids: Optional[list[str]] = None
+
+
+@router.post("/search")
+async def search_documents(body: SearchRequest):
+    """Top-k document chunks for a free-text query, by cosine similarity over the local index."""
+    started = time.perf_counter()
+    results = await retrieve(
+        body.query, body.connector_ids, body.snapshot_ids, k=max(1, min(body.k, 100)),
+    )
+    took_ms = round((time.perf_counter() - started) * 1000, 2)
+    return {"query": body.query, "results": results, "took_ms": took_ms}
+
+
 # ---------------------------------------------------------------------------
 # Domain Templates
 # ---------------------------------------------------------------------------
@@ -302,11 +328,14 @@ class DiscoverRequest(BaseModel):
     industry: str = "revops"
 
 @router.post("/discover")
-async def discover_ontology(body: DiscoverRequest, background_tasks: BackgroundTasks):
+async def discover_ontology(body: DiscoverRequest):
+    job_id = await jobs.enqueue("semantic.discover", args=[body.connector_id, body.industry])
+    return {"status": "discover_queued", "connector_id": body.connector_id, "job_id": job_id}
+
+
+async def run_ontology_discovery(connector_id: str, industry: str):
     from app.services.agents.semantic_agent import SemanticAgent
-    agent = SemanticAgent()
-    background_tasks.add_task(agent.discover_ontology, body.connector_id, body.industry)
-    return {"status": "discover_queued", "connector_id": body.connector_id}
+    return await SemanticAgent().discover_ontology(connector_id, industry)
 
 @router.post("/entities/{entity_id}/certify")
 async def certify_entity(entity_id: str, db: AsyncSession = Depends(get_db)):
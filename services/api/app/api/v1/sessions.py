@@ -2,22 +2,27 @@
 Sessions API — Create and manage VDS analysis sessions.
 Supports streaming for live agent step updates.
 """
-import uuid
 import asyncio
+import uuid
 from typing import AsyncGenerator
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Header
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete, or_, and_
 from pydantic import BaseModel
 from datetime import datetime
 from typing import Optional
 import json
 import structlog
 
-from app.db.session import get_db
-from app.db.models import VDSSession, SessionMessage, SessionArtifact, AutonomyLevel, SessionStatus
+from app.db.session import get_db, AsyncSessionLocal
+from app.db.models import (
+    VDSSession, SessionMessage, SessionArtifact, SessionCheckpoint, AutonomyLevel, SessionStatus,
+    Job,
+)
 from app.services.orchestration.supervisor import SupervisorAgent
+from app.services.orchestration.event_bus import event_bus, session_channel, approval_channel
+from app.services.jobs.queue import jobs, FINAL_STATUSES
 from app.core.config import settings
 
 log = structlog.get_logger()
@@ -86,10 +91,10 @@ class ApprovalAction(BaseModel):
 @router.post("/", response_model=SessionResponse, status_code=status.HTTP_201_CREATED)
 async def create_session(
     body: SessionCreate,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ):
     """Create a new VDS session and begin the agentic pipeline."""
+    job_id = str(uuid.uuid4())
     session = VDSSession(
         id=str(uuid.uuid4()),
         tenant_id="default",  # TODO: extract from JWT
@@ -98,11 +103,11 @@ async def create_session(
         autonomy_level=body.autonomy_level,
         status=SessionStatus.created,
         goal=body.question,
-        context={"connector_ids": body.connector_ids, **body.context},
+        # The supervisor runs as a background job; its id lets clients cancel the run.
+        # Recorded before dispatch so a fast worker never sees the session without it.
+        context={"connector_ids": body.connector_ids, **body.context, "job_id": job_id},
     )
     db.add(session)
-    await db.commit()
-    await db.refresh(session)
 
     # Add user message
     user_msg = SessionMessage(
@@ -113,30 +118,35 @@ async def create_session(
     )
     db.add(user_msg)
     await db.commit()
+    await db.refresh(session)
 
-    # Kick off supervisor in background
-    background_tasks.add_task(
-        run_supervisor_pipeline, session.id, body.question, body.domain,
-        body.autonomy_level, body.connector_ids
-    )
+    await jobs.enqueue("session.pipeline", args=[
+        session.id, body.question, body.domain, body.autonomy_level.value, body.connector_ids,
+    ], job_id=job_id)
 
-    log.info("session.created", session_id=session.id, domain=body.domain)
+    log.info("session.created", session_id=session.id, domain=body.domain, job_id=job_id)
     return session
 
 
 async def run_supervisor_pipeline(
     session_id: str, question: str, domain: str,
-    autonomy: AutonomyLevel, connector_ids: list[str]
+    autonomy: AutonomyLevel | str, connector_ids: list[str]
 ):
-    """Background task running the full multi-agent pipeline."""
+    """The full multi-agent pipeline, run as a "session.pipeline" job."""
     supervisor = SupervisorAgent(
         session_id=session_id,
         question=question,
         domain=domain,
-        autonomy_level=autonomy,
+        autonomy_level=AutonomyLevel(autonomy),
         connector_ids=connector_ids,
     )
-    await supervisor.run()
+    try:
+        await supervisor.run()
+    except asyncio.CancelledError:
+        # Job cancelled: end the session so its viewers stop waiting, then let the
+        # cancellation propagate
+        await supervisor.mark_cancelled()
+        raise
 
 
 @router.get("/{session_id}", response_model=SessionResponse)
@@ -166,39 +176,105 @@ async def get_artifacts(session_id: str, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/{session_id}/stream")
-async def stream_session(session_id: str, db: AsyncSession = Depends(get_db)):
-    """SSE endpoint — streams agent step updates to the UI Plan pane."""
+async def stream_session(
+    session_id: str,
+    last_event_id: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    SSE endpoint — streams agent step updates to the UI Plan pane.
+    Replays persisted messages after the `Last-Event-ID` cursor once, then
+    follows live events from the session event bus without touching the DB.
+    Agents' responses are streamed as `event: partial` while they are generated,
+    each a delta against the agent's previous partial: {"append": text},
+    {"append": {key: text}, "set": {key: value}} for JSON responses, or
+    {"replace": value}. Partials carry no id, so they never move the resume
+    cursor; the finished response arrives as the agent's message.
+    """
     await _get_or_404(db, session_id)
 
     async def event_generator() -> AsyncGenerator[str, None]:
-        last_seen = 0
-        while True:
-            result = await db.execute(
-                select(SessionMessage)
-                .where(SessionMessage.session_id == session_id)
-                .order_by(SessionMessage.created_at)
-                .offset(last_seen)
-            )
-            msgs = result.scalars().all()
-            for msg in msgs:
-                data = {
-                    "role": msg.role,
-                    "agent": msg.agent,
-                    "content": msg.content[:500],
-                }
-                yield f"data: {json.dumps(data)}\n\n"
-                last_seen += 1
-
-            # Check if session is done
-            session = await db.get(VDSSession, session_id)
-            if session and session.status in (SessionStatus.done, SessionStatus.failed):
-                yield f"data: {json.dumps({'event': 'done', 'status': session.status})}\n\n"
-                break
-            await asyncio.sleep(1.5)
+        async with event_bus.subscribe(session_channel(session_id)) as sub:
+            # Subscribe before the catch-up read so nothing published in between is lost.
+            cursor = last_event_id
+            async with AsyncSessionLocal() as catchup_db:
+                backlog = await _messages_after(catchup_db, session_id, cursor)
+                current = await catchup_db.get(VDSSession, session_id)
+            replayed = {m.id for m in backlog}
+            for msg in backlog:
+                yield _sse_message(msg.id, msg.role, msg.agent, msg.content)
+                cursor = msg.id
+
+            if current and current.status in (SessionStatus.done, SessionStatus.failed):
+                yield _sse_done(current.status.value)
+                return
+
+            while True:
+                event = await sub.get(timeout=settings.SSE_KEEPALIVE_S)
+                if sub.overflowed:
+                    # Slow consumer: resync from the DB using the keyset cursor
+                    sub.overflowed = False
+                    async with AsyncSessionLocal() as resync_db:
+                        for msg in await _messages_after(resync_db, session_id, cursor):
+                            replayed.add(msg.id)
+                            yield _sse_message(msg.id, msg.role, msg.agent, msg.content)
+                            cursor = msg.id
+                        current = await resync_db.get(VDSSession, session_id)
+                    # The final status event may have been among the dropped ones
+                    if current and current.status in (SessionStatus.done, SessionStatus.failed):
+                        yield _sse_done(current.status.value)
+                        return
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                if event["type"] == "message":
+                    if event["id"] in replayed:
+                        continue
+                    yield _sse_message(event["id"], event["role"], event["agent"], event["content"])
+                    cursor = event["id"]
+                elif event["type"] == "partial":
+                    yield _sse_partial(event["agent"], event["delta"])
+                elif event["type"] == "status" and event["status"] in (
+                    SessionStatus.done.value, SessionStatus.failed.value
+                ):
+                    yield _sse_done(event["status"])
+                    return
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 
+async def _messages_after(
+    db: AsyncSession, session_id: str, cursor: Optional[str],
+) -> list[SessionMessage]:
+    """
+    Keyset page of messages strictly after the message `cursor`, ordered by
+    (created_at, id).
+    """
+    q = select(SessionMessage).where(SessionMessage.session_id == session_id)
+    if cursor:
+        anchor = await db.get(SessionMessage, cursor)
+        if anchor and anchor.session_id == session_id:
+            q = q.where(or_(
+                SessionMessage.created_at > anchor.created_at,
+                and_(SessionMessage.created_at == anchor.created_at, SessionMessage.id > anchor.id),
+            ))
+    result = await db.execute(q.order_by(SessionMessage.created_at, SessionMessage.id))
+    return list(result.scalars().all())
+
+
+def _sse_message(msg_id: str, role: str, agent: Optional[str], content: str) -> str:
+    data = {"role": role, "agent": agent, "content": content[:500]}
+    return f"id: {msg_id}\ndata: {json.dumps(data)}\n\n"
+
+
+def _sse_partial(agent: str, delta: dict) -> str:
+    return f"event: partial\ndata: {json.dumps({'agent': agent, 'delta': delta}, default=str)}\n\n"
+
+
+def _sse_done(status_value: str) -> str:
+    return f"data: {json.dumps({'event': 'done', 'status': status_value})}\n\n"
+
+
 @router.post("/{session_id}/approve")
 async def approve_checkpoint(
     session_id: str,
@@ -210,15 +286,46 @@ async def approve_checkpoint(
     if session.status != SessionStatus.checkpoint:
         raise HTTPException(400, "Session is not awaiting approval.")
 
-    session.context["approval"] = {"approved": body.approved, "note": body.note}
+    approval = {"approved": body.approved, "note": body.note}
+    session.context = {**session.context, "approval": approval}
     session.status = SessionStatus.executing if body.approved else SessionStatus.failed
     await db.commit()
+    await event_bus.publish(
+        session_channel(session_id), {"type": "status", "status": session.status.value},
+    )
+    # Wake the supervisor parked in _wait_for_approval (any worker, via the event bus)
+    await event_bus.publish(
+        approval_channel(session_id), {"type": "approval", "approved": body.approved},
+    )
     return {"approved": body.approved, "session_id": session_id}
 
 
+@router.post("/{session_id}/resume", response_model=SessionResponse)
+async def resume_session(session_id: str, db: AsyncSession = Depends(get_db)):
+    """Continue an interrupted or failed session; checkpointed steps are not re-run."""
+    session = await _get_or_404(db, session_id)
+    if session.status == SessionStatus.done:
+        raise HTTPException(400, "Session is already complete.")
+    job_id = session.context.get("job_id")
+    job = await db.get(Job, job_id) if job_id else None
+    if job and job.status not in FINAL_STATUSES:
+        raise HTTPException(409, "Session pipeline is still running.")
+
+    job_id = str(uuid.uuid4())
+    session.context = {**session.context, "job_id": job_id}
+    await db.commit()
+    await jobs.enqueue("session.pipeline", args=[
+        session.id, session.goal, session.domain, session.autonomy_level.value,
+        session.context.get("connector_ids", []),
+    ], job_id=job_id)
+    log.info("session.resumed", session_id=session.id, job_id=job_id)
+    return session
+
+
 @router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_session(session_id: str, db: AsyncSession = Depends(get_db)):
     session = await _get_or_404(db, session_id)
+    await db.execute(delete(SessionCheckpoint).where(SessionCheckpoint.session_id == session_id))
     await db.delete(session)
     await db.commit()
 
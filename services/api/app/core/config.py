@@ -1,4 +1,5 @@
 """Application configuration via environment variables."""
+import os
 from typing import List
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -14,22 +15,180 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite+aiosqlite:///./vds.db"
 
+    # Local staging area for uploads and Parquet snapshots
+    STAGING_DIR: str = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../staging"))
+    # Snapshots kept per connector table; older ones are deleted after each successful sync
+    SNAPSHOT_RETENTION: int = 3
+
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # Session event bus: "memory" (single process) or "redis" (pub/sub across workers)
+    EVENT_BUS_BACKEND: str = "memory"
+    SSE_KEEPALIVE_S: float = 15.0
+    # Streamed agent responses go out as deltas; past this many characters per step the
+    # rest of the stream is skipped (the finished response still arrives as its message)
+    SSE_PARTIAL_MAX_CHARS: int = 32_000
+
+    # Background jobs: "memory" runs them on asyncio workers in this process (dev, tests),
+    # "celery" sends them through REDIS_URL to `celery -A app.worker.celery_app worker`.
+    # Concurrency is per queue for the memory backend; Celery workers set it with -Q/-c.
+    JOBS_BACKEND: str = "memory"
+    JOB_QUEUE_CONCURRENCY: dict = {
+        "sessions": 4, "syncs": 2, "mapping": 2, "automl": 1, "workflows": 4,
+    }
+    JOB_RETRY_BACKOFF_S: float = 5.0
+    JOB_RETRY_BACKOFF_MAX_S: float = 300.0
+    # A running job holds a lease on its row, renewed by its watchdog every third of it
+    # (which is also when it re-checks cancel_requested); a worker only takes over a
+    # "running" job (restart recovery, broker redelivery) once it lapses.
+    JOB_LEASE_S: float = 60.0
+    # Redis redelivers an unacked task after this long; keep it above the longest job
+    CELERY_VISIBILITY_TIMEOUT_S: int = 12 * 3600
+
+    # Checkpoint approvals wake the supervisor via the event bus; the DB is only
+    # re-checked every APPROVAL_RECHECK_S as a safety net for missed notifications.
+    APPROVAL_TIMEOUT_S: float = 600.0
+    APPROVAL_RECHECK_S: float = 60.0
+
     # LLM providers
     OPENAI_API_KEY: str = ""
     ANTHROPIC_API_KEY: str = ""
     GEMINI_API_KEY: str = ""
-    DEFAULT_LLM_PROVIDER: str = "gemini"  # openai | anthropic | gemini
+    DEFAULT_LLM_PROVIDER: str = "gemini"  # openai | anthropic | gemini | local
     DEFAULT_LLM_MODEL: str = "gemini-2.5-flash"
+    # Send every client to this provider regardless of MODEL_ROUTING (e.g. "local" for offline runs)
+    LLM_PROVIDER_OVERRIDE: str = ""
     
     # Model routing by agent task
     MODEL_ROUTING: dict = {
         "problem_framer": {"provider": "gemini", "model": "gemini-2.5-pro"},
         "mapper": {"provider": "gemini", "model": "gemini-2.5-flash"},
-        "default": {"provider": "gemini", "model": "gemini-2.5-flash"}
+        "default": {
+            "provider": "gemini", "model": "gemini-2.5-flash",
+            # Failover chain after the agent's own route (providers without a key are skipped)
+            "fallbacks": [
+                {"provider": "openai", "model": "gpt-4o"},
+                {"provider": "anthropic", "model": "claude-3-5-sonnet-20241022"},
+            ],
+        },
+    }
+
+    # LLM connection pooling (per provider; "default" applies to unlisted providers)
+    LLM_MAX_CONNECTIONS: dict = {"openai": 50, "anthropic": 50, "gemini": 50, "default": 50}
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY_S: float = 60.0
+    LLM_HTTP2: bool = True
+    LLM_REQUEST_TIMEOUT_S: float = 120.0
+
+    # LLM admission control: request/token budgets per minute and an in-flight cap per
+    # provider ("default" for unlisted ones), for the whole deployment. Each process admits
+    # 1/LLM_PROCESS_COUNT of them, so set it to the number of processes making LLM calls
+    # (API workers plus every Celery worker's -c). The in-flight window shrinks on 429s
+    # and grows back with successes. A 429 pauses the provider for Retry-After (or
+    # LLM_RATE_LIMIT_BACKOFF_S) and frees the call's slot; the call is then retried like
+    # any other failure, within LLM_RETRY_ATTEMPTS and then along the failover chain.
+    LLM_RATE_LIMITS: dict = {
+        "openai": {"rpm": 500, "tpm": 200_000, "concurrency": 32},
+        "anthropic": {"rpm": 50, "tpm": 40_000, "concurrency": 16},
+        "gemini": {"rpm": 150, "tpm": 1_000_000, "concurrency": 32},
+        "local": {"rpm": 100_000, "tpm": 100_000_000, "concurrency": 256},
+        "default": {"rpm": 60, "tpm": 100_000, "concurrency": 8},
+    }
+    LLM_PROCESS_COUNT: int = 1
+    LLM_MAX_CONCURRENCY: int = 64  # per process, across providers
+    LLM_OUTPUT_TOKEN_ESTIMATE: int = 1024  # reserved per call until the response length is known
+    LLM_RATE_LIMIT_BACKOFF_S: float = 2.0
+
+    # LLM resilience: transient errors and 429s are retried (transient ones with jittered
+    # backoff, 429s once the limiter's pause is over), then the call fails over along
+    # MODEL_ROUTING fallbacks. Calls outliving the HEDGE_QUANTILE of their route's
+    # recent latencies (time to first token for streams) get a duplicate; background jobs
+    # don't hedge.
+    LLM_RETRY_ATTEMPTS: int = 3
+    LLM_RETRY_BACKOFF_S: float = 1.0
+    LLM_RETRY_BACKOFF_MAX_S: float = 20.0
+    LLM_FAILOVER: bool = True
+    LLM_HEDGE: bool = True
+    LLM_HEDGE_QUANTILE: float = 0.95
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_WINDOW: int = 200
+    LLM_HEDGE_MIN_DELAY_S: float = 2.0
+
+    # LLM response cache. Agents listed here opt in (value = TTL seconds); any call at or
+    # below LLM_CACHE_MAX_TEMPERATURE is treated as deterministic and cached by default.
+    LLM_CACHE_AGENTS: dict = {"mapper": 86400, "semantic_agent": 86400, "analytics_eda": 3600}
+    LLM_CACHE_MAX_TEMPERATURE: float = 0.1
+    LLM_CACHE_TTL_S: int = 3600
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+    LLM_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    LLM_CACHE_REDIS: bool = False  # share entries across workers via REDIS_URL
+    # Streamed responses: partial results are handed to on_partial callbacks at most this often
+    LLM_STREAM_INTERVAL_S: float = 0.25
+
+    # Local provider (offline load tests): lognormal latency per agent_id ("default" for the
+    # rest), failure rates by kind (rate_limit = 429, server_error = 503, timeout), and the
+    # seed for both. Streams send the first chunk after TTFT_FRACTION of the latency.
+    LLM_LOCAL_LATENCY: dict = {
+        "default": {"median_s": 0.8, "sigma": 0.4},
+        "model": {"median_s": 2.0, "sigma": 0.5},
+        "narrate": {"median_s": 1.5, "sigma": 0.4},
     }
+    LLM_LOCAL_FAILURES: dict = {"rate_limit": 0.0, "server_error": 0.0, "timeout": 0.0}
+    LLM_LOCAL_SEED: int = 0
+    LLM_LOCAL_TTFT_FRACTION: float = 0.2
+    LLM_LOCAL_CHUNK_CHARS: int = 40
+
+    # Shared compute executor: heavy pandas work in processes, light work in threads.
+    # Each pool admits workers + QUEUE_DEPTH jobs before callers wait
+    # (0 process workers = one per core)
+    COMPUTE_PROCESS_WORKERS: int = 0
+    COMPUTE_THREAD_WORKERS: int = 8
+    COMPUTE_QUEUE_DEPTH: int = 16
+    COMPUTE_START_METHOD: str = "spawn"
+
+    # Streaming ingestion: files at or above the threshold are read in CSV_CHUNK_ROWS chunks
+    CSV_STREAMING_THRESHOLD_BYTES: int = 64 * 1024 * 1024
+    CSV_CHUNK_ROWS: int = 100_000
+    # Uploads are streamed to STAGING_DIR/uploads/<sha256> in chunks of this size
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+
+    # Salesforce extraction: objects pulled concurrently; large ones switch to Bulk API 2.0
+    SALESFORCE_MAX_CONCURRENCY: int = 4
+    SALESFORCE_BULK_THRESHOLD: int = 50_000
+    SALESFORCE_BATCH_ROWS: int = 50_000
+    SALESFORCE_BULK_POLL_S: float = 2.0
+
+    # Postgres extraction: pooled per DSN; full syncs COPY out, deltas use server-side cursors
+    POSTGRES_POOL_MIN_SIZE: int = 1
+    POSTGRES_POOL_MAX_SIZE: int = 8
+    POSTGRES_COMMAND_TIMEOUT_S: float = 3600.0
+    POSTGRES_FETCH_SIZE: int = 50_000
+    POSTGRES_PARTITIONS: int = 4
+
+    # Mongo extraction: cursor batch size and how deep nested documents are flattened into columns
+    MONGO_BATCH_SIZE: int = 5_000
+    MONGO_FLATTEN_MAX_DEPTH: int = 3
+    MONGO_CHANGE_STREAM_WAIT_MS: int = 1_000
+
+    # Unstructured ingestion: documents parsed on the compute pool, FILES_PER_TASK per task
+    # (WORKERS caps tasks in flight per sync; 0 = one per compute process)
+    UNSTRUCTURED_CHUNK_TOKENS: int = 512
+    UNSTRUCTURED_CHUNK_OVERLAP: int = 64
+    UNSTRUCTURED_WORKERS: int = 0
+    UNSTRUCTURED_FILES_PER_TASK: int = 16
+
+    # Retrieval over chunk snapshots: hashed TF-IDF vectors, IVF-clustered above IVF_MIN_ROWS
+    RETRIEVAL_EMBEDDER: str = "hashing"
+    RETRIEVAL_DIM: int = 256
+    RETRIEVAL_IVF_MIN_ROWS: int = 50_000
+    RETRIEVAL_NPROBE: int = 16
+    RETRIEVAL_TOP_K: int = 5
+    RETRIEVAL_INDEX_CACHE_ENTRIES: int = 8
+
+    # Data Explorer samples cached per connector (and table) until the next successful sync
+    SAMPLE_CACHE_MAX_ENTRIES: int = 256
+    SAMPLE_MAX_ROWS: int = 1000  # largest `limit` the sample endpoint accepts
 
     # CORS
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
@@ -7,7 +7,7 @@ from datetime import datetime
 from typing import Optional
 from sqlalchemy import (
     String, Text, Boolean, DateTime, Integer, Float,
-    ForeignKey, JSON, Enum as SAEnum, func
+    ForeignKey, JSON, Enum as SAEnum, Index, func
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.types import String as UUID
@@ -178,6 +178,25 @@ class DataSnapshot(Base):
     connector: Mapped["DataConnector"] = relationship(back_populates="snapshot_refs")
 
 
+class SyncWatermark(Base):
+    """High-water mark per connector table: where the next incremental sync resumes."""
+    __tablename__ = "sync_watermarks"
+    __table_args__ = (
+        Index("ix_sync_watermarks_connector_table", "connector_id", "table_name", unique=True),
+    )
+
+    id: Mapped[str] = mapped_column(UUID(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    connector_id: Mapped[str] = mapped_column(ForeignKey("data_connectors.id"))
+    table_name: Mapped[str] = mapped_column(String(255))
+    # Connector-specific cursor, e.g. {"offset", "prefix_sha256"} or {"SystemModstamp"},
+    # plus the storage_path of the snapshot it describes
+    value: Mapped[dict] = mapped_column(JSON, default=dict)
+    sync_run_id: Mapped[Optional[str]] = mapped_column(ForeignKey("sync_runs.id"))
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(),
+    )
+
+
 # ---------------------------------------------------------------------------
 # Semantic Layer
 # ---------------------------------------------------------------------------
@@ -263,6 +282,10 @@ class VDSSession(Base):
 
 class SessionMessage(Base):
     __tablename__ = "session_messages"
+    __table_args__ = (
+        # Keyset pagination for SSE resume: (session_id, created_at, id)
+        Index("ix_session_messages_session_created", "session_id", "created_at", "id"),
+    )
 
     id: Mapped[str] = mapped_column(UUID(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     session_id: Mapped[str] = mapped_column(ForeignKey("vds_sessions.id"), index=True)
@@ -290,6 +313,24 @@ class SessionArtifact(Base):
     session: Mapped["VDSSession"] = relationship(back_populates="artifacts")
 
 
+class SessionCheckpoint(Base):
+    """
+    Result of a completed pipeline step, so an interrupted session resumes without
+    re-running it.
+    """
+    __tablename__ = "session_checkpoints"
+    __table_args__ = (
+        Index("ix_session_checkpoints_session_step", "session_id", "step_id", unique=True),
+    )
+
+    id: Mapped[str] = mapped_column(UUID(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    session_id: Mapped[str] = mapped_column(ForeignKey("vds_sessions.id"))
+    step_id: Mapped[str] = mapped_column(String(50))
+    step_index: Mapped[int] = mapped_column(Integer)
+    result: Mapped[dict] = mapped_column(JSON)  # the step's entry in SupervisorAgent.context
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+
 # ---------------------------------------------------------------------------
 # Model Registry
 # ---------------------------------------------------------------------------
@@ -354,6 +395,33 @@ class WorkflowRun(Base):
     workflow: Mapped["AgentWorkflow"] = relationship(back_populates="runs")
 
 
+# ---------------------------------------------------------------------------
+# Background Jobs
+# ---------------------------------------------------------------------------
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id: Mapped[str] = mapped_column(UUID(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    # Key into app.services.jobs.queue.JOB_TYPES
+    name: Mapped[str] = mapped_column(String(100), index=True)
+    queue: Mapped[str] = mapped_column(String(50))
+    args: Mapped[list] = mapped_column(JSON, default=list)
+    kwargs: Mapped[dict] = mapped_column(JSON, default=dict)
+    status: Mapped[str] = mapped_column(String(20), default="queued", index=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=1)
+    cancel_requested: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Set while running
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    progress: Mapped[Optional[dict]] = mapped_column(JSON)
+    result: Mapped[Optional[dict]] = mapped_column(JSON)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+
+
 # ---------------------------------------------------------------------------
 # Governance / Audit
 # ---------------------------------------------------------------------------
@@ -11,6 +11,14 @@ from app.core.config import settings
 from app.core.logging import configure_logging
 from app.api.v1.router import api_router
 from app.db.session import engine, Base
+from app.services.llm.pool import client_pool
+from app.services.compute.executor import compute
+from app.services.jobs.queue import jobs
+from app.services.connectors.postgres_connector import pg_pools
+from app.services.connectors.mongo_connector import mongo_clients
+from app.services.llm.cache import response_cache
+from app.services.llm.limiter import llm_limiter
+from app.services.orchestration.event_bus import event_bus
 
 configure_logging()
 log = structlog.get_logger()
@@ -21,7 +29,15 @@ async def lifespan(app: FastAPI):
     log.info("vds.startup", env=settings.ENVIRONMENT)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    await jobs.start()
     yield
+    await jobs.aclose()
+    await client_pool.aclose()
+    await response_cache.aclose()
+    await event_bus.aclose()
+    await pg_pools.aclose()
+    mongo_clients.close()
+    compute.shutdown()
     log.info("vds.shutdown")
 
 
@@ -49,3 +65,12 @@ app.include_router(api_router, prefix="/api/v1")
 @app.get("/health")
 async def health():
     return {"status": "ok", "version": "0.1.0"}
+
+
+@app.get("/health/llm")
+async def llm_health():
+    """
+    LLM admission control (in flight, queued per lane, throttling) and response-cache
+    counters.
+    """
+    return {"admission": llm_limiter.metrics(), "cache": response_cache.stats}
@@ -1,7 +1,11 @@
 """Base class for all specialist agents."""
 from abc import ABC, abstractmethod
 from typing import Optional
+import structlog
 from app.services.llm.client import LLMClient
+from app.services.retrieval.service import retrieve
+
+log = structlog.get_logger()
 
 
 class BaseAgent(ABC):
@@ -38,3 +42,23 @@ class BaseAgent(ABC):
             "generic": "Adapt your analysis to whatever domain emerges from the data and user question.",
         }
         return domain_hints.get(self.domain, domain_hints["generic"])
+
+    async def _retrieve_passages(self, query: str, k: Optional[int] = None) -> str:
+        """
+        Relevant document chunks from the session's connectors, formatted for a prompt
+        ("" if none).
+        """
+        if not self.connector_ids:
+            return ""
+        try:
+            hits = await retrieve(query, self.connector_ids, k=k)
+        except Exception as e:
+            log.warning("agent.retrieval_failed", session_id=self.session_id, error=str(e))
+            return ""
+        lines = []
+        for i, hit in enumerate(hits, 1):
+            source = hit.get("source_file", "document")
+            if hit.get("page"):
+                source += f", p.{hit['page']}"
+            lines.append(f"[{i}] ({source}) {hit['text'][:600]}")
+        return "\n".join(lines)
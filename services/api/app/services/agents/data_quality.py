@@ -1,8 +1,10 @@
 """Data Quality Agent — profiles and cleans data with full transparency."""
 import pandas as pd
-import numpy as np
 from typing import Optional
 from app.services.agents.base import BaseAgent
+from app.services.compute.executor import compute
+from app.services.profiling.profiler import profile_frame
+from app.services.snapshots.store import SnapshotReader, latest_snapshots
 
 SYSTEM_PROMPT = """
 ROLE: Data Quality & Cleaning Agent (Data Engineer + Statistician)
@@ -27,6 +29,8 @@ FIX RULES:
 Return JSON with: quality_scorecard, issues, proposed_fixes, severity_summary
 """
 
+SNAPSHOT_PROFILE_ROWS = 50_000
+
 
 class DataQualityAgent(BaseAgent):
     async def run(self, question: str) -> dict:
@@ -39,11 +43,19 @@ class DataQualityAgent(BaseAgent):
         for table_name, records in snapshot_data.items():
             if not records:
                 continue
-            df = pd.DataFrame(records)
-            table_issues, table_score = self._profile_table(df, table_name)
+            table_issues, table_score = await compute.run_cpu(_profile_records, records, table_name)
             issues.extend(table_issues)
             scorecard[table_name] = table_score
 
+        # Without connector samples in context, profile the latest materialized snapshots
+        if not snapshot_data:
+            for snap in await latest_snapshots(self.connector_ids):
+                table_issues, table_score = await compute.run_cpu(
+                    _profile_snapshot, snap.storage_path, snap.table_name,
+                )
+                issues.extend(table_issues)
+                scorecard[snap.table_name] = table_score
+
         # If no actual data in context, use LLM to describe quality checks
         if not issues:
             result = await self.llm.json_chat(
@@ -68,45 +80,59 @@ class DataQualityAgent(BaseAgent):
             "clean_snapshot_id": f"clean_{self.session_id[:8]}",
         }
 
-    def _profile_table(self, df: pd.DataFrame, table_name: str) -> tuple[list, dict]:
-        issues = []
-        total = len(df)
-        if total == 0:
-            return issues, {"rows": 0, "score": "N/A"}
-
-        null_rates = (df.isnull().sum() / total * 100).round(2)
-        high_null = null_rates[null_rates > 20]
-        for col, rate in high_null.items():
-            severity = "HIGH" if rate > 50 else "MEDIUM"
+
+# Profiling runs on the compute pool, so these are module-level (picklable)
+def _profile_records(records: list[dict], table_name: str) -> tuple[list, dict]:
+    return _profile_table(pd.DataFrame(records), table_name)
+
+
+def _profile_snapshot(storage_path: str, table_name: str) -> tuple[list, dict]:
+    return _profile_table(SnapshotReader(storage_path).head(SNAPSHOT_PROFILE_ROWS), table_name)
+
+
+def _profile_table(df: pd.DataFrame, table_name: str) -> tuple[list, dict]:
+    issues = []
+    total = len(df)
+    if total == 0:
+        return issues, {"rows": 0, "score": "N/A"}
+
+    # One profiling pass feeds every check below
+    columns = profile_frame(df, sketches=False)["columns"]
+    null_rates = {col: p["null_pct"] for col, p in columns.items()}
+    for col, rate in null_rates.items():
+        if rate <= 20:
+            continue
+        severity = "HIGH" if rate > 50 else "MEDIUM"
+        issues.append({
+            "table": table_name, "column": col, "issue": "high_null_rate",
+            "severity": severity, "affected_pct": float(rate),
+            "fix": f"Investigate null source for {col}; impute or flag"
+        })
+
+    # Duplicate check on likely ID columns: non-null values that repeat
+    id_cols = [c for c in df.columns if str(c).lower().endswith("_id") or str(c).lower() == "id"]
+    for col in id_cols:
+        repeats = total - columns[col]["null_count"] - columns[col]["unique_count"]
+        dup_rate = repeats / total * 100
+        if dup_rate > 0.1:
+            issues.append({
+                "table": table_name, "column": col, "issue": "duplicate_key",
+                "severity": "CRITICAL" if dup_rate > 1 else "HIGH",
+                "affected_pct": float(dup_rate),
+                "fix": "Deduplicate by keeping most recent record"
+            })
+
+    # Negative value check on amount/price columns
+    for col, profile in columns.items():
+        if not any(k in str(col).lower() for k in ["amount", "price", "revenue", "cost", "value"]):
+            continue
+        neg_count = profile.get("negative_count", 0)
+        if neg_count > 0:
             issues.append({
-                "table": table_name, "column": col, "issue": "high_null_rate",
-                "severity": severity, "affected_pct": float(rate),
-                "fix": f"Investigate null source for {col}; impute or flag"
+                "table": table_name, "column": col, "issue": "negative_amount",
+                "severity": "MEDIUM", "affected_count": int(neg_count),
+                "fix": "Flag negatives as returns/credits or investigate data source"
             })
 
-        # Duplicate check on likely ID columns
-        id_cols = [c for c in df.columns if c.lower().endswith("_id") or c.lower() == "id"]
-        for col in id_cols:
-            dup_rate = (df[col].duplicated().sum() / total * 100)
-            if dup_rate > 0.1:
-                issues.append({
-                    "table": table_name, "column": col, "issue": "duplicate_key",
-                    "severity": "CRITICAL" if dup_rate > 1 else "HIGH",
-                    "affected_pct": float(dup_rate),
-                    "fix": "Deduplicate by keeping most recent record"
-                })
-
-        # Negative value check on amount/price columns
-        num_cols = [c for c in df.select_dtypes(include=[np.number]).columns
-                    if any(k in c.lower() for k in ["amount", "price", "revenue", "cost", "value"])]
-        for col in num_cols:
-            neg_count = (df[col] < 0).sum()
-            if neg_count > 0:
-                issues.append({
-                    "table": table_name, "column": col, "issue": "negative_amount",
-                    "severity": "MEDIUM", "affected_count": int(neg_count),
-                    "fix": "Flag negatives as returns/credits or investigate data source"
-                })
-
-        score = "excellent" if len(issues) == 0 else "good" if len(issues) < 3 else "needs_attention"
-        return issues, {"rows": total, "score": score, "null_rates": null_rates.to_dict()}
+    score = "excellent" if len(issues) == 0 else "good" if len(issues) < 3 else "needs_attention"
+    return issues, {"rows": total, "score": score, "null_rates": null_rates}
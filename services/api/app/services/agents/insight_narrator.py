@@ -34,6 +34,7 @@ class InsightNarratorAgent(BaseAgent):
         eda = self.context.get("eda", {})
         model = self.context.get("model", {})
         domain_ctx = self._domain_context()
+        passages = await self._retrieve_passages(f"{question} {frame.get('problem_statement', '')}")
 
         prompt = f"""
 Original question: {question}
@@ -45,6 +46,7 @@ Hypothesis results: {json.dumps(eda.get('hypothesis_register', []), indent=2)[:8
 Top model predictions: {json.dumps(model.get('top_predictions', []), indent=2)[:600]}
 Business impact sim: {json.dumps(model.get('business_impact_sim', {}), indent=2)[:400]}
 NL explanation: {model.get('nl_explanation', '')[:400]}
+Relevant document passages (cite as [n] where used): {passages or 'none'}
 
 Write a comprehensive, executive-quality narrative. The executive_summary should be 5 bullet points each
 with [Observation] → [Driver] → [Implication]. Include specific numbers and percentages.
@@ -6,7 +6,8 @@ import uuid
 import json
 from datetime import datetime, timezone
 from typing import Optional, List, Dict
-from app.db.models import DataConnector, ModelRegistryEntry, SyncRun
+from app.db.models import DataSnapshot
+from app.db.session import AsyncSessionLocal
 from app.services.llm.client import LLMClient
 
 log = structlog.get_logger()
@@ -38,18 +39,26 @@ class ModelingAgent:
         self.session_id = session_id
         self.llm = LLMClient(agent_id="modeling")
 
+    async def _describe_dataset(self, dataset_id: str) -> str:
+        """Schema and row count from the Parquet snapshot when dataset_id names one."""
+        async with AsyncSessionLocal() as db:
+            snap = await db.get(DataSnapshot, dataset_id)
+        if not snap:
+            return ""
+        columns = (snap.schema_json or {}).get("columns", {})
+        schema = ", ".join(f"{name} ({dtype})" for name, dtype in columns.items())
+        return f"Table: {snap.table_name} — {snap.row_count} rows. Columns: {schema}"
+
     async def run_pipeline(self, dataset_id: str, target_column: str, problem_type: str = "classification") -> Dict:
         """
         Execute a full AutoML pipeline via LLM code generation.
         """
         log.info("modeling.pipeline.start", dataset_id=dataset_id, target=target_column)
 
-        # In a professional implementation, we'd pass schema metadata or sample data to the LLM.
-        # Here we request the expert-grade pipeline generation for the problem.
-        
         prompt = f"""
         Objective: Build a high-performance {problem_type} model for target column '{target_column}'.
         Dataset Source: {dataset_id}
+        {await self._describe_dataset(dataset_id)}
         
         Please generate the complete expert modeling pipeline, including code for:
         1. Preprocessing and cleaning
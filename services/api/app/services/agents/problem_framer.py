@@ -55,8 +55,10 @@ class ProblemFramerResponse(BaseModel):
 class ProblemFramerAgent(BaseAgent):
     async def run(self, question: str) -> dict:
         domain_ctx = self._domain_context()
+        passages = await self._retrieve_passages(question)
+        content = f"{question}\n\nRelevant document passages:\n{passages}" if passages else question
         result = await self.llm.json_chat(
-            messages=[{"role": "user", "content": question}],
+            messages=[{"role": "user", "content": content}],
             system_prompt=f"{SYSTEM_PROMPT}\n\nDOMAIN CONTEXT: {domain_ctx}",
             response_schema=ProblemFramerResponse,
             temperature=0.2,
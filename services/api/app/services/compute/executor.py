@@ -0,0 +1,244 @@
+"""
+Shared compute executor — keeps heavy pandas/numpy work off the event loop.
+
+`run_cpu` sends a picklable top-level function (or a method of a stateless
+object) to a process pool, so a large profile can't hold the GIL the event
+loop needs; `run_io` uses a thread pool for light or I/O-bound work and for
+callables that can't be pickled. Each pool admits at most its worker count
+plus COMPUTE_QUEUE_DEPTH jobs; further callers wait their turn instead of
+growing the pool's internal queue without bound.
+
+Jobs can call `report_progress(**fields)` to stream progress back to the
+caller's `on_progress` callback, which runs on the event loop (coroutines are
+awaited). Updates are delivered in order, coalesced to the latest when the
+callback falls behind, and all have been handled by the time the job's
+result is returned. Closed from the app lifespan.
+"""
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import threading
+import uuid
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+import structlog
+
+from app.core.config import settings
+
+log = structlog.get_logger()
+
+_DONE = object()
+_DONE_MARKER = "__done__"  # what workers send once a job with a listener ends
+
+# Set in worker processes by the pool initializer
+_progress_queue = None
+_current_job: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "compute_job", default=None,
+)
+
+
+def _init_worker(queue):
+    global _progress_queue
+    _progress_queue = queue
+
+
+def _invoke(job_id: Optional[str], fn: Callable, args: tuple, kwargs: dict):
+    # Runs in the worker process
+    token = _current_job.set(job_id)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _current_job.reset(token)
+        if job_id is not None:
+            _progress_queue.put((job_id, _DONE_MARKER))
+
+
+def report_progress(**fields):
+    """Send progress to the submitting caller's on_progress; a no-op if it passed none."""
+    job_id = _current_job.get()
+    if job_id is None:
+        return
+    if _progress_queue is not None:
+        _progress_queue.put((job_id, fields))
+    else:
+        compute._deliver_threadsafe(job_id, fields)
+
+
+class _Listener:
+    def __init__(self, loop: asyncio.AbstractEventLoop, callback: Callable):
+        self.loop = loop
+        self.callback = callback
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = loop.create_task(self._consume())
+
+    async def _consume(self):
+        while True:
+            item = await self.queue.get()
+            while not self.queue.empty() and item is not _DONE:
+                item = self.queue.get_nowait()  # only the latest update matters
+            if item is _DONE:
+                return
+            try:
+                result = self.callback(item)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                log.warning("compute.progress_failed", error=str(e))
+
+
+class ComputeExecutor:
+    def __init__(self):
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._progress = None
+        self._progress_reader: Optional[threading.Thread] = None
+        self._listeners: dict[str, _Listener] = {}
+        self._lock = threading.Lock()
+        # Admission slots per event loop (a Celery worker runs a fresh loop per task)
+        self._slots: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    @property
+    def process_workers(self) -> int:
+        return settings.COMPUTE_PROCESS_WORKERS or os.cpu_count() or 1
+
+    async def run_cpu(
+        self, fn: Callable, *args, on_progress: Optional[Callable] = None, **kwargs,
+    ) -> Any:
+        """Run `fn(*args, **kwargs)` in a worker process."""
+        if multiprocessing.current_process().daemon:
+            # Daemonic processes (Celery prefork children) can't start a pool, and
+            # have no event loop serving requests to protect anyway
+            return await self.run_io(fn, *args, on_progress=on_progress, **kwargs)
+        async with self._slot("cpu", self.process_workers):
+            pool = self._process_pool()
+            job_id, listener = self._listen(on_progress)
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(pool, _invoke, job_id, fn, args, kwargs)
+            except BaseException as e:
+                # Progress of a failed job is moot, and fn may never have started (unpicklable args)
+                self._drop(job_id, listener)
+                if isinstance(e, BrokenProcessPool):
+                    # A worker died (OOM, segfault); start a fresh pool for the next caller
+                    log.error("compute.pool_broken", fn=getattr(fn, "__qualname__", str(fn)))
+                    self._reset_process_pool(pool)
+                raise
+            await self._finish(job_id, listener)
+            return result
+
+    async def run_io(
+        self, fn: Callable, *args, on_progress: Optional[Callable] = None, **kwargs,
+    ) -> Any:
+        """Run `fn(*args, **kwargs)` on the shared thread pool."""
+        async with self._slot("io", settings.COMPUTE_THREAD_WORKERS):
+            pool = self._thread_pool()
+            job_id, listener = self._listen(on_progress)
+            ctx = contextvars.copy_context()
+            ctx.run(_current_job.set, job_id)
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(pool, lambda: ctx.run(fn, *args, **kwargs))
+            except BaseException:
+                self._drop(job_id, listener)
+                raise
+            await self._finish(job_id, listener, done=True)
+            return result
+
+    def shutdown(self):
+        with self._lock:
+            processes, self._processes = self._processes, None
+            threads, self._threads = self._threads, None
+            progress, self._progress = self._progress, None
+        if processes is not None:
+            processes.shutdown(wait=True, cancel_futures=True)
+        if threads is not None:
+            threads.shutdown(wait=False, cancel_futures=True)
+        if progress is not None:
+            progress.put(None)
+            self._progress_reader.join(timeout=5)
+            progress.close()
+        log.info("compute.shutdown")
+
+    def _slot(self, kind: str, workers: int) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        slots = self._slots.setdefault(loop, {})
+        if kind not in slots:
+            slots[kind] = asyncio.Semaphore(workers + settings.COMPUTE_QUEUE_DEPTH)
+        return slots[kind]
+
+    def _listen(self, on_progress: Optional[Callable]) -> tuple[Optional[str], Optional[_Listener]]:
+        if on_progress is None:
+            return None, None
+        job_id = uuid.uuid4().hex
+        listener = _Listener(asyncio.get_running_loop(), on_progress)
+        self._listeners[job_id] = listener
+        return job_id, listener
+
+    async def _finish(
+        self, job_id: Optional[str], listener: Optional[_Listener], done: bool = False,
+    ):
+        if listener is None:
+            return
+        if done:
+            # Thread jobs: every update was queued on the loop before the result
+            listener.queue.put_nowait(_DONE)
+        try:
+            await listener.task
+        finally:
+            self._listeners.pop(job_id, None)
+
+    def _drop(self, job_id: Optional[str], listener: Optional[_Listener]):
+        if listener is not None:
+            listener.task.cancel()
+            self._listeners.pop(job_id, None)
+
+    def _deliver_threadsafe(self, job_id: str, fields):
+        listener = self._listeners.get(job_id)
+        if listener is not None:
+            item = _DONE if fields == _DONE_MARKER else fields
+            listener.loop.call_soon_threadsafe(listener.queue.put_nowait, item)
+
+    def _read_progress(self, queue):
+        while True:
+            message = queue.get()
+            if message is None:
+                return
+            self._deliver_threadsafe(*message)
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                ctx = multiprocessing.get_context(settings.COMPUTE_START_METHOD)
+                if self._progress is None:
+                    self._progress = ctx.Queue()
+                    self._progress_reader = threading.Thread(
+                        target=self._read_progress, args=(self._progress,),
+                        name="compute-progress", daemon=True,
+                    )
+                    self._progress_reader.start()
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.process_workers, mp_context=ctx,
+                    initializer=_init_worker, initargs=(self._progress,),
+                )
+                log.info("compute.process_pool_started", workers=self.process_workers)
+            return self._processes
+
+    def _reset_process_pool(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._processes is broken:
+                self._processes = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(
+                    max_workers=settings.COMPUTE_THREAD_WORKERS, thread_name_prefix="compute",
+                )
+            return self._threads
+
+
+compute = ComputeExecutor()
@@ -1,12 +1,27 @@
 """CSV / Excel connector — handles file uploads and converts to staged tables."""
+import base64
+import hashlib
 import io
+import os
 import uuid
-from typing import Optional
+from typing import Iterator, Optional
 import pandas as pd
 import structlog
 
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.db.models import ConnectorType, SyncRun
+from app.services.compute.executor import compute, report_progress
+from app.services.connectors.registry import ConnectorRegistry
+from app.services.jobs.queue import report_job_progress
+from app.services.profiling.incremental import IncrementalProfiler, ReservoirSample
+from app.services.profiling.profiler import profile_frame
+from app.services.snapshots.store import SnapshotWriter
+
 log = structlog.get_logger()
 
+HASH_BLOCK_BYTES = 8 * 1024 * 1024
+
 ENTITY_PATTERN_MAP = {
     "account": ["account", "company", "customer", "organization", "client"],
     "opportunity": ["opportunity", "deal", "opp", "pipeline", "prospect"],
@@ -19,6 +34,7 @@ ENTITY_PATTERN_MAP = {
 }
 
 
+@ConnectorRegistry.register(ConnectorType.csv)
 class CSVConnector:
     async def test_connection(self, config: dict, secret_ref: Optional[str] = None) -> dict:
         file_path = config.get("file_path")
@@ -26,21 +42,52 @@ class CSVConnector:
             return {"success": True, "message": "File accessible", "details": {"path": file_path}}
         return {"success": True, "message": "Upload-based connector ready", "details": {}}
 
-    async def sync(self, config: dict, secret_ref: Optional[str], incremental: bool, run_id: str) -> dict:
+    async def sync(
+        self, config: dict, secret_ref: Optional[str], incremental: bool, run_id: str,
+        watermarks: Optional[dict] = None,
+    ) -> dict:
         file_path = config.get("file_path", "")
         file_content = config.get("file_content_b64")  # base64 for uploaded files
 
-        if file_content:
-            import base64
-            raw = base64.b64decode(file_content)
+        if not file_content and not file_path:
+            return {"rows_read": 0, "rows_written": 0, "profile_report": {}, "semantic_pack": {}}
+
+        # Only files on disk can be resumed; uploads arrive whole every time
+        watermark = None
+        if file_path and not file_content:
+            table = config.get("table_name", "uploaded_table")
+            previous = (watermarks or {}).get(table)
+            watermark = await compute.run_io(self._file_watermark, file_path)
+            appended = bool(incremental and previous) and await compute.run_io(
+                self._is_append_of, file_path, previous,
+            )
+            if appended:
+                result = await self._sync_appended(config, run_id, previous, watermark)
+            else:
+                result = await self._sync_full(config, run_id)
+            watermark["storage_path"] = result["snapshots"][0]["storage_path"]
+            result["watermarks"] = {table: watermark}
+            return result
+
+        return await self._sync_full(config, run_id)
+
+    async def _sync_full(self, config: dict, run_id: str) -> dict:
+        if self._should_stream(config):
+            return await self._sync_streaming(config, run_id)
+        # Parsing, profiling and the snapshot write all run in a worker process
+        return await compute.run_cpu(self._read_full, config, run_id)
+
+    def _read_full(self, config: dict, run_id: str) -> dict:
+        if config.get("file_content_b64"):
+            raw = base64.b64decode(config["file_content_b64"])
             df = pd.read_csv(io.BytesIO(raw))
-        elif file_path:
-            df = pd.read_csv(file_path)
         else:
-            return {"rows_read": 0, "rows_written": 0, "profile_report": {}, "semantic_pack": {}}
+            df = pd.read_csv(config["file_path"])
 
-        profile = self._profile(df)
+        profile = profile_frame(df)
         semantic_pack = self._generate_semantic_pack(df, config)
+        writer = self._snapshot_writer(config, run_id)
+        writer.write(df)
 
         return {
             "rows_read": len(df),
@@ -48,29 +95,169 @@ class CSVConnector:
             "sample_data": df.head(200).to_dict(orient="records"),
             "profile_report": profile,
             "semantic_pack": semantic_pack,
+            "snapshots": [writer.finalize()],
         }
 
-    def _profile(self, df: pd.DataFrame) -> dict:
-        total = len(df)
-        profile = {"row_count": total, "column_count": len(df.columns), "columns": {}}
-        for col in df.columns:
-            col_data = df[col]
-            col_profile = {
-                "dtype": str(col_data.dtype),
-                "null_pct": round(col_data.isnull().sum() / total * 100, 2),
-                "unique_count": int(col_data.nunique()),
-            }
-            if col_data.dtype in ["int64", "float64"]:
-                col_profile.update({
-                    "mean": round(float(col_data.mean()), 4) if not col_data.isnull().all() else None,
-                    "std": round(float(col_data.std()), 4) if not col_data.isnull().all() else None,
-                    "min": float(col_data.min()) if not col_data.isnull().all() else None,
-                    "max": float(col_data.max()) if not col_data.isnull().all() else None,
-                })
-            elif col_data.dtype == "object":
-                col_profile["top_values"] = col_data.value_counts().head(5).to_dict()
-            profile["columns"][col] = col_profile
-        return profile
+    async def _sync_appended(
+        self, config: dict, run_id: str, previous: dict, watermark: dict,
+    ) -> dict:
+        """Parse only the rows appended since `previous`; earlier parts are linked forward."""
+        result = await self._sync_streaming(
+            config, run_id, byte_range=(previous["offset"], watermark["offset"]),
+            carry_from=previous.get("storage_path"),
+        )
+        result["incremental"] = True
+        log.info(
+            "csv.sync.incremental", run_id=run_id, from_offset=previous["offset"],
+            rows=result["rows_read"],
+        )
+        return result
+
+    async def sample(
+        self, config: dict, secret_ref: Optional[str], limit: int = 100,
+    ) -> pd.DataFrame:
+        """First `limit` rows only — never reads past them."""
+        if config.get("file_content_b64"):
+            source = io.BufferedReader(_Base64Reader(config["file_content_b64"]))
+        elif config.get("file_path"):
+            source = config["file_path"]
+        else:
+            return pd.DataFrame()
+        return await compute.run_io(pd.read_csv, source, nrows=limit)
+
+    def _snapshot_writer(self, config: dict, run_id: str) -> SnapshotWriter:
+        return SnapshotWriter(
+            run_id, config.get("table_name", "uploaded_table"),
+            partition_by=config.get("partition_by"),
+        )
+
+    def _should_stream(self, config: dict) -> bool:
+        if "streaming" in config:
+            return bool(config["streaming"])
+        if config.get("file_content_b64"):
+            size = len(config["file_content_b64"]) * 3 // 4
+        else:
+            size = os.path.getsize(config["file_path"])
+        return size >= settings.CSV_STREAMING_THRESHOLD_BYTES
+
+    async def _sync_streaming(
+        self, config: dict, run_id: str,
+        byte_range: Optional[tuple[int, int]] = None, carry_from: Optional[str] = None,
+    ) -> dict:
+        # The whole chunk loop runs in a worker process; row counts come back as progress
+        return await compute.run_cpu(
+            self._read_streaming, config, run_id, byte_range, carry_from,
+            on_progress=lambda progress: self._report_progress(run_id, progress["rows"]),
+        )
+
+    def _read_streaming(
+        self, config: dict, run_id: str, byte_range: Optional[tuple[int, int]],
+        carry_from: Optional[str],
+    ) -> dict:
+        """
+        Read the file (or `byte_range` of it) in bounded chunks, folding each into the
+        profile and a reservoir sample.
+        """
+        chunk_rows = int(config.get("chunk_rows", settings.CSV_CHUNK_ROWS))
+        if byte_range:
+            chunks = self._iter_range(config["file_path"], *byte_range, chunk_rows)
+        else:
+            chunks = self._iter_chunks(config, chunk_rows)
+        profiler = IncrementalProfiler()
+        sample = ReservoirSample(size=200)
+        writer = self._snapshot_writer(config, run_id)
+        if carry_from:
+            writer.carry_forward(carry_from)
+        semantic_pack = None
+
+        for chunk in chunks:
+            if semantic_pack is None:
+                semantic_pack = self._generate_semantic_pack(chunk, config)
+            profiler.update(chunk)
+            sample.update(chunk)
+            writer.write(chunk)
+            report_progress(rows=profiler.rows)
+
+        log.info("csv.sync.streamed", run_id=run_id, rows=profiler.rows, chunks=profiler.chunks)
+        profile = profiler.report()
+        profile["streaming"] = {"chunks": profiler.chunks, "chunk_rows": chunk_rows}
+        return {
+            "rows_read": profiler.rows,
+            "rows_written": profiler.rows,
+            "sample_data": sample.rows(),
+            "profile_report": profile,
+            "semantic_pack": semantic_pack or self._generate_semantic_pack(pd.DataFrame(), config),
+            "snapshots": [writer.finalize()],
+        }
+
+    def _iter_chunks(self, config: dict, chunk_rows: int) -> Iterator[pd.DataFrame]:
+        if config.get("file_content_b64"):
+            source = io.BufferedReader(_Base64Reader(config["file_content_b64"]))
+        else:
+            source = config["file_path"]
+        with pd.read_csv(source, chunksize=chunk_rows) as reader:
+            yield from reader
+
+    def _iter_range(
+        self, file_path: str, start: int, end: int, chunk_rows: int,
+    ) -> Iterator[pd.DataFrame]:
+        """Rows in bytes [start, end) of the file, parsed with the file's header."""
+        if end <= start:
+            return
+        columns = pd.read_csv(file_path, nrows=0).columns.tolist()
+        with open(file_path, "rb") as f:
+            f.seek(start)
+            source = io.BufferedReader(_BoundedReader(f, end - start))
+            with pd.read_csv(source, header=None, names=columns, chunksize=chunk_rows) as reader:
+                yield from reader
+
+    def _file_watermark(self, file_path: str) -> dict:
+        """Byte offset the file was read to, plus a hash of everything before it."""
+        digest = hashlib.sha256()
+        size = os.path.getsize(file_path)
+        last = b""
+        with open(file_path, "rb") as f:
+            remaining = size
+            while remaining:
+                block = f.read(min(HASH_BLOCK_BYTES, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                remaining -= len(block)
+                last = block[-1:]
+        return {
+            "offset": size - remaining,
+            "prefix_sha256": digest.hexdigest(),
+            # A trailing partial line could still be extended, so it can't be resumed past
+            "complete_line": last in (b"", b"\n"),
+        }
+
+    def _is_append_of(self, file_path: str, previous: dict) -> bool:
+        """True if the file still starts with exactly the bytes the previous sync read."""
+        offset = previous.get("offset")
+        if offset is None or not previous.get("complete_line"):
+            return False
+        if os.path.getsize(file_path) < offset:
+            return False
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            remaining = offset
+            while remaining:
+                block = f.read(min(HASH_BLOCK_BYTES, remaining))
+                if not block:
+                    return False
+                digest.update(block)
+                remaining -= len(block)
+        return digest.hexdigest() == previous.get("prefix_sha256")
+
+    async def _report_progress(self, run_id: str, rows_read: int):
+        async with AsyncSessionLocal() as db:
+            run = await db.get(SyncRun, run_id)
+            if run is None:  # ad-hoc syncs (uploads, samples) have no SyncRun row
+                return
+            run.rows_read = rows_read
+            await db.commit()
+        await report_job_progress(rows_read=rows_read)
 
     def _generate_semantic_pack(self, df: pd.DataFrame, config: dict) -> dict:
         table_hint = config.get("table_name", "uploaded_table").lower()
@@ -121,3 +308,60 @@ class CSVConnector:
             "metric_candidates": metric_candidates,
             "synonyms": synonyms,
         }
+
+
+class _BoundedReader(io.RawIOBase):
+    """Raw view over the next `limit` bytes of an open binary file."""
+
+    def __init__(self, f, limit: int):
+        self._f = f
+        self._remaining = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._remaining <= 0:
+            return 0
+        data = self._f.read(min(len(buffer), self._remaining))
+        n = len(data)
+        buffer[:n] = data
+        self._remaining -= n
+        return n
+
+
+class _Base64Reader(io.RawIOBase):
+    """
+    File-like view that decodes a base64 string lazily, a slice at a time. Slices
+    are cut to whole 4-character quanta once line breaks are dropped, so wrapped
+    input decodes too; a UTF-8 sequence or CRLF split across reads is fine, as
+    pandas decodes the byte stream as a whole.
+    """
+
+    def __init__(self, encoded: str, block_chars: int = 4 * 256 * 1024):
+        self._encoded = encoded
+        self._pos = 0
+        self._block = block_chars
+        self._carry = ""  # characters of an incomplete quantum
+        self._pending = b""
+        self._offset = 0  # bytes of _pending already handed out
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while len(self._pending) - self._offset < len(buffer) and self._pos < len(self._encoded):
+            self._decode_slice()
+        n = min(len(buffer), len(self._pending) - self._offset)
+        buffer[:n] = self._pending[self._offset:self._offset + n]
+        self._offset += n
+        return n
+
+    def _decode_slice(self):
+        piece = self._carry + "".join(self._encoded[self._pos:self._pos + self._block].split())
+        self._pos += self._block
+        # At the end, a ragged tail is left for b64decode to reject
+        usable = len(piece) if self._pos >= len(self._encoded) else len(piece) - len(piece) % 4
+        self._carry = piece[usable:]
+        self._pending = self._pending[self._offset:] + base64.b64decode(piece[:usable])
+        self._offset = 0
@@ -1,14 +1,99 @@
-"""PostgreSQL connector — handles connection testing and data syncing."""
+"""
+PostgreSQL connector — real extraction over asyncpg.
+
+Full syncs stream each table out with COPY ... TO STDOUT (FORMAT csv) into a
+spool file that is parsed back in bounded chunks; incremental syncs read
+through a server-side cursor. With a `partition_key`, a table is split into
+key ranges read in parallel, each on its own pooled connection. Pools are kept
+per DSN, so test_connection, sample and every sync of a connector reuse them.
+"""
+import asyncio
+import os
+import tempfile
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional
+import numpy as np
 import pandas as pd
 import structlog
-from typing import Optional
-from sqlalchemy import create_url
-from sqlalchemy.ext.asyncio import create_async_engine
-from app.services.connectors.registry import ConnectorRegistry
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
 from app.db.models import ConnectorType
+from app.services.connectors.registry import ConnectorRegistry
+from app.services.profiling.incremental import IncrementalProfiler, ReservoirSample
+from app.services.snapshots.store import SnapshotWriter
 
 log = structlog.get_logger()
 
+NUMERIC_TYPES = {"int2", "int4", "int8", "float4", "float8", "numeric", "oid"}
+COPY_NULL = "\\N"  # keeps NULL distinguishable from the empty string in CSV
+
+
+def _ident(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _dsn(connection_string: str) -> str:
+    """asyncpg wants a plain postgresql:// URL; drop any SQLAlchemy driver suffix."""
+    url = make_url(connection_string).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+class PostgresPools:
+    """One asyncpg pool per DSN, created on first use. Closed from the app lifespan."""
+
+    def __init__(self):
+        self._pools: dict[str, Any] = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, connection_string: str):
+        dsn = _dsn(connection_string)
+        pool = self._pools.get(dsn)
+        if pool is None:
+            async with self._lock:
+                pool = self._pools.get(dsn)
+                if pool is None:
+                    import asyncpg
+                    pool = await asyncpg.create_pool(
+                        dsn,
+                        min_size=settings.POSTGRES_POOL_MIN_SIZE,
+                        max_size=settings.POSTGRES_POOL_MAX_SIZE,
+                        command_timeout=settings.POSTGRES_COMMAND_TIMEOUT_S,
+                    )
+                    self._pools[dsn] = pool
+                    log.info("postgres.pool.created", host=make_url(dsn).host)
+        return pool
+
+    async def aclose(self):
+        for pool in self._pools.values():
+            try:
+                await pool.close()
+            except Exception as e:
+                log.warning("postgres.pool.close_failed", error=str(e))
+        self._pools.clear()
+
+
+pg_pools = PostgresPools()
+
+
+class _Table:
+    def __init__(self, schema: str, name: str, columns: dict[str, str], primary_key: list[str]):
+        self.schema = schema
+        self.name = name
+        self.columns = columns  # column -> udt_name, in ordinal order
+        self.primary_key = primary_key
+
+    @property
+    def qualified(self) -> str:
+        return f"{_ident(self.schema)}.{_ident(self.name)}"
+
+    @property
+    def select_list(self) -> str:
+        return ", ".join(_ident(c) for c in self.columns)
+
+
 @ConnectorRegistry.register(ConnectorType.postgres)
 class PostgresConnector:
     async def test_connection(self, config: dict, secret_ref: Optional[str] = None) -> dict:
@@ -16,42 +101,332 @@ class PostgresConnector:
         conn_str = config.get("connection_string")
         if not conn_str:
             return {"success": False, "message": "Missing connection_string"}
-        
         try:
-            # Basic validation of the URL
-            create_url(conn_str)
-            return {"success": True, "message": "Postgres connection string format is valid (Verification via dialect/driver check)"}
+            pool = await pg_pools.get(conn_str)
+            async with pool.acquire() as conn:
+                version = await conn.fetchval("SHOW server_version")
+            return {
+                "success": True, "message": "Postgres connected",
+                "details": {"server_version": version},
+            }
         except Exception as e:
-            return {"success": False, "message": f"Invalid connection string: {str(e)}"}
-
-    async def sync(self, config: dict, secret_ref: Optional[str], incremental: bool, run_id: str) -> dict:
-        """Sync data from Postgres (Mocked for now as we don't have a live DB to test against)."""
-        table_name = config.get("table_name", "pg_table")
-        
-        # In a real implementation, we would use SQLAlchemy to fetch data
-        # For this specialized AI demo, we'll simulate a successful fetch if the URL is provided
-        
-        log.info("postgres.sync.start", table=table_name)
-        
-        # Mocking 500 rows of synced data
-        df = pd.DataFrame([{ "id": i, "value": f"data_{i}", "category": "A" if i % 2 == 0 else "B" } for i in range(500)])
-        
+            return {"success": False, "message": f"Connection failed: {e}", "details": {}}
+
+    async def sync(
+        self, config: dict, secret_ref: Optional[str], incremental: bool, run_id: str,
+        watermarks: Optional[dict] = None,
+    ) -> dict:
+        """
+        Config: connection_string, tables (or table_name; default every table in
+        `schema`), fetch_size, partition_key/partitions, cursor_column (default
+        updated_at when present), primary_key, extract_mode ("copy" or "cursor").
+        """
+        pool = await pg_pools.get(config["connection_string"])
+        tables = await self._discover(pool, config)
+        log.info("postgres.sync.start", run_id=run_id, tables=[t.name for t in tables])
+
+        results = []
+        for table in tables:
+            previous = (watermarks or {}).get(table.name) if incremental else None
+            results.append(await self._sync_table(pool, config, table, run_id, previous))
+
+        rows = sum(r["rows"] for r in results)
         return {
-            "rows_read": 500,
-            "rows_written": 500,
-            "sample_data": df.head(100).to_dict(orient="records"),
+            "rows_read": rows,
+            "rows_written": rows,
+            "sample_data": {r["table"]: r["sample"] for r in results},
             "profile_report": {
-                "row_count": 500,
-                "column_count": 3,
-                "columns": {
-                    "id": {"dtype": "int64", "null_pct": 0, "unique_count": 500},
-                    "value": {"dtype": "object", "null_pct": 0, "unique_count": 500},
-                    "category": {"dtype": "object", "null_pct": 0, "unique_count": 2}
-                }
+                "tables": {r["table"]: r["profile"] for r in results},
+                "row_counts": {r["table"]: r["snapshot"]["row_count"] for r in results},
             },
             "semantic_pack": {
-                "entity_candidates": [{"entity": "GenericRecord", "table": table_name, "confidence": 0.5}],
+                "entity_candidates": [
+                    {"entity": r["table"].title().replace("_", ""), "table": r["table"],
+                     "confidence": 0.6, "evidence": ["postgres_table"]}
+                    for r in results
+                ],
+                "relationship_candidates": [],
                 "metric_candidates": [],
-                "synonyms": []
-            }
+                "synonyms": [],
+            },
+            "snapshots": [r["snapshot"] for r in results],
+            "watermarks": {r["table"]: r["watermark"] for r in results},
+            "incremental": any(r["profile"].get("incremental") for r in results),
         }
+
+    async def sample(
+        self, config: dict, secret_ref: Optional[str], limit: int = 100
+    ) -> pd.DataFrame:
+        """SELECT ... LIMIT n against `sample_table` (default the first configured table)."""
+        pool = await pg_pools.get(config["connection_string"])
+        tables = await self._discover(pool, config, only=config.get("sample_table"))
+        if not tables:
+            return pd.DataFrame()
+        table = tables[0]
+        async with pool.acquire() as conn:
+            records = await conn.fetch(
+                f"SELECT {table.select_list} FROM {table.qualified} LIMIT $1", int(limit),
+            )
+        df = pd.DataFrame.from_records([tuple(r) for r in records], columns=list(table.columns))
+        return _coerce(df, table.columns)
+
+    async def _discover(self, pool, config: dict, only: Optional[str] = None) -> list[_Table]:
+        schema = config.get("schema", "public")
+        names = [only] if only else config.get("tables") or (
+            [config["table_name"]] if config.get("table_name") else None
+        )
+        async with pool.acquire() as conn:
+            if names is None:
+                names = [r["table_name"] for r in await conn.fetch(
+                    "SELECT table_name FROM information_schema.tables "
+                    "WHERE table_schema = $1 AND table_type = 'BASE TABLE' ORDER BY table_name",
+                    schema,
+                )]
+            tables = []
+            for name in names:
+                table_schema, _, table_name = name.rpartition(".")
+                table_schema = table_schema or schema
+                columns = {r["column_name"]: r["udt_name"] for r in await conn.fetch(
+                    "SELECT column_name, udt_name FROM information_schema.columns "
+                    "WHERE table_schema = $1 AND table_name = $2 ORDER BY ordinal_position",
+                    table_schema, table_name,
+                )}
+                if not columns:
+                    raise ValueError(f"Table not found: {table_schema}.{table_name}")
+                primary_key = [r["attname"] for r in await conn.fetch(
+                    "SELECT a.attname FROM pg_index i "
+                    "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+                    "WHERE i.indrelid = $1::regclass AND i.indisprimary",
+                    f"{_ident(table_schema)}.{_ident(table_name)}",
+                )]
+                tables.append(_Table(table_schema, table_name, columns, primary_key))
+        return tables
+
+    async def _sync_table(
+        self, pool, config: dict, table: _Table, run_id: str, previous: Optional[dict]
+    ) -> dict:
+        cursor_column = config.get("cursor_column") or (
+            "updated_at" if "updated_at" in table.columns else None
+        )
+        if cursor_column and cursor_column not in table.columns:
+            raise ValueError(f"cursor_column {cursor_column!r} not in {table.name}")
+        key = config.get("primary_key") or (
+            table.primary_key[0] if len(table.primary_key) == 1 else None
+        )
+        same_cursor = previous and previous.get("cursor_column") == cursor_column
+        since = previous.get("cursor_value") if same_cursor else None
+        delta = cursor_column is not None and since is not None
+
+        where, args = "", []
+        if delta:
+            # With a key, same-instant rows are re-read and replace themselves;
+            # without one, skip them
+            op = ">=" if key else ">"
+            where = f" WHERE {_ident(cursor_column)} {op} $1::text::{table.columns[cursor_column]}"
+            args = [since]
+
+        state = _TableState(
+            SnapshotWriter(run_id, table.name), table.columns, cursor_column,
+            key if delta else None,
+        )
+        mode = config.get("extract_mode") or ("cursor" if delta else "copy")
+        fetch_size = int(config.get("fetch_size", settings.POSTGRES_FETCH_SIZE))
+        partition_key = config.get("partition_key")
+        if partition_key and partition_key in table.columns:
+            partitions = int(config.get("partitions", settings.POSTGRES_PARTITIONS))
+            await self._read_partitioned(
+                pool, table, where, args, partition_key, partitions, mode, fetch_size, state,
+            )
+        else:
+            await self._read(pool, table, where, args, mode, fetch_size, state)
+
+        if delta and previous.get("storage_path"):
+            await asyncio.to_thread(
+                state.writer.carry_forward, previous["storage_path"], key, state.ids or None,
+            )
+        snapshot = await asyncio.to_thread(state.writer.finalize)
+        profile = state.profiler.report()
+        profile["incremental"] = delta
+        if delta:
+            profile["replaced_rows"] = snapshot["schema_json"]["replaced_rows"]
+        log.info("postgres.table_synced", table=table.name, mode=mode, rows=state.rows, delta=delta)
+        return {
+            "table": table.name,
+            "rows": state.rows,
+            "sample": state.sample.rows()[:100],
+            "profile": profile,
+            "snapshot": snapshot,
+            "watermark": {
+                "cursor_column": cursor_column,
+                "cursor_value": (
+                    _watermark_value(state.max_cursor) if state.max_cursor is not None else since
+                ),
+                "storage_path": snapshot["storage_path"],
+            },
+        }
+
+    async def _read(
+        self, pool, table: _Table, where: str, args: list, mode: str, fetch_size: int,
+        state: "_TableState",
+    ):
+        query = f"SELECT {table.select_list} FROM {table.qualified}{where}"
+        if mode == "copy":
+            await self._read_copy(pool, query, args, fetch_size, state)
+        else:
+            await self._read_cursor(pool, query, args, fetch_size, state)
+
+    async def _read_cursor(
+        self, pool, query: str, args: list, fetch_size: int, state: "_TableState"
+    ):
+        """Server-side cursor: at most `fetch_size` rows are held client-side at a time."""
+        columns = list(state.types)
+        async with pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(query, *args)
+                while True:
+                    records = await cursor.fetch(fetch_size)
+                    if not records:
+                        break
+                    df = pd.DataFrame.from_records([tuple(r) for r in records], columns=columns)
+                    await asyncio.to_thread(state.add, df)
+
+    async def _read_copy(self, pool, query: str, args: list, fetch_size: int, state: "_TableState"):
+        """COPY the result to a spool file at wire speed, then parse it back in chunks."""
+        spool_dir = os.path.join(settings.STAGING_DIR, "spool")
+        os.makedirs(spool_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=".csv", dir=spool_dir)
+        os.close(fd)
+        try:
+            async with pool.acquire() as conn:
+                await conn.copy_from_query(
+                    query, *args, output=path, format="csv", header=True, null=COPY_NULL,
+                )
+            await asyncio.to_thread(self._ingest_csv, path, fetch_size, state)
+        finally:
+            os.remove(path)
+
+    def _ingest_csv(self, path: str, chunk_rows: int, state: "_TableState"):
+        with pd.read_csv(
+            path, dtype=str, keep_default_na=False, na_values=[COPY_NULL], chunksize=chunk_rows,
+        ) as reader:
+            for chunk in reader:
+                state.add(chunk)
+
+    async def _read_partitioned(
+        self, pool, table: _Table, where: str, args: list, partition_key: str, partitions: int,
+        mode: str, fetch_size: int, state: "_TableState",
+    ):
+        """Split [min, max] of a numeric or date/time key into ranges read concurrently."""
+        col = _ident(partition_key)
+        async with pool.acquire() as conn:
+            lo, hi = await conn.fetchrow(
+                f"SELECT min({col}), max({col}) FROM {table.qualified}{where}", *args,
+            )
+        bounds = _split_range(lo, hi, partitions)
+        if len(bounds) < 2:
+            await self._read(pool, table, where, args, mode, fetch_size, state)
+            return
+
+        reads = []
+        for i in range(len(bounds) - 1):
+            n = len(args)
+            upper = "<=" if i == len(bounds) - 2 else "<"
+            clause = f"{col} >= ${n + 1} AND {col} {upper} ${n + 2}"
+            part_where = f"{where} AND {clause}" if where else f" WHERE {clause}"
+            part_args = args + [bounds[i], bounds[i + 1]]
+            reads.append(self._read(pool, table, part_where, part_args, mode, fetch_size, state))
+        # NULL keys fall outside every range
+        null_where = f"{where} AND {col} IS NULL" if where else f" WHERE {col} IS NULL"
+        reads.append(self._read(pool, table, null_where, args, "cursor", fetch_size, state))
+        log.info(
+            "postgres.partitioned_read", table=table.name, key=partition_key,
+            partitions=len(bounds) - 1,
+        )
+        await asyncio.gather(*reads)
+
+
+class _TableState:
+    """Per-table sink shared by concurrent partition reads; chunks are folded in under a lock."""
+
+    def __init__(
+        self, writer: SnapshotWriter, types: dict[str, str], cursor_column: Optional[str],
+        key: Optional[str],
+    ):
+        self.writer = writer
+        self.types = types
+        self.cursor_column = cursor_column
+        self.key = key
+        self.profiler = IncrementalProfiler()
+        self.sample = ReservoirSample(size=200)
+        self.rows = 0
+        self.ids: set = set()
+        self.max_cursor = None
+        self._lock = threading.Lock()
+
+    def add(self, df: pd.DataFrame):
+        df = _coerce(df, self.types)
+        with self._lock:
+            self.writer.write(df)
+            self.profiler.update(df)
+            self.sample.update(df)
+            self.rows += len(df)
+            if self.key:
+                self.ids.update(df[self.key].dropna().tolist())
+            if self.cursor_column:
+                latest = df[self.cursor_column].max()
+                if pd.notna(latest) and (self.max_cursor is None or latest > self.max_cursor):
+                    self.max_cursor = latest
+
+
+def _coerce(df: pd.DataFrame, types: dict[str, str]) -> pd.DataFrame:
+    """
+    Column dtypes from the Postgres types, for both COPY text and cursor values.
+    Every other type is text, as COPY returns it: cursor mode gets asyncpg's
+    Python objects (UUID, IPv4Address, bytes, ...), which are converted so both
+    modes write the same snapshot schema.
+    """
+    for col in df.columns:
+        udt = types.get(col)
+        if udt in NUMERIC_TYPES:
+            df[col] = pd.to_numeric(df[col])
+        elif udt == "bool" and df[col].dtype == object:
+            flags = {"t": True, "f": False, True: True, False: False}
+            df[col] = df[col].map(flags).astype("boolean")
+        elif udt == "timestamptz":
+            df[col] = pd.to_datetime(df[col], utc=True)
+        elif udt in ("timestamp", "date"):
+            df[col] = pd.to_datetime(df[col])
+        elif df[col].dtype == object:
+            df[col] = df[col].map(_pg_text, na_action="ignore")
+    return df
+
+
+def _pg_text(value) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\x" + bytes(value).hex()  # bytea's hex output format
+    return str(value)
+
+
+def _split_range(lo, hi, parts: int) -> list:
+    """parts+1 ascending boundaries over [lo, hi] (fewer when the range is narrow)."""
+    if lo is None or hi is None:
+        return []
+    if lo == hi or parts < 2:
+        return [lo, hi]
+    if isinstance(lo, int):
+        bounds = [lo + (hi - lo) * i // parts for i in range(parts + 1)]
+    elif isinstance(lo, (float, Decimal, datetime, date)):
+        bounds = [lo + (hi - lo) * i / parts for i in range(parts + 1)]
+    else:
+        raise ValueError(f"partition_key must be numeric or date/time, got {type(lo).__name__}")
+    return sorted(set(bounds))
+
+
+def _watermark_value(value) -> str:
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    return str(value)
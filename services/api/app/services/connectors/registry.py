@@ -16,19 +16,23 @@ class ConnectorRegistry:
 
     @classmethod
     def get(cls, connector_type: ConnectorType):
+        cls._load()
         impl = cls._implementations.get(connector_type)
         if not impl:
             raise ValueError(f"No connector implementation for: {connector_type}")
         return impl()
 
     @classmethod
-    def catalog(cls) -> list[dict]:
-        from app.services.connectors import (
+    def _load(cls):
+        # Implementations register themselves on import
+        from app.services.connectors import (  # noqa: F401
             csv_connector, postgres_connector, mongo_connector,
-            unstructured_connector, snowflake_connector,
-            salesforce_connector, stripe_connector, hubspot_connector,
-            bigquery_connector, segment_connector, zendesk_connector
+            unstructured_connector, salesforce_connector,
         )
+
+    @classmethod
+    def catalog(cls) -> list[dict]:
+        cls._load()
         return [
             {"type": "csv", "name": "CSV / Excel", "category": "file", "tier": 0, "auth": "none"},
             {"type": "postgres", "name": "PostgreSQL", "category": "database", "tier": 0, "auth": "connection_string"},
@@ -0,0 +1,54 @@
+"""
+Sample cache — Data Explorer previews keyed on a connector's latest successful sync.
+
+Entries are tagged with the SyncRun id they were read from, so a newer sync
+makes them stale even on workers that never saw the invalidation; execute_sync
+also evicts locally to free memory straight away.
+"""
+from collections import OrderedDict
+from typing import Optional
+import pandas as pd
+
+from app.core.config import settings
+
+
+def frame_to_sample(df: pd.DataFrame) -> dict:
+    """JSON-safe {"data", "columns"} payload (NaN/NaT become null)."""
+    clean = df.astype(object).where(df.notna(), None)
+    return {"data": clean.to_dict(orient="records"), "columns": [str(c) for c in df.columns]}
+
+
+class SampleCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[
+            tuple[str, Optional[str]], tuple[Optional[str], dict]
+        ] = OrderedDict()
+
+    def get(
+        self, connector_id: str, run_id: Optional[str], limit: int, table: Optional[str] = None,
+    ) -> Optional[dict]:
+        entry = self._entries.get((connector_id, table))
+        if entry is None:
+            return None
+        cached_run, sample = entry
+        # Usable if it came from the same run and holds enough rows (or every row there is)
+        if cached_run != run_id or (len(sample["data"]) < limit and not sample.get("complete")):
+            return None
+        self._entries.move_to_end((connector_id, table))
+        return {**sample, "data": sample["data"][:limit], "cached": True}
+
+    def set(
+        self, connector_id: str, run_id: Optional[str], sample: dict, table: Optional[str] = None,
+    ):
+        self._entries[(connector_id, table)] = (run_id, sample)
+        self._entries.move_to_end((connector_id, table))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, connector_id: str):
+        for key in [k for k in self._entries if k[0] == connector_id]:
+            del self._entries[key]
+
+
+sample_cache = SampleCache(max_entries=settings.SAMPLE_CACHE_MAX_ENTRIES)
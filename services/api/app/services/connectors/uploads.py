@@ -0,0 +1,162 @@
+"""
+Upload staging — streams a multipart file upload straight to STAGING_DIR.
+
+The request body is parsed as it arrives instead of being spooled by the
+form parser first, so each byte is written to disk once. Writes and hashing
+run in a worker thread, and the finished file is stored content-addressed
+under uploads/<sha256><ext>: uploading a file that is already staged (by any
+connector) keeps the existing copy and discards the new one.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+import structlog
+from fastapi import HTTPException, Request
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.config import settings
+
+log = structlog.get_logger()
+
+# Request body schema for OpenAPI, since the route reads the stream itself
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    },
+}
+
+
+@dataclass
+class StagedUpload:
+    filename: str
+    path: str
+    sha256: str
+    size_bytes: int
+    deduplicated: bool
+
+
+class _PartEvents:
+    """Collects MultipartParser callbacks; the parser is sync, the writes are not."""
+
+    def __init__(self):
+        self.events: list[tuple[str, object]] = []
+        self._headers: dict[bytes, bytes] = {}
+        self._field = b""
+        self._value = b""
+        self._data: list[bytes] = []
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": lambda data, start, end: self._append("_field", data[start:end]),
+            "on_header_value": lambda data, start, end: self._append("_value", data[start:end]),
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": lambda: self.events.append(("headers", self._headers)),
+            "on_part_data": lambda data, start, end: self._data.append(data[start:end]),
+            "on_part_end": self._on_part_end,
+        }
+
+    def drain(self) -> list[tuple[str, object]]:
+        # Data is flushed per network chunk so one write covers many callbacks
+        self._flush_data()
+        events, self.events = self.events, []
+        return events
+
+    def _append(self, attr: str, data: bytes):
+        setattr(self, attr, getattr(self, attr) + data)
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field, self._value = b"", b""
+
+    def _on_part_end(self):
+        self._flush_data()
+        self.events.append(("end", None))
+
+    def _flush_data(self):
+        if self._data:
+            self.events.append(("data", b"".join(self._data)))
+            self._data = []
+
+
+def _write(f, hasher, data: bytes):
+    hasher.update(data)
+    f.write(data)
+
+
+def _finalize(tmp_path: str, final_path: str) -> bool:
+    """Move the upload into place; False if identical content was already staged."""
+    if os.path.exists(final_path):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, final_path)
+    return True
+
+
+async def stage_upload(request: Request, field: str = "file") -> StagedUpload:
+    """Stream the `field` file part of a multipart request into the staging area."""
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+        raise HTTPException(400, "Expected a multipart/form-data upload")
+
+    upload_dir = os.path.join(settings.STAGING_DIR, "uploads")
+    os.makedirs(upload_dir, exist_ok=True)
+    tmp_path = os.path.join(upload_dir, f".{uuid.uuid4()}.part")
+    parts = _PartEvents()
+    parser = MultipartParser(params[b"boundary"], parts.callbacks())
+    hasher = hashlib.sha256()
+    f = None
+    filename: Optional[str] = None
+    size = 0
+    state = "seeking"  # -> "writing" while inside our part -> "done"
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, payload in parts.drain():
+                if kind == "headers" and state == "seeking":
+                    _, disposition = parse_options_header(payload.get(b"content-disposition", b""))
+                    name = disposition.get(b"name", b"").decode()
+                    if name == field and b"filename" in disposition:
+                        filename = disposition[b"filename"].decode("utf-8", "replace")
+                        f = await asyncio.to_thread(open, tmp_path, "wb")
+                        state = "writing"
+                elif kind == "data" and state == "writing":
+                    await asyncio.to_thread(_write, f, hasher, payload)
+                    size += len(payload)
+                elif kind == "end" and state == "writing":
+                    state = "done"
+        parser.finalize()
+        if state != "done":
+            raise HTTPException(400, f"Missing file field '{field}'")
+        await asyncio.to_thread(f.close)
+        f = None
+
+        sha256 = hasher.hexdigest()
+        ext = os.path.splitext(filename)[1].lower() or ".csv"
+        final_path = os.path.join(upload_dir, f"{sha256}{ext}")
+        created = await asyncio.to_thread(_finalize, tmp_path, final_path)
+    except BaseException:
+        if f is not None:
+            f.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    log.info(
+        "upload.staged", filename=filename, bytes=size, sha256=sha256, deduplicated=not created,
+    )
+    return StagedUpload(
+        filename=filename, path=final_path, sha256=sha256, size_bytes=size,
+        deduplicated=not created,
+    )
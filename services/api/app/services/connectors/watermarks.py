@@ -0,0 +1,46 @@
+"""
+Watermark store — per-connector, per-table high-water marks for incremental syncs.
+
+Connectors receive the stored marks as `watermarks={table: value}` and return
+updated ones under "watermarks" in their sync result; execute_sync persists
+them alongside the SyncRun that produced them.
+"""
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import SyncWatermark
+
+
+async def load_watermarks(db: AsyncSession, connector_id: str) -> dict[str, dict]:
+    result = await db.execute(
+        select(SyncWatermark).where(SyncWatermark.connector_id == connector_id)
+    )
+    return {wm.table_name: dict(wm.value or {}) for wm in result.scalars()}
+
+
+async def save_watermarks(
+    db: AsyncSession, connector_id: str, run_id: str, watermarks: dict[str, dict],
+):
+    if not watermarks:
+        return
+    result = await db.execute(
+        select(SyncWatermark).where(
+            SyncWatermark.connector_id == connector_id,
+            SyncWatermark.table_name.in_(list(watermarks)),
+        )
+    )
+    existing = {wm.table_name: wm for wm in result.scalars()}
+    for table, value in watermarks.items():
+        wm = existing.get(table)
+        if wm is None:
+            db.add(SyncWatermark(
+                connector_id=connector_id, table_name=table, value=value, sync_run_id=run_id,
+            ))
+        else:
+            wm.value = dict(value)
+            wm.sync_run_id = run_id
+
+
+async def clear_watermarks(db: AsyncSession, connector_id: str):
+    """Forget all marks so the next sync is a full one."""
+    await db.execute(delete(SyncWatermark).where(SyncWatermark.connector_id == connector_id))
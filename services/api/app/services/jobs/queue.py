@@ -0,0 +1,396 @@
+"""
+Background jobs — durable, queued execution for long-running work.
+
+Routes dispatch work by name, e.g. `await jobs.enqueue("connector.sync", args=[...])`.
+Every job is a row in the `jobs` table (status, attempts, progress, result), so
+it can be polled at /jobs/{id}, cancelled, and picked up again after a restart.
+
+Backends (JOBS_BACKEND):
+  memory  asyncio workers inside this process, JOB_QUEUE_CONCURRENCY per queue.
+          Jobs a crash left queued or running are re-dispatched at startup.
+          Also the broker for tests.
+  celery  tasks go through Redis to `celery -A app.worker.celery_app worker`;
+          late acks redeliver the work of a worker that died mid-job.
+
+Both execute a job through run_job(): retries with jittered exponential
+backoff up to the job type's max_attempts, cancellation and progress via
+report_job_progress() from anywhere inside the job.
+
+A running job holds a lease (`lease_expires_at`) that its watchdog renews.
+Another worker only takes over a "running" job — after a restart, or when
+the broker redelivers it — once that lease has lapsed; until then it checks
+back when the lease is due to expire.
+
+JobQueue.cancel sets `cancel_requested` and publishes on the job's event-bus
+channel, which the watchdog listens on; each lease renewal also reads the flag
+back, so a missed notification delays a cancel by at most a renewal interval.
+"""
+import asyncio
+import contextvars
+import importlib
+import json
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+import structlog
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.db.models import Job
+from app.services.llm.limiter import llm_lane
+from app.services.orchestration.event_bus import event_bus, job_channel
+
+log = structlog.get_logger()
+
+QUEUED, RUNNING, RETRYING = "queued", "running", "retrying"
+SUCCEEDED, FAILED, CANCELLED = "succeeded", "failed", "cancelled"
+FINAL_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+# Margin past another worker's lease expiry before checking the job again
+LEASE_RECHECK_SLACK_S = 1.0
+
+
+@dataclass(frozen=True)
+class JobType:
+    target: str  # "module:function", imported when the job runs
+    queue: str
+    max_attempts: int = 1
+    llm_lane: str = "normal"  # admission priority of the job's LLM calls (see llm.limiter)
+
+
+# Jobs that write their own run records (sync runs, sessions, workflow runs) don't
+# retry on error: they mark the record failed themselves. Their extra attempts only
+# cover a worker dying mid-run; a session picks up from its last checkpointed step.
+JOB_TYPES: dict[str, JobType] = {
+    "session.pipeline": JobType(
+        "app.api.v1.sessions:run_supervisor_pipeline", "sessions", max_attempts=2,
+    ),
+    "connector.sync": JobType("app.api.v1.connectors:execute_sync", "syncs", max_attempts=2),
+    "semantic.mapping": JobType(
+        "app.api.v1.semantic:run_mapping_inference", "mapping",
+        max_attempts=3, llm_lane="background",
+    ),
+    "semantic.discover": JobType(
+        "app.api.v1.semantic:run_ontology_discovery", "mapping",
+        max_attempts=3, llm_lane="background",
+    ),
+    "modeling.automl": JobType(
+        "app.api.v1.api_routes:run_automl", "automl", max_attempts=2, llm_lane="background",
+    ),
+    "workflow.run": JobType(
+        "app.services.orchestration.workflow_engine:execute_workflow", "workflows",
+    ),
+}
+
+_current_job: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_job", default=None,
+)
+
+
+def current_job_id() -> Optional[str]:
+    return _current_job.get()
+
+
+async def report_job_progress(**fields):
+    """Record progress on the job this code is running under; a no-op outside a job."""
+    job_id = _current_job.get()
+    if job_id is None:
+        return
+    async with AsyncSessionLocal() as db:
+        job = await db.get(Job, job_id)
+        if job is not None:
+            job.progress = {**fields, "updated_at": _now().isoformat()}
+            await db.commit()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _lease_left(job: Job) -> float:
+    """Seconds until a running job's lease lapses (0 when it already has)."""
+    expires = job.lease_expires_at
+    if expires is None:
+        return 0.0
+    if expires.tzinfo is None:  # SQLite hands back naive UTC
+        expires = expires.replace(tzinfo=timezone.utc)
+    return max(0.0, (expires - _now()).total_seconds())
+
+
+def _resolve(target: str) -> Callable:
+    module, _, attr = target.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+def _jsonable(value: Any) -> Any:
+    if value is None:
+        return None
+    value = json.loads(json.dumps(value, default=str))
+    return value if isinstance(value, dict) else {"value": value}
+
+
+def _retry_delay(attempt: int) -> float:
+    base = min(settings.JOB_RETRY_BACKOFF_S * 2 ** (attempt - 1), settings.JOB_RETRY_BACKOFF_MAX_S)
+    return base * random.uniform(0.5, 1.5)
+
+
+async def _finish(job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+    async with AsyncSessionLocal() as db:
+        job = await db.get(Job, job_id)
+        job.status = status
+        job.result = _jsonable(result)
+        job.error = error
+        job.lease_expires_at = None
+        if status in FINAL_STATUSES:
+            job.finished_at = _now()
+        await db.commit()
+
+
+async def _watch(job_id: str, attempt: int, task: asyncio.Task, cancelled: list):
+    """Keep the job's lease renewed, and cancel its task once cancellation is requested."""
+
+    def cancel():
+        # JobQueue.cancel may have cancelled it in-process already; a second
+        # cancel would interrupt the job's own cleanup
+        if not cancelled:
+            cancelled.append(True)
+            task.cancel()
+
+    async with event_bus.subscribe(job_channel(job_id)) as sub:
+        while not task.done():
+            event = await sub.get(timeout=settings.JOB_LEASE_S / 3)
+            if event is not None:
+                if event.get("type") == "cancel":
+                    cancel()
+                    return
+                continue
+            # One statement, so it never holds a read lock while waiting to write
+            async with AsyncSessionLocal() as db:
+                cancel_requested = await db.scalar(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == RUNNING, Job.attempts == attempt)
+                    .values(lease_expires_at=_now() + timedelta(seconds=settings.JOB_LEASE_S))
+                    .returning(Job.cancel_requested)
+                )
+                await db.commit()
+            if cancel_requested is None:
+                log.warning("job.lease_lost", job_id=job_id, attempt=attempt)
+            elif cancel_requested:
+                cancel()
+                return
+
+
+async def run_job(job_id: str) -> Optional[float]:
+    """
+    Run one attempt of a job. Returns the delay before the next attempt (or,
+    while another worker's lease on the job is live, before checking again),
+    or None when done.
+    """
+    async with AsyncSessionLocal() as db:
+        job = await db.get(Job, job_id)
+        if job is None or job.status in FINAL_STATUSES:
+            return None
+        if job.cancel_requested:
+            job.status, job.finished_at = CANCELLED, _now()
+            await db.commit()
+            return None
+        if job.status == RUNNING:
+            lease_left = _lease_left(job)
+            if lease_left:
+                log.info(
+                    "job.leased_elsewhere", job_id=job_id, name=job.name,
+                    lease_left_s=round(lease_left, 1),
+                )
+                return lease_left + LEASE_RECHECK_SLACK_S
+            if job.attempts >= job.max_attempts:
+                # The process running its last attempt died
+                job.status, job.error, job.finished_at = FAILED, "Interrupted", _now()
+                await db.commit()
+                log.error("job.interrupted", job_id=job_id, name=job.name)
+                return None
+        name, args, kwargs = job.name, job.args or [], job.kwargs or {}
+        attempt, max_attempts = job.attempts + 1, job.max_attempts
+        # Claim the attempt only if no other worker did since the read above
+        now = _now()
+        claimed = await db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == job.status, Job.attempts == attempt - 1)
+            .values(
+                status=RUNNING, attempts=attempt, started_at=now,
+                lease_expires_at=now + timedelta(seconds=settings.JOB_LEASE_S),
+            )
+        )
+        await db.commit()
+        if not claimed.rowcount:
+            log.info("job.claimed_elsewhere", job_id=job_id, name=name)
+            return None
+
+    log.info("job.start", job_id=job_id, name=name, attempt=attempt)
+    spec = JOB_TYPES[name]
+    token, lane_token = _current_job.set(job_id), llm_lane.set(spec.llm_lane)
+    try:
+        task = asyncio.create_task(_resolve(spec.target)(*args, **kwargs))
+    finally:
+        _current_job.reset(token)
+        llm_lane.reset(lane_token)
+    cancelled: list = []
+    watchdog = asyncio.create_task(_watch(job_id, attempt, task, cancelled))
+    jobs.running[job_id] = (task, cancelled)
+    try:
+        result = await task
+    except asyncio.CancelledError:
+        if not cancelled:
+            raise  # the worker is shutting down; the job stays "running" until its lease lapses
+        log.info("job.cancelled", job_id=job_id, name=name)
+        await _finish(job_id, CANCELLED, error="Cancelled")
+        return None
+    except Exception as e:
+        if attempt < max_attempts:
+            delay = _retry_delay(attempt)
+            log.warning(
+                "job.retry", job_id=job_id, name=name, attempt=attempt,
+                delay_s=round(delay, 1), error=str(e),
+            )
+            await _finish(job_id, RETRYING, error=str(e))
+            return delay
+        log.error("job.failed", job_id=job_id, name=name, attempt=attempt, error=str(e))
+        await _finish(job_id, FAILED, error=str(e))
+        return None
+    finally:
+        watchdog.cancel()
+        jobs.running.pop(job_id, None)
+    log.info("job.done", job_id=job_id, name=name)
+    await _finish(job_id, SUCCEEDED, result=result)
+    return None
+
+
+class JobQueue:
+    def __init__(self, backend: str = "memory"):
+        self.backend = backend
+        self.running: dict[str, tuple[asyncio.Task, list]] = {}
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._workers: list[asyncio.Task] = []
+        self._delayed: set[asyncio.Task] = set()
+
+    async def enqueue(
+        self, name: str, args: Optional[list] = None, kwargs: Optional[dict] = None,
+        job_id: Optional[str] = None,
+    ) -> str:
+        """Persist a job and hand it to the backend. Arguments must be JSON-serializable."""
+        spec = JOB_TYPES[name]
+        job = Job(
+            id=job_id or str(uuid.uuid4()), name=name, queue=spec.queue,
+            args=json.loads(json.dumps(list(args or []), default=str)),
+            kwargs=json.loads(json.dumps(kwargs or {}, default=str)),
+            max_attempts=spec.max_attempts,
+        )
+        async with AsyncSessionLocal() as db:
+            db.add(job)
+            await db.commit()
+        self._dispatch(job.id, spec.queue)
+        log.info("job.queued", job_id=job.id, name=name, queue=spec.queue)
+        return job.id
+
+    async def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Request cancellation. Queued jobs never start; running ones are cancelled at
+        their next await.
+        """
+        async with AsyncSessionLocal() as db:
+            job = await db.get(Job, job_id)
+            if job is None or job.status in FINAL_STATUSES:
+                return job
+            job.cancel_requested = True
+            running = job.status == RUNNING
+            if job.status in (QUEUED, RETRYING):
+                job.status, job.finished_at = CANCELLED, _now()
+            await db.commit()
+        local = self.running.get(job_id)
+        if local is not None:
+            task, cancelled = local
+            cancelled.append(True)
+            task.cancel()
+        elif running:
+            # Running in another process: its watchdog listens on the job's channel
+            await event_bus.publish(job_channel(job_id), {"type": "cancel"})
+        return job
+
+    async def execute(self, job_id: str, queue: str):
+        """Run an attempt and schedule the retry, if any. Called by the backend's workers."""
+        delay = await run_job(job_id)
+        if delay is not None:
+            self._dispatch(job_id, queue, delay)
+
+    async def start(self):
+        """
+        Memory backend: re-dispatch jobs that were queued, or interrupted mid-run, before a restart.
+        Running jobs another process still holds the lease on are only re-checked when it lapses.
+        """
+        if self.backend != "memory":
+            return
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Job.id, Job.queue).where(Job.status.in_((QUEUED, RUNNING, RETRYING)))
+            )
+            pending = result.all()
+        # run_job fails interrupted jobs that are out of attempts instead of re-running them
+        for job_id, queue in pending:
+            self._dispatch(job_id, queue)
+        if pending:
+            log.info("jobs.recovered", count=len(pending))
+
+    async def drain(self):
+        """Memory backend: wait until every queued job (and pending retry) has finished."""
+        while True:
+            await asyncio.gather(*(q.join() for q in self._queues.values()))
+            # Retries are scheduled before a job is marked done; wait for them to be re-queued
+            if not self._delayed:
+                return
+            await asyncio.gather(*self._delayed, return_exceptions=True)
+
+    async def aclose(self):
+        for task in [*self._workers, *self._delayed]:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._delayed, return_exceptions=True)
+        self._workers.clear()
+        self._delayed.clear()
+        self._queues.clear()
+
+    def _dispatch(self, job_id: str, queue: str, delay: float = 0.0):
+        if self.backend == "celery":
+            from app.worker import run_job_task
+            run_job_task.apply_async((job_id, queue), queue=queue, countdown=delay or None)
+            return
+        q = self._queue(queue)
+        if not delay:
+            q.put_nowait(job_id)
+            return
+        task = asyncio.create_task(self._put_later(q, job_id, delay))
+        self._delayed.add(task)
+        task.add_done_callback(self._delayed.discard)
+
+    async def _put_later(self, q: asyncio.Queue, job_id: str, delay: float):
+        await asyncio.sleep(delay)
+        q.put_nowait(job_id)
+
+    def _queue(self, queue: str) -> asyncio.Queue:
+        if queue not in self._queues:
+            self._queues[queue] = asyncio.Queue()
+            for _ in range(settings.JOB_QUEUE_CONCURRENCY.get(queue, 1)):
+                self._workers.append(asyncio.create_task(self._work(queue, self._queues[queue])))
+        return self._queues[queue]
+
+    async def _work(self, queue: str, q: asyncio.Queue):
+        while True:
+            job_id = await q.get()
+            try:
+                await self.execute(job_id, queue)
+            except Exception as e:
+                log.error("job.worker_error", job_id=job_id, queue=queue, error=str(e))
+            finally:
+                q.task_done()
+
+
+jobs = JobQueue(backend=settings.JOBS_BACKEND)
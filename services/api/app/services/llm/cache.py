@@ -0,0 +1,153 @@
+"""
+LLM response cache — content-addressed, two-tier (in-process LRU + optional Redis).
+
+Keys are a SHA-256 over everything that shapes a completion (provider, model,
+prompts, temperature, max_tokens, output schema), so identical requests from different
+agents or endpoints share a single upstream call.
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Optional
+import structlog
+
+from app.core.config import settings
+
+log = structlog.get_logger()
+
+
+def cache_key(
+    provider: str,
+    model: str,
+    system_prompt: Optional[str],
+    messages: list[dict],
+    temperature: float,
+    response_schema: Optional[type] = None,
+    json_mode: bool = False,
+    tools: Optional[list[dict]] = None,
+    max_tokens: Optional[int] = None,
+) -> str:
+    schema = response_schema.model_json_schema() if response_schema else None
+    payload = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "system": system_prompt,
+            "messages": messages,
+            "temperature": temperature,
+            "schema": schema,
+            "json_mode": json_mode,
+            "tools": tools,
+            "max_tokens": max_tokens,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """Size-bounded LRU with per-entry TTL, backed by an optional shared Redis tier."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._bytes = 0
+        self._redis = None
+        self.stats = {"hits": 0, "redis_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def is_eligible(self, agent_id: Optional[str], temperature: float) -> bool:
+        if agent_id in settings.LLM_CACHE_AGENTS:
+            return True
+        return temperature <= settings.LLM_CACHE_MAX_TEMPERATURE
+
+    def ttl_for(self, agent_id: Optional[str]) -> int:
+        return settings.LLM_CACHE_AGENTS.get(agent_id) or settings.LLM_CACHE_TTL_S
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return value
+            self._drop(key)
+
+        redis = self._redis_client()
+        if redis is not None:
+            try:
+                raw = await redis.get(f"llmcache:{key}")
+                if raw is not None:
+                    value = raw.decode() if isinstance(raw, bytes) else raw
+                    ttl = await redis.ttl(f"llmcache:{key}")
+                    self._put_local(key, value, max(ttl, 1))
+                    self.stats["redis_hits"] += 1
+                    return value
+            except Exception as e:
+                log.warning("llm.cache.redis_get_failed", error=str(e))
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: str, ttl: int):
+        if not value:
+            return
+        self._put_local(key, value, ttl)
+        self.stats["stores"] += 1
+        redis = self._redis_client()
+        if redis is not None:
+            try:
+                await redis.set(f"llmcache:{key}", value, ex=ttl)
+            except Exception as e:
+                log.warning("llm.cache.redis_set_failed", error=str(e))
+
+    async def aclose(self):
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["redis_hits"] + self.stats["misses"]
+        hit_rate = (self.stats["hits"] + self.stats["redis_hits"]) / lookups if lookups else 0.0
+        return {
+            **self.stats, "entries": len(self._entries), "bytes": self._bytes,
+            "hit_rate": round(hit_rate, 4),
+        }
+
+    def _put_local(self, key: str, value: str, ttl: int):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.stats["evictions"] += 1
+
+    def _drop(self, key: str):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def _redis_client(self):
+        if not settings.LLM_CACHE_REDIS:
+            return None
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(settings.REDIS_URL)
+        return self._redis
+
+
+response_cache = LLMResponseCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    max_bytes=settings.LLM_CACHE_MAX_BYTES,
+)
@@ -1,20 +1,78 @@
 """
-LLM Client — abstraction over OpenAI and Anthropic.
+LLM Client — abstraction over OpenAI, Anthropic and Gemini.
 Supports: chat completion, streaming, function/tool calling, JSON mode.
 """
+import asyncio
 import json
-from typing import Optional, AsyncGenerator
+import re
+import time
+from typing import Any, Callable, Optional, AsyncGenerator
 import structlog
 
 from app.core.config import settings
+from app.services.llm.pool import client_pool
+from app.services.llm.cache import response_cache, cache_key
+from app.services.llm.partial_json import PartialJSON
+from app.services.llm.local_provider import local_llm
+from app.services.llm.limiter import (
+    llm_limiter, llm_lane, estimate_tokens, is_rate_limited, retry_after,
+)
+from app.services.llm.resilience import failover_chain, hedged, latency_tracker, retrying
 
 log = structlog.get_logger()
 
 
+class _Throttle:
+    """Hands streamed partial results to a callback at most every LLM_STREAM_INTERVAL_S."""
+
+    def __init__(self, callback: Callable[[Any], Any]):
+        self.callback = callback
+        self._last: Optional[float] = None
+
+    def due(self) -> bool:
+        return self._last is None or time.monotonic() - self._last >= settings.LLM_STREAM_INTERVAL_S
+
+    async def emit(self, value: Any):
+        self._last = time.monotonic()
+        try:
+            result = self.callback(value)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            # A broken consumer must not fail the completion it is watching
+            log.warning("llm.partial_callback_failed", error=str(e))
+
+
+async def _open_stream(
+    stream: AsyncGenerator[str, None],
+) -> tuple[AsyncGenerator[str, None], Optional[str]]:
+    """Start a stream: returns it with its first delta (None if it was empty)."""
+    try:
+        return stream, await stream.__anext__()
+    except StopAsyncIteration:
+        return stream, None
+    except BaseException:
+        await stream.aclose()
+        raise
+
+
 class LLMClient:
-    """Unified client for OpenAI and Anthropic APIs."""
+    """Unified client for OpenAI, Anthropic and Gemini APIs."""
 
-    def __init__(self, provider: Optional[str] = None, model: Optional[str] = None, agent_id: Optional[str] = None):
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        cache: Optional[bool] = None,
+        on_partial: Optional[Callable[[Any], Any]] = None,
+        priority: Optional[str] = None,
+    ):
+        self.agent_id = agent_id
+        self.cache = cache  # None = decide per call from LLM_CACHE_* settings
+        self.priority = priority  # admission lane; None = the caller's (see llm.limiter)
+        # Default for chat/json_chat: stream, and report the response so far to this callback
+        self.on_partial = on_partial
         if agent_id and getattr(settings, "MODEL_ROUTING", {}).get(agent_id):
             route = settings.MODEL_ROUTING.get(agent_id, {})
             self.provider = provider or route.get("provider", settings.DEFAULT_LLM_PROVIDER)
@@ -22,6 +80,8 @@ class LLMClient:
         else:
             self.provider = provider or settings.DEFAULT_LLM_PROVIDER
             self.model = model or settings.DEFAULT_LLM_MODEL
+        if settings.LLM_PROVIDER_OVERRIDE:
+            self.provider = settings.LLM_PROVIDER_OVERRIDE
 
     async def chat(
         self,
@@ -32,23 +92,296 @@ class LLMClient:
         response_schema: Optional[type] = None,
         temperature: float = 0.2,
         max_tokens: int = 8192,
+        cache: Optional[bool] = None,
+        on_partial: Optional[Callable[[str], Any]] = None,
+    ) -> str:
+        """
+        Send a chat completion request and return the text response.
+        With `on_partial` (default: the client's), the response is streamed and the
+        callback gets the text received so far; tool calls are never streamed.
+        """
+        on_partial = on_partial or self.on_partial
+        if on_partial and not tools:
+            emit, parts = _Throttle(on_partial), []
+            async for delta in self.stream_chat(
+                messages, system_prompt, json_mode, response_schema, temperature, max_tokens, cache,
+            ):
+                parts.append(delta)
+                if emit.due():
+                    await emit.emit("".join(parts))
+            text = "".join(parts)
+            await emit.emit(text)
+            return text
+
+        key = self._cache_key(
+            cache, messages, system_prompt, tools, json_mode, response_schema, temperature,
+            max_tokens,
+        )
+        if key:
+            cached = await response_cache.get(key)
+            if cached is not None:
+                log.info("llm.cache_hit", provider=self.provider, agent=self.agent_id)
+                return cached
+
+        text = await self._dispatch(
+            messages, system_prompt, tools, json_mode, response_schema, temperature, max_tokens,
+        )
+        if key and self._cacheable(text, json_mode or response_schema is not None):
+            await response_cache.set(key, text, response_cache.ttl_for(self.agent_id))
+        return text
+
+    async def stream_chat(
+        self,
+        messages: list[dict],
+        system_prompt: Optional[str] = None,
+        json_mode: bool = False,
+        response_schema: Optional[type] = None,
+        temperature: float = 0.2,
+        max_tokens: int = 8192,
+        cache: Optional[bool] = None,
+    ) -> AsyncGenerator[str, None]:
+        """Stream a chat completion as text deltas. A cached response arrives as one delta."""
+        key = self._cache_key(
+            cache, messages, system_prompt, None, json_mode, response_schema, temperature,
+            max_tokens,
+        )
+        if key:
+            cached = await response_cache.get(key)
+            if cached is not None:
+                log.info("llm.cache_hit", provider=self.provider, agent=self.agent_id)
+                yield cached
+                return
+
+        parts = []
+        async for delta in self._dispatch_stream(
+            messages, system_prompt, json_mode, response_schema, temperature, max_tokens,
+        ):
+            parts.append(delta)
+            yield delta
+        text = "".join(parts)
+        if key and self._cacheable(text, json_mode or response_schema is not None):
+            await response_cache.set(key, text, response_cache.ttl_for(self.agent_id))
+
+    def _cacheable(self, text: str, expects_json: bool) -> bool:
+        """
+        A JSON response is only cached if it parses; a malformed one would be
+        replayed for the whole TTL.
+        """
+        if not expects_json:
+            return True
+        try:
+            self._loads_json(text)
+        except ValueError:
+            log.info("llm.cache_skip_unparseable", provider=self.provider, agent=self.agent_id)
+            return False
+        return True
+
+    def _cache_key(
+        self, cache, messages, system_prompt, tools, json_mode, response_schema, temperature,
+        max_tokens,
+    ) -> Optional[str]:
+        use_cache = cache if cache is not None else self.cache
+        if use_cache is None:
+            use_cache = response_cache.is_eligible(self.agent_id, temperature)
+        if not use_cache:
+            return None
+        return cache_key(
+            self.provider, self.model, system_prompt, messages, temperature,
+            response_schema, json_mode, tools, max_tokens,
+        )
+
+    async def _dispatch(
+        self, messages, system_prompt, tools, json_mode, response_schema, temperature, max_tokens
+    ) -> str:
+        """One completion with retries, hedging and failover (see llm.resilience)."""
+        args = (messages, system_prompt, tools, json_mode, response_schema, temperature, max_tokens)
+        routes = self._routes()
+        for i, target in enumerate(routes):
+            try:
+                async for attempt in retrying():
+                    with attempt:
+                        return await hedged(
+                            lambda: target._attempt(*args),
+                            latency_tracker(target.provider, target.model, "chat"),
+                            hedge=self._hedges(),
+                        )
+            except Exception as e:
+                if i == len(routes) - 1:
+                    raise
+                self._log_failover(target, routes[i + 1], e)
+
+    async def _dispatch_stream(
+        self, messages, system_prompt, json_mode, response_schema, temperature, max_tokens
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream with retries, hedging and failover up to the first delta; later
+        errors propagate.
+        """
+        args = (messages, system_prompt, json_mode, response_schema, temperature, max_tokens)
+        routes = self._routes()
+        for i, target in enumerate(routes):
+            try:
+                async for attempt in retrying():
+                    with attempt:
+                        stream, first = await hedged(
+                            lambda: _open_stream(target._attempt_stream(*args)),
+                            latency_tracker(target.provider, target.model, "stream"),
+                            hedge=self._hedges(),
+                            discard=lambda opened: opened[0].aclose(),
+                        )
+                break
+            except Exception as e:
+                if i == len(routes) - 1:
+                    raise
+                self._log_failover(target, routes[i + 1], e)
+        if first is None:
+            return
+        try:
+            yield first
+            async for delta in stream:
+                yield delta
+        finally:
+            await stream.aclose()
+
+    def _routes(self) -> list["LLMClient"]:
+        chain = failover_chain(self.agent_id, self.provider, self.model)
+        return [self] + [
+            LLMClient(
+                provider=provider, model=model, agent_id=self.agent_id, cache=False,
+                priority=self.priority,
+            )
+            for provider, model in chain[1:]
+        ]
+
+    def _hedges(self) -> bool:
+        # Background work can wait; a duplicate would only spend rate budget
+        return (self.priority or llm_lane.get()) != "background"
+
+    def _log_failover(self, failed: "LLMClient", target: "LLMClient", error: Exception):
+        log.warning(
+            "llm.failover", agent=self.agent_id, failed=f"{failed.provider}:{failed.model}",
+            to=f"{target.provider}:{target.model}", error=str(error)[:200],
+        )
+
+    async def _attempt(
+        self, messages, system_prompt, tools, json_mode, response_schema, temperature, max_tokens
+    ) -> str:
+        """
+        One admitted provider call. A 429 throttles the provider and propagates;
+        _dispatch's retrying() re-queues the call.
+        """
+        reserve = self._reserve_tokens(messages, system_prompt, max_tokens)
+        async with llm_limiter.slot(self.provider, reserve, self.priority) as slot:
+            try:
+                text = await self._call(
+                    messages, system_prompt, tools, json_mode, response_schema, temperature,
+                    max_tokens,
+                )
+            except Exception as e:
+                if is_rate_limited(e):
+                    slot.throttled(retry_after(e))
+                raise
+            slot.completed(self._tokens_used(reserve, max_tokens, len(text)))
+            return text
+
+    async def _attempt_stream(
+        self, messages, system_prompt, json_mode, response_schema, temperature, max_tokens
+    ) -> AsyncGenerator[str, None]:
+        reserve = self._reserve_tokens(messages, system_prompt, max_tokens)
+        async with llm_limiter.slot(self.provider, reserve, self.priority) as slot:
+            chars = 0
+            try:
+                async for delta in self._call_stream(
+                    messages, system_prompt, json_mode, response_schema, temperature,
+                    max_tokens,
+                ):
+                    chars += len(delta)
+                    yield delta
+            except Exception as e:
+                if is_rate_limited(e):
+                    slot.throttled(retry_after(e))
+                raise
+            slot.completed(self._tokens_used(reserve, max_tokens, chars))
+
+    @staticmethod
+    def _reserve_tokens(messages, system_prompt, max_tokens) -> int:
+        prompt_chars = len(system_prompt or "")
+        prompt_chars += sum(len(str(m.get("content", ""))) for m in messages)
+        return estimate_tokens(prompt_chars) + min(max_tokens, settings.LLM_OUTPUT_TOKEN_ESTIMATE)
+
+    @staticmethod
+    def _tokens_used(reserve: int, max_tokens: int, response_chars: int) -> int:
+        # The reservation's output estimate, replaced by the response's actual length
+        output_estimate = min(max_tokens, settings.LLM_OUTPUT_TOKEN_ESTIMATE)
+        return reserve - output_estimate + estimate_tokens(response_chars)
+
+    async def _call(
+        self, messages, system_prompt, tools, json_mode, response_schema, temperature, max_tokens
     ) -> str:
-        """Send a chat completion request and return the text response."""
         if self.provider == "openai":
-            return await self._openai_chat(messages, system_prompt, tools, json_mode, response_schema, temperature, max_tokens)
+            return await self._openai_chat(
+                messages, system_prompt, tools, json_mode, response_schema, temperature, max_tokens,
+            )
+        elif self.provider == "anthropic":
+            return await self._anthropic_chat(
+                messages, system_prompt, tools, json_mode, temperature, max_tokens,
+            )
+        elif self.provider == "gemini":
+            return await self._gemini_chat(
+                messages, system_prompt, tools, json_mode, response_schema, temperature, max_tokens,
+            )
+        elif self.provider == "local":
+            return await local_llm.complete(
+                self.agent_id, messages, system_prompt, json_mode, response_schema,
+            )
+        else:
+            raise ValueError(f"Unknown provider: {self.provider}")
+
+    def _call_stream(
+        self, messages, system_prompt, json_mode, response_schema, temperature, max_tokens
+    ) -> AsyncGenerator[str, None]:
+        if self.provider == "openai":
+            return self._openai_stream(
+                messages, system_prompt, json_mode, response_schema, temperature, max_tokens,
+            )
         elif self.provider == "anthropic":
-            return await self._anthropic_chat(messages, system_prompt, tools, json_mode, temperature, max_tokens)
+            return self._anthropic_stream(messages, system_prompt, temperature, max_tokens)
         elif self.provider == "gemini":
-            return await self._gemini_chat(messages, system_prompt, tools, json_mode, response_schema, temperature, max_tokens)
+            return self._gemini_stream(
+                messages, system_prompt, json_mode, response_schema, temperature, max_tokens,
+            )
+        elif self.provider == "local":
+            return local_llm.stream(
+                self.agent_id, messages, system_prompt, json_mode, response_schema,
+            )
         else:
             raise ValueError(f"Unknown provider: {self.provider}")
 
     async def _openai_chat(
         self, messages, system_prompt, tools, json_mode, response_schema, temperature, max_tokens
     ) -> str:
-        from openai import AsyncOpenAI
-        client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        client = client_pool.openai(settings.OPENAI_API_KEY)
+        kwargs = self._openai_request(
+            messages, system_prompt, tools, json_mode, response_schema, temperature, max_tokens,
+        )
+        response = await client.chat.completions.create(**kwargs)
+        return response.choices[0].message.content or ""
+
+    async def _openai_stream(
+        self, messages, system_prompt, json_mode, response_schema, temperature, max_tokens
+    ) -> AsyncGenerator[str, None]:
+        client = client_pool.openai(settings.OPENAI_API_KEY)
+        kwargs = self._openai_request(
+            messages, system_prompt, None, json_mode, response_schema, temperature, max_tokens,
+        )
+        stream = await client.chat.completions.create(**kwargs, stream=True)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
 
+    def _openai_request(
+        self, messages, system_prompt, tools, json_mode, response_schema, temperature, max_tokens
+    ) -> dict:
         all_messages = []
         if system_prompt:
             all_messages.append({"role": "system", "content": system_prompt})
@@ -73,16 +406,26 @@ class LLMClient:
             }
         elif json_mode:
             kwargs["response_format"] = {"type": "json_object"}
-
-        response = await client.chat.completions.create(**kwargs)
-        return response.choices[0].message.content or ""
+        return kwargs
 
     async def _anthropic_chat(
         self, messages, system_prompt, tools, json_mode, temperature, max_tokens
     ) -> str:
-        from anthropic import AsyncAnthropic
-        client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+        client = client_pool.anthropic(settings.ANTHROPIC_API_KEY)
+        kwargs = self._anthropic_request(messages, system_prompt, tools, temperature, max_tokens)
+        response = await client.messages.create(**kwargs)
+        return response.content[0].text if response.content else ""
 
+    async def _anthropic_stream(
+        self, messages, system_prompt, temperature, max_tokens
+    ) -> AsyncGenerator[str, None]:
+        client = client_pool.anthropic(settings.ANTHROPIC_API_KEY)
+        kwargs = self._anthropic_request(messages, system_prompt, None, temperature, max_tokens)
+        async with client.messages.stream(**kwargs) as stream:
+            async for text in stream.text_stream:
+                yield text
+
+    def _anthropic_request(self, messages, system_prompt, tools, temperature, max_tokens) -> dict:
         kwargs = dict(
             model=self.model if "claude" in self.model else "claude-3-5-sonnet-20241022",
             messages=messages,
@@ -93,17 +436,40 @@ class LLMClient:
             kwargs["system"] = system_prompt
         if tools:
             kwargs["tools"] = tools
-
-        response = await client.messages.create(**kwargs)
-        return response.content[0].text if response.content else ""
+        return kwargs
 
     async def _gemini_chat(
         self, messages, system_prompt, tools, json_mode, response_schema, temperature, max_tokens
     ) -> str:
-        from google import genai
-        from google.genai import types
+        client = client_pool.gemini(settings.GEMINI_API_KEY)
+        contents, config = self._gemini_request(
+            messages, system_prompt, json_mode, response_schema, temperature, max_tokens,
+        )
+        response = await client.aio.models.generate_content(
+            model=self.model,
+            contents=contents,
+            config=config
+        )
+        return response.text
+
+    async def _gemini_stream(
+        self, messages, system_prompt, json_mode, response_schema, temperature, max_tokens
+    ) -> AsyncGenerator[str, None]:
+        client = client_pool.gemini(settings.GEMINI_API_KEY)
+        contents, config = self._gemini_request(
+            messages, system_prompt, json_mode, response_schema, temperature, max_tokens,
+        )
+        stream = await client.aio.models.generate_content_stream(
+            model=self.model, contents=contents, config=config,
+        )
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
 
-        client = genai.Client(api_key=settings.GEMINI_API_KEY)
+    def _gemini_request(
+        self, messages, system_prompt, json_mode, response_schema, temperature, max_tokens
+    ) -> tuple:
+        from google.genai import types
 
         contents = []
         for msg in messages:
@@ -136,34 +502,71 @@ class LLMClient:
             config.response_schema = schema_dict
         elif json_mode:
             config.response_mime_type = "application/json"
+        return contents, config
 
-        response = await client.aio.models.generate_content(
-            model=self.model,
-            contents=contents,
-            config=config
-        )
-        return response.text
+    async def json_chat(
+        self,
+        messages: list[dict],
+        system_prompt: str,
+        response_schema: Optional[type] = None,
+        on_partial: Optional[Callable[[Any], Any]] = None,
+        **kwargs,
+    ) -> dict:
+        """
+        Request a JSON response and parse it.
+        With `on_partial` (default: the client's), the response is streamed and the
+        callback gets the object parsed so far, e.g. a summary string as it grows.
+        """
+        on_partial = on_partial or self.on_partial
+        if on_partial and not kwargs.get("tools"):
+            raw = await self._stream_json(
+                messages, system_prompt, response_schema, on_partial, **kwargs,
+            )
+        else:
+            raw = await self.chat(messages, system_prompt=system_prompt, json_mode=True, response_schema=response_schema, **kwargs)
+        return self._parse_json(raw)
+
+    async def _stream_json(
+        self, messages, system_prompt, response_schema, on_partial, **kwargs
+    ) -> str:
+        emit, parser, last = _Throttle(on_partial), PartialJSON(), None
+        kwargs.pop("tools", None)
+        async for delta in self.stream_chat(
+            messages, system_prompt=system_prompt, json_mode=True, response_schema=response_schema,
+            **kwargs,
+        ):
+            parser.feed(delta)
+            if emit.due():
+                partial = parser.value()
+                if partial and partial != last:
+                    await emit.emit(partial)
+                    last = partial
+        final = parser.value()
+        if final is not None and final != last:
+            await emit.emit(final)
+        return parser.buffer
 
-    async def json_chat(self, messages: list[dict], system_prompt: str, response_schema: Optional[type] = None, **kwargs) -> dict:
-        """Request a JSON response and parse it."""
-        raw = await self.chat(messages, system_prompt=system_prompt, json_mode=True, response_schema=response_schema, **kwargs)
+    def _parse_json(self, raw: str) -> dict:
         try:
-            # Fallback 1: Markdown code block stripping
-            cleaned = raw.strip()
-            if "```json" in cleaned:
-                cleaned = cleaned.split("```json")[-1].split("```")[0].strip()
-            elif "```" in cleaned:
-                cleaned = cleaned.split("```")[-1].split("```")[0].strip()
-            
-            try:
-                return json.loads(cleaned)
-            except json.JSONDecodeError:
-                # Fallback 2: Regex find JSON block
-                import re
-                match = re.search(r'\{.*\}', cleaned, re.DOTALL)
-                if match:
-                    return json.loads(match.group())
-                raise
+            return self._loads_json(raw)
         except Exception as e:
             log.warning("llm.json_parse_failed", error=str(e), raw=raw[:200])
             return {"raw": raw, "error": "JSON parsing failed"}
+
+    @staticmethod
+    def _loads_json(raw: str):
+        # Fallback 1: Markdown code block stripping
+        cleaned = raw.strip()
+        if "```json" in cleaned:
+            cleaned = cleaned.split("```json")[-1].split("```")[0].strip()
+        elif "```" in cleaned:
+            cleaned = cleaned.split("```")[-1].split("```")[0].strip()
+
+        try:
+            return json.loads(cleaned)
+        except json.JSONDecodeError:
+            # Fallback 2: Regex find JSON block
+            match = re.search(r'\{.*\}', cleaned, re.DOTALL)
+            if match:
+                return json.loads(match.group())
+            raise
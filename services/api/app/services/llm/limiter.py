@@ -0,0 +1,267 @@
+"""
+LLM admission control — keeps the deployment's LLM traffic inside provider rate limits.
+
+Every provider call is admitted through `llm_limiter.slot(...)`, which waits
+until the provider has:
+  * request and token budget left (token buckets refilled per LLM_RATE_LIMITS
+    rpm/tpm; a call reserves its prompt plus LLM_OUTPUT_TOKEN_ESTIMATE tokens
+    and settles the difference once the response length is known),
+  * a free in-flight slot under its concurrency window, and
+  * a free slot under the process-wide LLM_MAX_CONCURRENCY.
+Waiters are served by priority lane, then in arrival order: calls made while
+serving an API request are "interactive" and go ahead of pipeline ("normal")
+and "background" jobs, which set their lane through `llm_lane`.
+
+The concurrency window is AIMD: it grows by ~1 per window of successful calls
+up to the configured cap and halves on a 429, which also pauses the provider
+for the Retry-After period. LLMClient retries throttled calls (see
+llm.resilience), which queue here again, so saturation shows up as queueing
+(see metrics()) instead of errors.
+
+The buckets live in each process, which gets a 1/LLM_PROCESS_COUNT share of
+every provider's rpm, tpm and concurrency. A process doesn't borrow the share
+of an idle one, so a deployment whose load sits on a few processes admits less
+than the provider allows; the 429 handling above covers a count set too low.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+import structlog
+
+from app.core.config import settings
+
+log = structlog.get_logger()
+
+LANES = ("interactive", "normal", "background")
+
+llm_lane: contextvars.ContextVar[str] = contextvars.ContextVar("llm_lane", default="interactive")
+
+
+def estimate_tokens(text_chars: int) -> int:
+    return text_chars // 4 + 1
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    # openai/anthropic set status_code on APIStatusError; google-genai sets code on APIError
+    return getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class _TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def give(self, amount: float):
+        # Settling an overestimate; underestimates go into debt and delay later calls
+        self.level = min(self.capacity, self.level + amount)
+
+
+class Slot:
+    """One admitted call; report how it went so the limiter can settle and adapt."""
+
+    def __init__(self, provider: "_ProviderLimiter", tokens: int):
+        self.provider = provider
+        self.tokens = tokens
+        self.outcome: Optional[str] = None
+        self.pause_s = 0.0
+
+    def completed(self, tokens_used: int):
+        self.outcome = "ok"
+        self.provider.tokens.give(self.tokens - tokens_used)
+
+    def throttled(self, pause_s: Optional[float] = None):
+        self.outcome = "throttled"
+        self.pause_s = pause_s if pause_s is not None else settings.LLM_RATE_LIMIT_BACKOFF_S
+
+
+class _ProviderLimiter:
+    def __init__(self, limiter: "LLMLimiter", name: str, rpm: float, tpm: float, concurrency: int):
+        self.limiter = limiter
+        self.name = name
+        self.requests = _TokenBucket(rpm)
+        self.tokens = _TokenBucket(tpm)
+        self.max_concurrency = concurrency
+        self.window = float(concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._waiters: list[tuple[int, int, int, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {"admitted": 0, "throttled": 0, "wait_s_total": 0.0, "wait_s_max": 0.0}
+
+    def queued(self) -> dict:
+        counts = dict.fromkeys(LANES, 0)
+        for lane, _, _, fut in self._waiters:
+            if not fut.done():
+                counts[LANES[lane]] += 1
+        return counts
+
+    async def acquire(self, lane: int, tokens: int):
+        started = time.monotonic()
+        if not self._waiters and self._wait_time(tokens) == 0:
+            self._take(tokens)
+        else:
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (lane, next(self.limiter.seq), tokens, fut))
+            self._schedule()
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    self._release()  # admitted just as the caller went away
+                raise
+        waited = time.monotonic() - started
+        self.stats["admitted"] += 1
+        self.stats["wait_s_total"] += waited
+        self.stats["wait_s_max"] = max(self.stats["wait_s_max"], waited)
+        if waited >= 1.0:
+            log.info(
+                "llm.admission_wait", provider=self.name, lane=LANES[lane],
+                wait_s=round(waited, 2),
+            )
+
+    def release(self, slot: Slot):
+        if slot.outcome == "ok":
+            self.window = min(float(self.max_concurrency), self.window + 1.0 / self.window)
+        elif slot.outcome == "throttled":
+            self.stats["throttled"] += 1
+            now = time.monotonic()
+            # Calls in flight when the limit hit fail together: halve once per pause, not per 429
+            if now - self._last_decrease >= slot.pause_s:
+                self.window = max(1.0, self.window / 2)
+                self._last_decrease = now
+            self.paused_until = max(self.paused_until, now + slot.pause_s)
+            log.warning(
+                "llm.throttled", provider=self.name, window=round(self.window, 1),
+                pause_s=slot.pause_s,
+            )
+        self._release()
+
+    def _release(self):
+        self.in_flight -= 1
+        self.limiter.in_flight -= 1
+        self.limiter.wake_all()
+
+    def _wait_time(self, tokens: int) -> Optional[float]:
+        """Seconds until a call of `tokens` fits; None while it waits on a concurrency slot."""
+        if self.in_flight >= int(self.window):
+            return None
+        if self.limiter.in_flight >= settings.LLM_MAX_CONCURRENCY:
+            return None
+        return max(
+            self.paused_until - time.monotonic(),
+            self.requests.wait_time(1),
+            self.tokens.wait_time(tokens),
+            0.0,
+        )
+
+    def _take(self, tokens: int):
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        self.in_flight += 1
+        self.limiter.in_flight += 1
+
+    def _schedule(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiters:
+            lane, _, tokens, fut = self._waiters[0]
+            if fut.done():
+                heapq.heappop(self._waiters)
+                continue
+            wait = self._wait_time(tokens)
+            if wait is None:
+                return  # woken by the next release
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._schedule)
+                return
+            heapq.heappop(self._waiters)
+            self._take(tokens)
+            fut.set_result(None)
+
+
+class LLMLimiter:
+    def __init__(self):
+        self.in_flight = 0
+        self.seq = itertools.count()
+        self._providers: dict[str, _ProviderLimiter] = {}
+
+    @asynccontextmanager
+    async def slot(self, provider: str, tokens: int, lane: Optional[str] = None):
+        """Hold an admitted call to `provider` for the duration of the block."""
+        limiter = self._provider(provider)
+        lane_name = lane or llm_lane.get()
+        await limiter.acquire(LANES.index(lane_name) if lane_name in LANES else 1, tokens)
+        slot = Slot(limiter, tokens)
+        try:
+            yield slot
+        finally:
+            limiter.release(slot)
+
+    def wake_all(self):
+        # A freed global slot may unblock any provider
+        for limiter in self._providers.values():
+            if limiter._waiters:
+                limiter._schedule()
+
+    def metrics(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": settings.LLM_MAX_CONCURRENCY,
+            "process_count": settings.LLM_PROCESS_COUNT,
+            "providers": {
+                name: {
+                    "in_flight": p.in_flight,
+                    "window": round(p.window, 2),
+                    "max_concurrency": p.max_concurrency,
+                    "queued": p.queued(),
+                    "requests_available": round(p.requests.level, 1),
+                    "tokens_available": round(p.tokens.level),
+                    "paused_s": round(max(0.0, p.paused_until - time.monotonic()), 2),
+                    **p.stats,
+                }
+                for name, p in self._providers.items()
+            },
+        }
+
+    def _provider(self, name: str) -> _ProviderLimiter:
+        if name not in self._providers:
+            limits = settings.LLM_RATE_LIMITS.get(name) or settings.LLM_RATE_LIMITS["default"]
+            share = max(1, settings.LLM_PROCESS_COUNT)
+            self._providers[name] = _ProviderLimiter(
+                self, name, limits["rpm"] / share, limits["tpm"] / share,
+                max(1, limits["concurrency"] // share),
+            )
+        return self._providers[name]
+
+
+llm_limiter = LLMLimiter()
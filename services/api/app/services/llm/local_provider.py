@@ -0,0 +1,390 @@
+"""
+Local LLM provider — a deterministic, offline stand-in for load tests and development.
+
+Selected with provider "local" (or LLM_PROVIDER_OVERRIDE=local for every client).
+Responses are rendered from templates per agent_id that return the keys each
+agent reads, from `response_schema` when one is given, or from the key list
+in the system prompt's "Return JSON with: ..." otherwise. Content is seeded
+from the request, so identical requests get identical responses.
+
+Latency is drawn from a lognormal distribution (LLM_LOCAL_LATENCY, per
+agent_id or "default"), and LLM_LOCAL_FAILURES injects 429s, 503s and
+timeouts at the configured rates. Both come from one RNG seeded with
+LLM_LOCAL_SEED, so a run with the same call order sees the same delays and
+failures. Streams send the first token after LLM_LOCAL_TTFT_FRACTION of the
+latency and spread the rest over the chunks.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+from typing import AsyncGenerator, Optional
+import httpx
+
+from app.core.config import settings
+
+
+class LocalProviderError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _request_rng(
+    agent_id: Optional[str], system_prompt: Optional[str], messages: list[dict],
+) -> random.Random:
+    digest = hashlib.sha256(
+        json.dumps([agent_id, system_prompt, messages], sort_keys=True, default=str).encode()
+    ).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def _question(messages: list[dict]) -> str:
+    user = (str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user")
+    text = next(user, "")
+    return " ".join(text.split())[:80] or "the question"
+
+
+# ---------------------------------------------------------------------------
+# Templates: (rng, question) -> the JSON object an agent expects
+# ---------------------------------------------------------------------------
+
+def _pick(rng: random.Random, options: list):
+    return options[rng.randrange(len(options))]
+
+
+def _quality(rng, q):
+    issues = [
+        {"column": _pick(rng, ["amount", "close_date", "region", "customer_id"]),
+         "issue": _pick(rng, ["null values", "outliers", "inconsistent casing", "duplicate keys"]),
+         "severity": _pick(rng, ["HIGH", "MEDIUM", "LOW"]),
+         "affected_pct": round(rng.uniform(0.1, 8.0), 2)}
+        for _ in range(rng.randint(1, 4))
+    ]
+    return {
+        "quality_scorecard": {
+            "overall": _pick(rng, ["good", "fair"]),
+            "completeness": round(rng.uniform(0.9, 1.0), 3),
+            "validity": round(rng.uniform(0.85, 1.0), 3),
+            "uniqueness": round(rng.uniform(0.95, 1.0), 3),
+        },
+        "issues": issues,
+        "proposed_fixes": [{"column": i["column"], "fix": f"Resolve {i['issue']}"} for i in issues],
+        "severity_summary": {
+            s: sum(i["severity"] == s for i in issues) for s in ("HIGH", "MEDIUM", "LOW")
+        },
+    }
+
+
+def _eda(rng, q):
+    candidates = ["price", "tenure", "region", "segment", "seasonality", "discount"]
+    drivers = [_pick(rng, candidates) for _ in range(3)]
+    return {
+        "eda_summary": (
+            f"Exploratory analysis for '{q}': {drivers[0]} and {drivers[1]} "
+            "explain most of the variance."
+        ),
+        "funnel_analysis": {
+            "stages": ["lead", "qualified", "won"],
+            "conversion": [1.0, round(rng.uniform(0.3, 0.6), 2), round(rng.uniform(0.1, 0.3), 2)],
+        },
+        "cohort_analysis": {
+            "cohorts": ["2024Q1", "2024Q2"],
+            "retention_90d": [round(rng.uniform(0.6, 0.9), 2) for _ in range(2)],
+        },
+        "segment_table": [
+            {"segment": s, "share": round(rng.uniform(0.1, 0.5), 2)}
+            for s in ("SMB", "Mid-Market", "Enterprise")
+        ],
+        "hypothesis_register": [
+            {"hypothesis": f"{d} drives the outcome", "test": "Mann-Whitney",
+             "result": _pick(rng, ["SUPPORTED", "INCONCLUSIVE"]),
+             "effect_size": round(rng.uniform(0.05, 0.5), 2)}
+            for d in drivers
+        ],
+        "ranked_drivers": [
+            {"driver": d, "importance": round(1.0 / (i + 1), 2)} for i, d in enumerate(drivers)
+        ],
+        "feature_recommendations": [f"{d}_trend_90d" for d in drivers],
+        "chart_specs": [
+            {"type": "bar", "title": f"Impact of {drivers[0]}", "x": drivers[0], "y": "outcome"},
+        ],
+        "open_questions": [f"Is the {drivers[2]} effect stable across regions?"],
+    }
+
+
+def _model(rng, q):
+    auc = round(rng.uniform(0.72, 0.93), 3)
+    leaderboard = [
+        {"model": m, "auc": round(auc - i * rng.uniform(0.01, 0.03), 3)}
+        for i, m in enumerate(["LightGBM", "XGBoost", "LogisticRegression"])
+    ]
+    return {
+        "task_type": "classification",
+        "champion_model": {
+            "name": "LightGBM", "version": "1", "params": {"num_leaves": 31, "learning_rate": 0.05},
+        },
+        "leaderboard": leaderboard,
+        "evaluation_metrics": {
+            "auc": auc,
+            "precision": round(rng.uniform(0.6, 0.85), 3),
+            "recall": round(rng.uniform(0.55, 0.8), 3),
+        },
+        "shap_summary": {"price": 0.31, "tenure": 0.22, "region": 0.12},
+        "top_predictions": [
+            {"id": f"cust_{rng.randint(1000, 9999)}", "score": round(rng.uniform(0.7, 0.99), 3)}
+            for _ in range(3)
+        ],
+        "business_impact_sim": {"expected_lift_pct": round(rng.uniform(2, 12), 1)},
+        "registry_entry": {"name": "churn_lgbm", "stage": "staging"},
+        "deployment_spec": {"mode": "batch", "schedule": "daily"},
+        "monitoring_config": {"drift_threshold": 0.2, "metrics": ["auc", "psi"]},
+        "nl_explanation": f"LightGBM ranks highest (AUC {auc}) for '{q}'.",
+    }
+
+
+def _narrate(rng, q):
+    lift = round(rng.uniform(3, 15), 1)
+    return {
+        "executive_summary": (
+            f"For '{q}', the analysis points to pricing and tenure as the main drivers. "
+            f"Targeting the at-risk segment is expected to improve the outcome by about {lift}%."
+        ),
+        "findings": [
+            {"title": "Pricing drives churn",
+             "evidence": "Customers with recent price increases churn 2x more", "confidence": 0.8},
+            {"title": "Tenure protects",
+             "evidence": "Accounts older than 2 years rarely churn", "confidence": 0.7},
+        ],
+        "root_cause_analysis": "Recent price changes hit low-tenure SMB accounts hardest.",
+        "segment_analysis": {"highest_risk": "SMB, tenure < 1y", "lowest_risk": "Enterprise"},
+        "recommendations": [
+            {"action": "Offer retention discount to high-risk SMB accounts", "impact": f"+{lift}%",
+             "effort": "low"},
+            {"action": "Review price change communication", "impact": "+2%", "effort": "medium"},
+        ],
+        "risks_caveats": ["Observational data; effects are not causal."],
+        "appendix": {"method": "LightGBM + SHAP"},
+        "next_steps": ["Run a holdout test of the retention offer"],
+    }
+
+
+def _act(rng, q):
+    return {
+        "actions": [
+            {"type": "crm_task", "target": "high_risk_accounts",
+             "description": "Schedule retention calls", "requires_approval": True},
+        ],
+        "workflow_specs": [
+            {"name": "weekly_churn_scoring", "trigger": "cron", "schedule": "0 6 * * 1"},
+        ],
+        "integration_requirements": {"crm": "salesforce", "scopes": ["tasks:write"]},
+        "rollout_plan": {"phase_1": "pilot 10% of accounts", "phase_2": "full rollout"},
+        "impact_hypothesis": (
+            f"Retention outreach reduces churn by {round(rng.uniform(2, 8), 1)}% within a quarter."
+        ),
+    }
+
+
+def _govern(rng, q):
+    return {
+        "status": "PASS",
+        "issues": [],
+        "required_approvals": [],
+        "audit_log_entry": {"checked": ["pii", "metric_integrity", "action_safety"]},
+        "redactions": [],
+        "policy_violations": [],
+        "checks_passed": ["pii", "metric_integrity", "action_safety"],
+    }
+
+
+def _mapper(rng, q):
+    return {
+        "entities": [
+            {"name": "Account", "description": "Customer account",
+             "columns": ["account_id", "name"], "domain": "generic", "confidence": 0.92},
+            {"name": "Opportunity", "description": "Sales opportunity",
+             "columns": ["opportunity_id", "account_id", "amount"], "domain": "generic",
+             "confidence": 0.88},
+        ],
+        "relationships": [
+            {"from_entity": "Account", "to_entity": "Opportunity",
+             "join_keys": {"account_id": "account_id"},
+             "relationship_type": "has_many", "confidence": 0.9},
+        ],
+        "metrics": [{"name": "pipeline_value", "formula": "SUM(amount)", "entity": "Opportunity"}],
+        "domain_blueprint": "revops",
+        "inference_notes": "Shared account_id key between tables.",
+    }
+
+
+def _grounding(rng, q):
+    return {
+        "entities": ["Account"],
+        "metrics": ["pipeline_value"],
+        "filters": {"time_range": "last_90_days"},
+        "grain": "month",
+        "confidence": round(rng.uniform(0.6, 0.95), 2),
+    }
+
+
+def _semantic_agent(rng, q):
+    return {
+        "entities": [
+            {"name": "Account", "source_table": "accounts", "properties": {"id": "account_id"},
+             "confidence": 0.95},
+        ],
+        "relationships": [{"from": "Account", "to": "Opportunity", "type": "has_many",
+                           "keys": {"from": "id", "to": "account_id"}, "confidence": 0.9}],
+        "industry_alignment": "revops",
+    }
+
+
+def _modeling(rng, q):
+    return {
+        "best_model": "XGBoost",
+        "metrics": {"accuracy": round(rng.uniform(0.8, 0.95), 3)},
+        "steps": ["impute", "encode", "scale"],
+        "leaderboard": [
+            {"model": "XGBoost", "score": 0.91}, {"model": "RandomForest", "score": 0.89},
+        ],
+        "code_artifacts": {"preprocessing": "df = df.dropna()", "training": "model.fit(X, y)"},
+        "recommendations": ["Tune max_depth"],
+    }
+
+
+TEMPLATES = {
+    "quality": _quality,
+    "eda": _eda,
+    "analytics_eda": _eda,
+    "model": _model,
+    "narrate": _narrate,
+    "act": _act,
+    "govern": _govern,
+    "mapper": _mapper,
+    "semantic_agent": _semantic_agent,
+    "modeling": _modeling,
+}
+
+
+def _from_schema(schema: dict, defs: dict, rng: random.Random, q: str, name: str = "value"):
+    if "$ref" in schema:
+        return _from_schema(defs[schema["$ref"].split("/")[-1]], defs, rng, q, name)
+    if "anyOf" in schema:
+        option = next((s for s in schema["anyOf"] if s.get("type") != "null"), {})
+        return _from_schema(option, defs, rng, q, name)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object":
+        props = schema.get("properties") or {}
+        if not props:
+            return {"summary": f"{name.replace('_', ' ')} for {q}"}
+        return {k: _from_schema(v, defs, rng, q, k) for k, v in props.items()}
+    if kind == "array":
+        items = schema.get("items") or {"type": "string"}
+        return [_from_schema(items, defs, rng, q, name) for _ in range(2)]
+    if kind == "integer":
+        return rng.randint(1, 100)
+    if kind == "number":
+        return round(rng.uniform(0, 1), 3)
+    if kind == "boolean":
+        return False
+    return f"{name.replace('_', ' ').capitalize()} for {q}"
+
+
+_KEY_LIST = re.compile(r"JSON(?: object)? with:?\s*(.+)", re.IGNORECASE | re.DOTALL)
+_KEY = re.compile(r"^[\s\-*]*([a-z][a-z0-9_]*)(?:\s*\(([^)]*)\))?", re.IGNORECASE)
+
+
+def _from_prompt(system_prompt: str, rng: random.Random, q: str) -> dict:
+    """
+    Keys named in "Return JSON with: a, b (X/Y), c"; a parenthesized option
+    list picks its first option.
+    """
+    match = _KEY_LIST.search(system_prompt or "")
+    if not match:
+        return {"summary": f"Response for {q}"}
+    result = {}
+    for item in re.split(r"[,\n]", match.group(1)):
+        key = _KEY.match(item)
+        if not key:
+            continue
+        options = key.group(2)
+        if options and "/" in options:
+            result[key.group(1)] = options.split("/")[0].strip()
+        else:
+            result[key.group(1)] = f"{key.group(1).replace('_', ' ').capitalize()} for {q}"
+    return result or {"summary": f"Response for {q}"}
+
+
+def render(
+    agent_id: Optional[str], messages: list[dict], system_prompt: Optional[str],
+    json_mode: bool, response_schema: Optional[type],
+) -> str:
+    rng = _request_rng(agent_id, system_prompt, messages)
+    q = _question(messages)
+    if response_schema is not None:
+        schema = response_schema.model_json_schema()
+        return json.dumps(_from_schema(schema, schema.get("$defs", {}), rng, q))
+    if not json_mode:
+        return f"Local response to: {q}"
+    if agent_id == "mapper" and "NLQ Grounding" in (system_prompt or ""):
+        return json.dumps(_grounding(rng, q))
+    if agent_id in TEMPLATES:
+        return json.dumps(TEMPLATES[agent_id](rng, q))
+    return json.dumps(_from_prompt(system_prompt, rng, q))
+
+
+class LocalProvider:
+    def __init__(self, seed: int = 0):
+        self.rng = random.Random(seed)
+
+    def reseed(self, seed: int):
+        self.rng = random.Random(seed)
+
+    def _latency(self, agent_id: Optional[str]) -> float:
+        dist = settings.LLM_LOCAL_LATENCY.get(agent_id) or settings.LLM_LOCAL_LATENCY["default"]
+        return dist["median_s"] * math.exp(dist.get("sigma", 0.0) * self.rng.gauss(0.0, 1.0))
+
+    async def _maybe_fail(self, latency: float):
+        roll = self.rng.random()
+        for kind, rate in settings.LLM_LOCAL_FAILURES.items():
+            if roll < rate:
+                if kind == "timeout":
+                    await asyncio.sleep(latency)
+                    raise httpx.ReadTimeout("local provider timed out")
+                if kind == "rate_limit":
+                    raise LocalProviderError(429, "local provider rate limited")
+                raise LocalProviderError(503, "local provider unavailable")
+            roll -= rate
+
+    async def complete(
+        self, agent_id: Optional[str], messages: list[dict], system_prompt: Optional[str],
+        json_mode: bool, response_schema: Optional[type],
+    ) -> str:
+        latency = self._latency(agent_id)
+        await self._maybe_fail(latency)
+        await asyncio.sleep(latency)
+        return render(agent_id, messages, system_prompt, json_mode, response_schema)
+
+    async def stream(
+        self, agent_id: Optional[str], messages: list[dict], system_prompt: Optional[str],
+        json_mode: bool, response_schema: Optional[type],
+    ) -> AsyncGenerator[str, None]:
+        latency = self._latency(agent_id)
+        await self._maybe_fail(latency)
+        text = render(agent_id, messages, system_prompt, json_mode, response_schema)
+        size = settings.LLM_LOCAL_CHUNK_CHARS
+        chunks = [text[i:i + size] for i in range(0, len(text), size)] or [""]
+        await asyncio.sleep(latency * settings.LLM_LOCAL_TTFT_FRACTION)
+        gap = latency * (1 - settings.LLM_LOCAL_TTFT_FRACTION) / max(1, len(chunks) - 1)
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(gap)
+            yield chunk
+
+
+local_llm = LocalProvider(seed=settings.LLM_LOCAL_SEED)
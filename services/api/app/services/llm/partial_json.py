@@ -0,0 +1,117 @@
+"""
+Incremental JSON parsing for streamed LLM responses.
+
+`PartialJSON` is fed text as it streams; `value()` is the best complete value
+the prefix so far can be read as: open strings, arrays and objects are
+closed, and a trailing fragment that can't be completed (a half-written key,
+`tru`, a dangling comma) is dropped. String values are kept while they grow,
+so a summary shows up word by word. `feed` only scans the new text, so
+callers can feed every delta and read `value()` as often as they need it.
+"""
+import json
+import re
+from typing import Any, Optional
+
+_CLOSERS = {"{": "}", "[": "]"}
+# A value string cut inside an escape sequence: drop the incomplete escape
+_PARTIAL_ESCAPE = re.compile(r"\\(u[0-9a-fA-F]{0,3})?$")
+
+
+class PartialJSON:
+    def __init__(self):
+        self.buffer = ""
+        self._start: Optional[int] = None  # where the JSON begins (after any ``` fence)
+        self._pos = 0
+        self._stack: list[str] = []
+        self._expect: list[str] = []  # per open object: "key" | "colon" | "value" | "comma"
+        self._in_string = False
+        self._string_is_key = False
+        self._escape = False
+        # Longest prefix known to parse once the containers open at that point are closed
+        self._safe: tuple[int, str] = (0, "")
+
+    def feed(self, text: str):
+        self.buffer += text
+        if self._start is None:
+            starts = (self.buffer.find("{"), self.buffer.find("["))
+            brace = min((i for i in starts if i >= 0), default=-1)
+            if brace < 0:
+                return
+            self._start = self._pos = brace
+            self._safe = (brace, "")
+        self._scan()
+
+    def value(self) -> Optional[Any]:
+        """The current partial value; None until one is readable."""
+        if self._start is None:
+            return None
+        closers = self._closers()
+        text = self.buffer[self._start:]
+        if self._in_string:
+            if not self._string_is_key:
+                candidate = _PARTIAL_ESCAPE.sub("", text) + '"' + closers
+                parsed = _loads(candidate)
+                if parsed is not None:
+                    return parsed
+        else:
+            parsed = _loads(text + closers)
+            if parsed is not None:
+                return parsed
+        end, safe_closers = self._safe
+        return _loads(self.buffer[self._start:end] + safe_closers)
+
+    def _closers(self) -> str:
+        return "".join(_CLOSERS[c] for c in reversed(self._stack))
+
+    def _mark_safe(self, end: int):
+        self._safe = (end, self._closers())
+
+    def _scan(self):
+        buf = self.buffer
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._string_is_key:
+                        self._expect[-1] = "colon"
+                    else:
+                        self._value_done(i + 1)
+                continue
+            if ch == '"':
+                self._in_string = True
+                in_object = bool(self._stack) and self._stack[-1] == "{"
+                self._string_is_key = in_object and self._expect[-1] == "key"
+            elif ch in "{[":
+                self._stack.append(ch)
+                self._expect.append("key" if ch == "{" else "value")
+                self._mark_safe(i + 1)
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                    self._expect.pop()
+                self._value_done(i + 1)
+            elif ch == ":" and self._expect and self._expect[-1] == "colon":
+                self._expect[-1] = "value"
+            elif ch == ",":
+                # Numbers and literals end here, so everything before the comma is whole
+                self._mark_safe(i)
+                if self._expect:
+                    self._expect[-1] = "key" if self._stack[-1] == "{" else "value"
+        self._pos = len(buf)
+
+    def _value_done(self, end: int):
+        if self._expect:
+            self._expect[-1] = "comma"
+        self._mark_safe(end)
+
+
+def _loads(text: str) -> Optional[Any]:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
@@ -0,0 +1,102 @@
+"""
+Provider client pool — process-wide, long-lived SDK clients for LLMClient.
+
+Clients are keyed by (provider, api_key) and share a keep-alive (HTTP/2 when
+available) connection pool, so repeated agent calls reuse warm TLS sessions
+instead of paying a fresh handshake per request. Closed from the app lifespan.
+"""
+from typing import Any
+import httpx
+import structlog
+
+from app.core.config import settings
+
+log = structlog.get_logger()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ProviderClientPool:
+    """Caches one SDK client (and its underlying httpx pool) per provider + key."""
+
+    def __init__(self):
+        self._clients: dict[tuple[str, str], Any] = {}
+        self._http_clients: dict[tuple[str, str], httpx.AsyncClient] = {}
+
+    def _client_args(self, provider: str) -> dict:
+        limits = settings.LLM_MAX_CONNECTIONS
+        max_conns = limits.get(provider, limits.get("default", 50))
+        http2 = settings.LLM_HTTP2 and _http2_available()
+        return dict(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_conns,
+                max_keepalive_connections=min(max_conns, settings.LLM_MAX_KEEPALIVE_CONNECTIONS),
+                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY_S,
+            ),
+            timeout=httpx.Timeout(settings.LLM_REQUEST_TIMEOUT_S, connect=10.0),
+        )
+
+    def _http_client(self, key: tuple[str, str]) -> httpx.AsyncClient:
+        client = self._http_clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(**self._client_args(key[0]))
+            self._http_clients[key] = client
+        return client
+
+    def openai(self, api_key: str):
+        key = ("openai", api_key)
+        if key not in self._clients:
+            from openai import AsyncOpenAI
+            self._clients[key] = AsyncOpenAI(api_key=api_key, http_client=self._http_client(key))
+            log.info("llm.pool.client_created", provider="openai")
+        return self._clients[key]
+
+    def anthropic(self, api_key: str):
+        key = ("anthropic", api_key)
+        if key not in self._clients:
+            from anthropic import AsyncAnthropic
+            self._clients[key] = AsyncAnthropic(api_key=api_key, http_client=self._http_client(key))
+            log.info("llm.pool.client_created", provider="anthropic")
+        return self._clients[key]
+
+    def gemini(self, api_key: str):
+        key = ("gemini", api_key)
+        if key not in self._clients:
+            from google import genai
+            from google.genai import types
+            # genai builds its own httpx.AsyncClient; hand it the same pool settings.
+            self._clients[key] = genai.Client(
+                api_key=api_key,
+                http_options=types.HttpOptions(async_client_args=self._client_args("gemini")),
+            )
+            log.info("llm.pool.client_created", provider="gemini")
+        return self._clients[key]
+
+    async def aclose(self):
+        """Close every pooled client. Called from the FastAPI lifespan on shutdown."""
+        for (provider, _), client in list(self._clients.items()):
+            try:
+                if provider == "gemini":
+                    aclose = getattr(client.aio, "aclose", None)
+                    if aclose:
+                        await aclose()
+                else:
+                    await client.close()
+            except Exception as e:
+                log.warning("llm.pool.close_failed", provider=provider, error=str(e))
+        for client in self._http_clients.values():
+            if not client.is_closed:
+                await client.aclose()
+        log.info("llm.pool.closed", clients=len(self._clients))
+        self._clients.clear()
+        self._http_clients.clear()
+
+
+client_pool = ProviderClientPool()
@@ -0,0 +1,148 @@
+"""
+LLM call resilience — retries, hedged requests and provider failover.
+
+LLMClient wraps each admitted provider call in three layers:
+  * failover: routes are tried in order along `failover_chain()` — the
+    client's route, its MODEL_ROUTING "fallbacks", then the "default" route
+    and its fallbacks (providers without an API key are skipped);
+  * retries: transient errors (timeouts, connection errors, 408/409/5xx) are
+    retried on the same route with full-jitter exponential backoff. 429s are
+    retried too, without a backoff of their own: the throttled slot paused the
+    provider in the admission limiter, so the retry waits in its queue. This is
+    the only retry loop, and no slot is held between attempts;
+  * hedging: once a route has a latency history, a call still running past
+    its LLM_HEDGE_QUANTILE latency gets a duplicate; the first response wins
+    and the other is cancelled. Streams hedge on time to first token.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+import httpx
+import structlog
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+from app.core.config import settings
+from app.services.llm.limiter import is_rate_limited
+
+log = structlog.get_logger()
+
+_TRANSIENT_STATUS = {408, 409}
+# SDK errors without a status code (openai/anthropic timeouts and connection failures)
+_TRANSIENT_NAMES = {"APITimeoutError", "APIConnectionError"}
+
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException, httpx.TransportError)):
+        return True
+    if type(error).__name__ in _TRANSIENT_NAMES:
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return isinstance(status, int) and (status in _TRANSIENT_STATUS or 500 <= status < 600)
+
+
+def retrying() -> AsyncRetrying:
+    backoff = wait_random_exponential(
+        multiplier=settings.LLM_RETRY_BACKOFF_S, max=settings.LLM_RETRY_BACKOFF_MAX_S,
+    )
+
+    def wait(retry_state) -> float:
+        # Re-admission after a 429 already waits out the limiter's Retry-After pause
+        return 0.0 if is_rate_limited(retry_state.outcome.exception()) else backoff(retry_state)
+
+    return AsyncRetrying(
+        stop=stop_after_attempt(settings.LLM_RETRY_ATTEMPTS),
+        wait=wait,
+        retry=retry_if_exception(lambda e: is_transient(e) or is_rate_limited(e)),
+        reraise=True,
+    )
+
+
+def _has_credentials(provider: str) -> bool:
+    keys = {
+        "openai": settings.OPENAI_API_KEY, "anthropic": settings.ANTHROPIC_API_KEY,
+        "gemini": settings.GEMINI_API_KEY,
+    }
+    return bool(keys.get(provider, True))
+
+
+def failover_chain(agent_id: Optional[str], provider: str, model: str) -> list[tuple[str, str]]:
+    """(provider, model) routes to try in order, starting with the client's own."""
+    chain = [(provider, model)]
+    if not settings.LLM_FAILOVER or settings.LLM_PROVIDER_OVERRIDE:
+        return chain
+    route = (settings.MODEL_ROUTING.get(agent_id) or {}) if agent_id else {}
+    default = settings.MODEL_ROUTING.get("default") or {}
+    for candidate in (*route.get("fallbacks", []), default, *default.get("fallbacks", [])):
+        target = (candidate.get("provider"), candidate.get("model"))
+        if all(target) and target not in chain and _has_credentials(target[0]):
+            chain.append(target)
+    return chain
+
+
+class LatencyTracker:
+    """Recent successful latencies of one route and call kind; sets the hedge deadline."""
+
+    def __init__(self):
+        self.samples: deque[float] = deque(maxlen=settings.LLM_HEDGE_WINDOW)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def deadline(self) -> Optional[float]:
+        if not settings.LLM_HEDGE or len(self.samples) < settings.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        quantile = ordered[min(len(ordered) - 1, int(len(ordered) * settings.LLM_HEDGE_QUANTILE))]
+        return max(quantile, settings.LLM_HEDGE_MIN_DELAY_S)
+
+
+_trackers: dict[tuple[str, str, str], LatencyTracker] = {}
+
+
+def latency_tracker(provider: str, model: str, kind: str) -> LatencyTracker:
+    key = (provider, model, kind)
+    if key not in _trackers:
+        _trackers[key] = LatencyTracker()
+    return _trackers[key]
+
+
+async def hedged(
+    call: Callable[[], Awaitable[Any]],
+    tracker: LatencyTracker,
+    hedge: bool = True,
+    discard: Optional[Callable[[Any], Awaitable[None]]] = None,
+) -> Any:
+    """
+    Await `call()`, starting a duplicate if it outlives the tracker's deadline.
+    The first success wins; `discard` disposes of a losing result that also arrived.
+    """
+    async def timed():
+        started = time.monotonic()
+        result = await call()
+        tracker.record(time.monotonic() - started)
+        return result
+
+    deadline = tracker.deadline() if hedge else None
+    tasks = [asyncio.create_task(timed())]
+    winner: Optional[asyncio.Task] = None
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=deadline)
+        if not done:
+            log.info("llm.hedge", deadline_s=round(deadline, 2))
+            tasks.append(asyncio.create_task(timed()))
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = next((t for t in tasks if t in done and t.exception() is None), None)
+            if winner is not None:
+                return winner.result()
+        raise tasks[0].exception()
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if discard:
+            for t in tasks:
+                if t is not winner and not t.cancelled() and t.exception() is None:
+                    await discard(t.result())
@@ -0,0 +1,137 @@
+"""
+Session event bus — push-based fan-out of supervisor events to SSE subscribers.
+
+The in-process backend delivers straight to subscriber queues. With
+EVENT_BUS_BACKEND=redis, events are published to Redis pub/sub and a single
+listener task per process fans them out locally, so viewers connected to any
+API worker see events from supervisors running anywhere.
+"""
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+import structlog
+
+from app.core.config import settings
+
+log = structlog.get_logger()
+
+REDIS_PREFIX = "vds:events:"
+
+
+class Subscription:
+    """A bounded per-subscriber queue. Overflow is flagged so the consumer can resync."""
+
+    def __init__(self, channel: str, maxsize: int):
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def deliver(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Next event, or None if `timeout` elapses first."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventBus:
+    def __init__(self, backend: str = "memory", queue_size: int = 1000):
+        self.backend = backend
+        self.queue_size = queue_size
+        self._subscribers: dict[str, set[Subscription]] = defaultdict(set)
+        self._redis = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def publish(self, channel: str, event: dict):
+        if self.backend == "redis":
+            try:
+                await self._redis_client().publish(
+                    REDIS_PREFIX + channel, json.dumps(event, default=str),
+                )
+                return
+            except Exception as e:
+                # Degrade to local delivery rather than dropping the event
+                log.warning("event_bus.redis_publish_failed", channel=channel, error=str(e))
+        self._fan_out(channel, event)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[Subscription]:
+        sub = Subscription(channel, self.queue_size)
+        self._subscribers[channel].add(sub)
+        if self.backend == "redis":
+            self._ensure_listener()
+        try:
+            yield sub
+        finally:
+            subs = self._subscribers.get(channel)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[channel]
+
+    def subscriber_count(self, channel: Optional[str] = None) -> int:
+        if channel is not None:
+            return len(self._subscribers.get(channel, ()))
+        return sum(len(s) for s in self._subscribers.values())
+
+    async def aclose(self):
+        if self._listener:
+            self._listener.cancel()
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    def _fan_out(self, channel: str, event: dict):
+        for sub in list(self._subscribers.get(channel, ())):
+            sub.deliver(event)
+
+    def _redis_client(self):
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(settings.REDIS_URL)
+        return self._redis
+
+    def _ensure_listener(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis_client().pubsub()
+                await pubsub.psubscribe(REDIS_PREFIX + "*")
+                async for msg in pubsub.listen():
+                    if msg.get("type") != "pmessage":
+                        continue
+                    channel = msg["channel"]
+                    channel = channel.decode() if isinstance(channel, bytes) else channel
+                    self._fan_out(channel[len(REDIS_PREFIX):], json.loads(msg["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("event_bus.listener_error", error=str(e))
+                await asyncio.sleep(1)
+
+
+def session_channel(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def approval_channel(session_id: str) -> str:
+    return f"approval:{session_id}"
+
+
+def job_channel(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+event_bus = EventBus(backend=settings.EVENT_BUS_BACKEND)
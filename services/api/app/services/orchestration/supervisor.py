@@ -1,20 +1,26 @@
 """
 Supervisor Agent — The master orchestrator that runs the full multi-agent pipeline.
 
-Pipeline: Problem Framer → Connector → Semantic Mapper → Data Quality
-          → EDA & Hypothesis → Modeling → Insight Narrator → Action → Governance
+Pipeline (dependency graph, see STEP_AGENTS):
+          Problem Framer → {Semantic Mapper, Data Quality} → EDA & Hypothesis
+          → Modeling → Insight Narrator → Action → Governance
+
+Each completed step's result is checkpointed, so a run of a session that was
+interrupted (restart, crash, failed step) picks up where it left off.
 """
+import copy
 import json
 import uuid
 import asyncio
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Callable, Optional
 import structlog
+from sqlalchemy import select
 
 from app.core.config import settings
 from app.db.session import AsyncSessionLocal
 from app.db.models import (
-    VDSSession, SessionMessage, SessionArtifact,
+    VDSSession, SessionMessage, SessionArtifact, SessionCheckpoint,
     AuditEvent, SessionStatus, AutonomyLevel
 )
 from app.services.agents.problem_framer import ProblemFramerAgent
@@ -26,18 +32,22 @@ from app.services.agents.action_agent import ActionAgent
 from app.services.agents.governance import GovernanceAgent
 from app.services.semantic.mapper import SemanticMapper
 from app.services.llm.client import LLMClient
+from app.services.orchestration.event_bus import event_bus, session_channel, approval_channel
+from app.services.jobs.queue import report_job_progress
 
 log = structlog.get_logger()
 
+# (step_id, display name, agent class, upstream step ids). Steps whose dependencies
+# are all complete run concurrently; see SupervisorAgent.run.
 STEP_AGENTS = [
-    ("frame",     "Problem Framer",     ProblemFramerAgent),
-    ("map",       "Semantic Mapper",    None),          # handled inline
-    ("quality",   "Data Quality",       DataQualityAgent),
-    ("eda",       "EDA & Hypothesis",   EDAHypothesisAgent),
-    ("model",     "Modeling",           ModelingAgent),
-    ("narrate",   "Insight Narrator",   InsightNarratorAgent),
-    ("act",       "Action",             ActionAgent),
-    ("govern",    "Governance",         GovernanceAgent),
+    ("frame",     "Problem Framer",     ProblemFramerAgent,   ()),
+    ("map",       "Semantic Mapper",    None,                 ("frame",)),  # handled inline
+    ("quality",   "Data Quality",       DataQualityAgent,     ("frame",)),
+    ("eda",       "EDA & Hypothesis",   EDAHypothesisAgent,   ("frame", "quality")),
+    ("model",     "Modeling",           ModelingAgent,        ("frame", "quality", "eda")),
+    ("narrate",   "Insight Narrator",   InsightNarratorAgent, ("frame", "eda", "model")),
+    ("act",       "Action",             ActionAgent,          ("frame", "model", "narrate")),
+    ("govern",    "Governance",         GovernanceAgent,      ("narrate", "act")),
 ]
 
 
@@ -45,7 +55,7 @@ class SupervisorAgent:
     """
     Owns the full session lifecycle:
       1. Build plan
-      2. Execute each specialist agent in sequence
+      2. Execute specialist agents as a dependency graph (independent steps in parallel)
       3. Handle checkpoints (autonomy dial)
       4. Persist all messages, artifacts, audit events
       5. Produce final consolidated output
@@ -66,112 +76,292 @@ class SupervisorAgent:
         self.connector_ids = connector_ids
         self.llm = LLMClient()
         self.context: dict = {}  # shared context across agents
+        self._unconfirmed: set[str] = set()  # resumed steps still awaiting their semi-auto approval
+        self._checkpoint_lock = asyncio.Lock()  # one pending approval at a time
+        self._state_lock = asyncio.Lock()  # serializes plan/status writes from parallel steps
 
     async def run(self):
+        self.context = await self._load_checkpoints()
         async with AsyncSessionLocal() as db:
             session = await db.get(VDSSession, self.session_id)
             session.status = SessionStatus.planned
-            plan = self._build_plan()
-            session.plan = plan
+            if self.context and session.plan:
+                session.plan = self._resume_plan(session.plan)
+            else:
+                session.plan = self._build_plan()
             await db.commit()
 
-        log.info("supervisor.start", session_id=self.session_id, domain=self.domain)
+        log.info(
+            "supervisor.start", session_id=self.session_id, domain=self.domain,
+            resumed_steps=len(self.context),
+        )
+        if self.context:
+            await self._post_message(
+                "system",
+                f"↻ Resuming: {len(self.context)} of {len(STEP_AGENTS)} steps restored "
+                "from checkpoints.",
+                agent="supervisor",
+            )
 
-        # Run each step
-        for step_index, (step_id, step_name, AgentClass) in enumerate(STEP_AGENTS):
-            try:
-                await self._update_session_step(step_index, SessionStatus.executing)
-                await self._post_message("system", f"▶ Starting: **{step_name}**", agent="supervisor")
+        if not await self._run_graph():
+            return
 
-                if self.autonomy == AutonomyLevel.assist and step_index > 0:
-                    await self._wait_for_approval(step_index, step_name)
+        # Finalize
+        await self._finalize()
+        log.info("supervisor.done", session_id=self.session_id)
 
-                if step_id == "map":
-                    result = await self._run_semantic_mapping()
-                else:
-                    agent = AgentClass(
-                        session_id=self.session_id,
-                        domain=self.domain,
-                        context=self.context,
-                        connector_ids=self.connector_ids,
-                        llm=LLMClient(agent_id=step_id),
+    async def mark_cancelled(self):
+        """Record a cancelled run as failed and end the session's live streams."""
+        async with AsyncSessionLocal() as db:
+            session = await db.get(VDSSession, self.session_id)
+            session.status = SessionStatus.failed
+            await db.commit()
+        await self._post_message("system", "⏹ Run cancelled.", agent="supervisor")
+        await self._publish_status(SessionStatus.failed)
+
+    async def _run_graph(self) -> bool:
+        """Schedule STEP_AGENTS as soon as their dependencies finish. Returns False on failure."""
+        completed: set[str] = set(self.context) - self._unconfirmed
+        pending = [(i, s) for i, s in enumerate(STEP_AGENTS) if s[0] not in self.context]
+        running: dict[asyncio.Task, tuple[int, str, str]] = {
+            asyncio.create_task(self._confirm_step(i, s[1])): (i, s[0], s[1])
+            for i, s in enumerate(STEP_AGENTS) if s[0] in self._unconfirmed
+        }
+
+        try:
+            while pending or running:
+                for entry in list(pending):
+                    step_index, (step_id, step_name, AgentClass, deps) = entry
+                    if all(d in completed for d in deps):
+                        pending.remove(entry)
+                        task = asyncio.create_task(
+                            self._run_step(step_index, step_id, step_name, AgentClass)
+                        )
+                        running[task] = (step_index, step_id, step_name)
+
+                if not running:
+                    # Unsatisfiable dependencies — a STEP_AGENTS declaration error
+                    raise RuntimeError(f"Unschedulable steps: {[s[0] for _, s in pending]}")
+
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    step_index, step_id, step_name = running.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        completed.add(step_id)
+                        continue
+
+                    log.error("supervisor.step_failed", step=step_id, error=str(error))
+                    for other in running:
+                        other.cancel()
+                    await asyncio.gather(*running, return_exceptions=True)
+                    await self._post_message(
+                        "system", f"❌ {step_name} failed: {error}", agent="supervisor",
                     )
-                    result = await agent.run(self.question)
+                    await self._update_session_step(step_index, SessionStatus.failed)
+                    return False
+        except asyncio.CancelledError:
+            # The run itself was cancelled (job cancel, lease loss): don't leave steps behind
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            raise
+        return True
 
-                self.context[step_id] = result
-                await self._persist_artifacts(step_id, step_name, result)
-                await self._post_message("assistant", f"✅ {step_name} complete.", agent=step_id)
-                await self._emit_audit(f"agent.{step_id}.complete", result)
+    async def _run_step(self, step_index: int, step_id: str, step_name: str, AgentClass):
+        await self._update_session_step(step_index, SessionStatus.executing)
+        await self._post_message("system", f"▶ Starting: **{step_name}**", agent="supervisor")
 
-                # Semi-auto: checkpoint before modeling or action steps
-                if self.autonomy == AutonomyLevel.semi_auto and step_id in ("model", "act"):
-                    await self._wait_for_approval(step_index, step_name)
+        if self.autonomy == AutonomyLevel.assist and step_index > 0:
+            await self._wait_for_approval(step_index, step_name)
 
-            except Exception as e:
-                log.error("supervisor.step_failed", step=step_id, error=str(e))
-                await self._post_message("system", f"❌ {step_name} failed: {e}", agent="supervisor")
-                await self._update_session_step(step_index, SessionStatus.failed)
-                return
+        if step_id == "map":
+            result = await self._run_semantic_mapping()
+        else:
+            agent = AgentClass(
+                session_id=self.session_id,
+                domain=self.domain,
+                context=self.context,
+                connector_ids=self.connector_ids,
+                llm=LLMClient(agent_id=step_id, on_partial=self._partial_publisher(step_id)),
+            )
+            result = await agent.run(self.question)
 
-        # Finalize
-        await self._finalize()
-        log.info("supervisor.done", session_id=self.session_id)
+        self.context[step_id] = result
+        await self._save_checkpoint(step_index, step_id, result)
+        await self._persist_artifacts(step_id, step_name, result)
+        await self._post_message("assistant", f"✅ {step_name} complete.", agent=step_id)
+        await self._emit_audit(f"agent.{step_id}.complete", result)
+        await self._update_step_status(step_index, "done")
+
+        # Semi-auto: checkpoint before modeling or action steps
+        if self.autonomy == AutonomyLevel.semi_auto and step_id in ("model", "act"):
+            await self._confirm_step(step_index, step_name)
+
+    async def _confirm_step(self, step_index: int, step_name: str):
+        await self._wait_for_approval(step_index, step_name)
+        await self._update_step_status(step_index, "done")
 
     def _build_plan(self) -> dict:
         return {
             "steps": [
-                {"index": i, "id": s[0], "name": s[1], "status": "pending"}
+                {"index": i, "id": s[0], "name": s[1], "depends_on": list(s[3]),
+                 "status": "pending"}
                 for i, s in enumerate(STEP_AGENTS)
             ]
         }
 
+    def _resume_plan(self, plan: dict) -> dict:
+        """
+        Reset the steps that have to run again; note checkpointed ones still awaiting
+        approval.
+        """
+        plan = copy.deepcopy(plan)
+        for step in plan["steps"]:
+            if step["id"] not in self.context:
+                step["status"] = "pending"
+            elif step["status"] != "done":
+                if self.autonomy == AutonomyLevel.semi_auto and step["id"] in ("model", "act"):
+                    # Interrupted at the checkpoint after the step ran; ask again
+                    self._unconfirmed.add(step["id"])
+                else:
+                    step["status"] = "done"
+        return plan
+
+    async def _load_checkpoints(self) -> dict:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(SessionCheckpoint.step_id, SessionCheckpoint.result)
+                .where(SessionCheckpoint.session_id == self.session_id)
+            )
+            return dict(result.all())
+
+    async def _save_checkpoint(self, step_index: int, step_id: str, result: dict):
+        async with AsyncSessionLocal() as db:
+            db.add(SessionCheckpoint(
+                id=str(uuid.uuid4()),
+                session_id=self.session_id,
+                step_id=step_id,
+                step_index=step_index,
+                # Round-trip through JSON so a resumed run sees exactly what a fresh one
+                # would reload
+                result=json.loads(json.dumps(result, default=str)),
+            ))
+            await db.commit()
+
     async def _run_semantic_mapping(self) -> dict:
         mapper = SemanticMapper(connector_id=self.connector_ids[0] if self.connector_ids else None)
         return await mapper.map_for_session(self.question, self.domain)
 
     async def _wait_for_approval(self, step_index: int, step_name: str):
         """Pause execution and wait until the session context has an approval."""
-        await self._update_session_step(step_index, SessionStatus.checkpoint)
-        await self._post_message(
-            "system",
-            f"⏸ Checkpoint before **{step_name}**. Please review the plan above and approve to continue.",
-            agent="supervisor",
-        )
-        # Poll for approval (UI calls POST /sessions/{id}/approve)
-        for _ in range(120):  # timeout after 10 min
-            await asyncio.sleep(5)
-            async with AsyncSessionLocal() as db:
-                session = await db.get(VDSSession, self.session_id)
-                approval = session.context.get("approval")
+        async with self._checkpoint_lock:
+            await self._await_checkpoint(step_index, step_name)
+            await self._update_session_step(step_index, SessionStatus.executing)
+
+    async def _await_checkpoint(self, step_index: int, step_name: str):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.APPROVAL_TIMEOUT_S
+        # Subscribe before announcing the checkpoint so an instant approval can't be missed
+        async with event_bus.subscribe(approval_channel(self.session_id)) as sub:
+            await self._update_session_step(step_index, SessionStatus.checkpoint)
+            await self._post_message(
+                "system",
+                f"⏸ Checkpoint before **{step_name}**. Please review the plan above and approve to continue.",
+                agent="supervisor",
+            )
+            # POST /sessions/{id}/approve persists the decision and publishes on approval_channel
+            while True:
+                approval = await self._consume_approval()
                 if approval:
                     if not approval.get("approved"):
                         raise Exception("User rejected the checkpoint.")
-                    # Clear approval for next checkpoint
-                    session.context.pop("approval", None)
-                    await db.commit()
                     return
-        raise Exception("Approval timeout")
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise Exception("Approval timeout")
+                await sub.get(timeout=min(remaining, settings.APPROVAL_RECHECK_S))
 
-    async def _update_session_step(self, step_index: int, status: SessionStatus):
+    async def _consume_approval(self) -> Optional[dict]:
+        """Read and clear the pending approval decision, if any."""
         async with AsyncSessionLocal() as db:
+            session = await db.get(VDSSession, self.session_id)
+            approval = (session.context or {}).get("approval")
+            if approval:
+                # Clear approval for next checkpoint
+                session.context = {k: v for k, v in session.context.items() if k != "approval"}
+                await db.commit()
+            return approval
+
+    async def _update_session_step(self, step_index: int, status: SessionStatus):
+        async with self._state_lock, AsyncSessionLocal() as db:
             session = await db.get(VDSSession, self.session_id)
             session.status = status
             session.current_step_index = step_index
             if session.plan:
-                session.plan["steps"][step_index]["status"] = status.value
+                # Reassign a copy so SQLAlchemy detects the JSON change
+                plan = copy.deepcopy(session.plan)
+                plan["steps"][step_index]["status"] = status.value
+                session.plan = plan
             await db.commit()
+        await self._publish_status(status)
+
+    async def _update_step_status(self, step_index: int, step_status: str):
+        """Mark a single plan step without touching the session-level status."""
+        async with self._state_lock, AsyncSessionLocal() as db:
+            session = await db.get(VDSSession, self.session_id)
+            if session.plan:
+                plan = copy.deepcopy(session.plan)
+                plan["steps"][step_index]["status"] = step_status
+                session.plan = plan
+                await db.commit()
+                steps_done = sum(1 for s in plan["steps"] if s["status"] == "done")
+                await report_job_progress(steps_done=steps_done, steps_total=len(plan["steps"]))
 
     async def _post_message(self, role: str, content: str, agent: Optional[str] = None):
+        msg = SessionMessage(
+            id=str(uuid.uuid4()),
+            session_id=self.session_id,
+            role=role,
+            agent=agent,
+            content=content,
+            created_at=datetime.now(timezone.utc),
+        )
         async with AsyncSessionLocal() as db:
-            msg = SessionMessage(
-                id=str(uuid.uuid4()),
-                session_id=self.session_id,
-                role=role,
-                agent=agent,
-                content=content,
-            )
             db.add(msg)
             await db.commit()
+        await event_bus.publish(session_channel(self.session_id), {
+            "type": "message",
+            "id": msg.id,
+            "role": role,
+            "agent": agent,
+            "content": content,
+        })
+
+    def _partial_publisher(self, step_id: str) -> Callable:
+        """
+        Streams an agent's partially generated response to the session's SSE
+        subscribers, as deltas against what was already published for the step.
+        """
+        sent = {"value": None, "chars": 0}
+
+        async def publish(partial):
+            delta = _partial_delta(sent["value"], partial)
+            if delta is None:
+                return
+            size = len(json.dumps(delta, default=str))
+            if sent["chars"] + size > settings.SSE_PARTIAL_MAX_CHARS:
+                return
+            sent["value"], sent["chars"] = partial, sent["chars"] + size
+            await event_bus.publish(session_channel(self.session_id), {
+                "type": "partial", "agent": step_id, "delta": delta,
+            })
+        return publish
+
+    async def _publish_status(self, status: SessionStatus):
+        await event_bus.publish(
+            session_channel(self.session_id), {"type": "status", "status": status.value},
+        )
 
     async def _persist_artifacts(self, step_id: str, step_name: str, result: dict):
         artifacts_to_save = []
@@ -223,3 +413,33 @@ class SupervisorAgent:
             session.final_output = final
             await db.commit()
         await self._post_message("assistant", narration.get("executive_summary", "Analysis complete."), agent="narrator")
+        await self._publish_status(SessionStatus.done)
+
+
+def _partial_delta(previous, current) -> Optional[dict]:
+    """
+    What changed between two partial responses: {"append": text} for text that
+    grew, {"append": {key: text}, "set": {key: value}} for objects (string
+    values that grew, other keys that changed), else {"replace": value}.
+    None when nothing changed.
+    """
+    if isinstance(current, str) and isinstance(previous, str) and current.startswith(previous):
+        return {"append": current[len(previous):]} if len(current) > len(previous) else None
+    both_dicts = isinstance(current, dict) and isinstance(previous, dict)
+    if both_dicts and previous.keys() <= current.keys():
+        appended, changed = {}, {}
+        for key, value in current.items():
+            old = previous.get(key)
+            if key in previous and old == value:
+                continue
+            if isinstance(value, str) and isinstance(old, str) and value.startswith(old):
+                appended[key] = value[len(old):]
+            else:
+                changed[key] = value
+        delta = {}
+        if appended:
+            delta["append"] = appended
+        if changed:
+            delta["set"] = changed
+        return delta or None
+    return None if current == previous else {"replace": current}
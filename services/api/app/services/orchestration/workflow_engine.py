@@ -5,6 +5,7 @@ Executes custom agent graphs defined as nodes and edges.
 import asyncio
 import structlog
 import uuid
+from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
 from app.db.models import AgentWorkflow, WorkflowRun, WorkflowRunStatus
 from app.db.session import AsyncSessionLocal
@@ -30,15 +31,15 @@ class WorkflowEngine:
             if not workflow:
                 raise ValueError("Workflow not found")
             
-            # Initialize Run
-            run = WorkflowRun(
-                id=self.run_id,
-                workflow_id=self.workflow_id,
-                status=WorkflowRunStatus.running,
-                trigger_type="manual",
-                steps_log=[]
-            )
-            db.add(run)
+            # Initialize Run (the API creates it up front when it queues the workflow)
+            run = await db.get(WorkflowRun, self.run_id)
+            if run is None:
+                run = WorkflowRun(
+                    id=self.run_id, workflow_id=self.workflow_id, trigger_type="manual",
+                )
+                db.add(run)
+            run.status = WorkflowRunStatus.running
+            run.steps_log = []
             await db.commit()
 
             try:
@@ -53,23 +54,35 @@ class WorkflowEngine:
                     
                     result = await self._execute_node(node_type, config)
                     
-                    run.steps_log.append({
+                    run.steps_log = [*run.steps_log, {
                         "id": step_id,
                         "type": node_type,
                         "status": "success",
                         "output": result
-                    })
+                    }]
                     self.context[step_id] = result
                     await db.commit()
 
                 run.status = WorkflowRunStatus.succeeded
                 run.result = self.context
+                run.finished_at = datetime.now(timezone.utc)
+                await db.commit()
+
+            except asyncio.CancelledError:
+                # Job cancelled: close the run out, then let the cancellation propagate
+                log.info("workflow.execution.cancelled", workflow_id=self.workflow_id)
+                await db.rollback()
+                run = await db.get(WorkflowRun, self.run_id)
+                run.status = WorkflowRunStatus.failed
+                run.error = "Cancelled"
+                run.finished_at = datetime.now(timezone.utc)
                 await db.commit()
-                
+                raise
             except Exception as e:
                 log.error("workflow.execution.failed", workflow_id=self.workflow_id, error=str(e))
                 run.status = WorkflowRunStatus.failed
                 run.error = str(e)
+                run.finished_at = datetime.now(timezone.utc)
                 await db.commit()
                 raise e
 
@@ -117,3 +130,8 @@ class WorkflowEngine:
             return True
 
         return {"status": "node_executed"}
+
+
+async def execute_workflow(workflow_id: str, run_id: str):
+    """Run a queued WorkflowRun, as a "workflow.run" job."""
+    await WorkflowEngine(workflow_id, run_id=run_id).execute()
@@ -0,0 +1,312 @@
+"""
+Incremental profiling — bounded-memory column statistics merged chunk by chunk.
+
+Used by streaming ingestion: each DataFrame chunk is folded into per-column
+accumulators (counts, nulls, min/max, mean/variance via Welford/Chan merges)
+plus mergeable sketches (HyperLogLog, t-digest, heavy hitters) and a reservoir
+sample, so no more than one chunk is ever resident. Finished reports can be
+rehydrated and merged, letting incremental syncs extend a profile without a rescan.
+"""
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+from app.services.profiling.profiler import column_kind, numeric_stats
+from app.services.profiling.sketches import ColumnSketch, TDigest
+
+
+def _kind_of_profile(profile: dict) -> str:
+    """column_kind of the column a finished profile describes."""
+    dtype = profile.get("dtype") or ""
+    if "true_pct" in profile or dtype == "bool":
+        return "bool"
+    if dtype.startswith("datetime64"):
+        return "datetime"
+    if profile.get("mean") is not None or "quantiles" in profile or "negative_count" in profile:
+        return "numeric"
+    return "object"
+
+
+class ColumnAccumulator:
+    """
+    Running statistics for one column. Mergeable across chunks and across reports;
+    to_profile() emits the same keys per column kind as profile_frame.
+    """
+
+    def __init__(self, top_k: int = 5, distinct_cap: int = 100_000):
+        self.top_k = top_k
+        self.distinct_cap = distinct_cap
+        self.dtype: Optional[str] = None
+        self.kind: Optional[str] = None  # column_kind, except categoricals count as "object"
+        self.rows = 0
+        self.nulls = 0
+        # Numeric moments (Welford / Chan et al. parallel form)
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.negatives = 0
+        self.trues = 0  # bool columns
+        # Datetime columns
+        self.first: Optional[pd.Timestamp] = None
+        self.last: Optional[pd.Timestamp] = None
+        self.sketch = ColumnSketch()
+        # Exact distinct values while they fit; the HLL estimate takes over beyond
+        self.distinct: set = set()
+        self.distinct_exact = True
+        self.distinct_floor = 0  # known lower bound carried over from sketch-less reports
+
+    def update(self, series: pd.Series, stats: Optional[dict] = None):
+        """`stats` is this chunk's numeric_stats entry when the caller computed it block-wise."""
+        kind = column_kind(series)
+        self._merge_dtype(str(series.dtype), "object" if kind == "category" else kind)
+        self.rows += len(series)
+        null_mask = series.isna()
+        self.nulls += int(null_mask.sum())
+        values = series[~null_mask]
+        if values.empty:
+            return
+
+        self.sketch.hll.update(values)
+        if kind == "numeric":
+            if stats is None:
+                stats = next(iter(numeric_stats(values.to_frame()).values()))
+            self._merge_moments(stats["n"], stats["mean"], stats["m2"])
+            self.min = stats["min"] if self.min is None else min(self.min, stats["min"])
+            self.max = stats["max"] if self.max is None else max(self.max, stats["max"])
+            self.negatives += stats["negatives"]
+            if self.sketch.digest is None:
+                self.sketch.digest = TDigest()
+            self.sketch.digest.update(values.to_numpy(dtype=np.float64))
+        else:
+            self.sketch.heavy.update(values)
+            if kind == "bool":
+                self.trues += int(values.sum())
+            elif kind == "datetime":
+                self._merge_range(values.min(), values.max())
+
+        if self.distinct_exact:
+            self.distinct.update(values.unique().tolist())
+            if len(self.distinct) > self.distinct_cap:
+                self.distinct_exact = False
+                self.distinct = set()
+
+    def merge(self, other: "ColumnAccumulator"):
+        self._merge_dtype(other.dtype, other.kind)
+        self.rows += other.rows
+        self.nulls += other.nulls
+        if other.n:
+            self._merge_moments(other.n, other.mean, other.m2)
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+            self.negatives += other.negatives
+        self.trues += other.trues
+        if other.first is not None and self.kind == "datetime":
+            self._merge_range(other.first, other.last)
+        self.sketch.merge(other.sketch)
+        self.distinct_floor = max(self.distinct_floor, other.distinct_floor)
+        self.distinct_exact = self.distinct_exact and other.distinct_exact
+        if self.distinct_exact:
+            self.distinct |= other.distinct
+            self.distinct_exact = len(self.distinct) <= self.distinct_cap
+        if not self.distinct_exact:
+            self.distinct = set()
+
+    @classmethod
+    def from_profile(
+        cls, profile: dict, sketch: Optional[dict], rows: int, top_k: int = 5,
+        distinct_cap: int = 100_000,
+    ) -> "ColumnAccumulator":
+        """Rehydrate from a finished column profile (and its sketch, when the report has one)."""
+        acc = cls(top_k, distinct_cap)
+        acc.dtype = profile.get("dtype")
+        acc.kind = _kind_of_profile(profile)
+        acc.rows = rows
+        acc.nulls = profile.get("null_count", round(profile.get("null_pct", 0.0) * rows / 100))
+        if acc.kind == "bool":
+            if profile.get("true_pct") is not None:
+                acc.trues = round(profile["true_pct"] * (rows - acc.nulls) / 100)
+            else:  # reports from before bool columns carried true_pct
+                acc.trues = (profile.get("top_values") or {}).get("True", 0)
+        if acc.kind == "datetime" and profile.get("min") is not None:
+            acc.first, acc.last = pd.Timestamp(profile["min"]), pd.Timestamp(profile["max"])
+        if acc.kind == "numeric" and profile.get("mean") is not None:
+            acc.n = rows - acc.nulls
+            acc.mean = profile["mean"]
+            acc.m2 = (profile.get("std") or 0.0) ** 2 * max(acc.n - 1, 0)
+            acc.min, acc.max = profile.get("min"), profile.get("max")
+            acc.negatives = profile.get("negative_count", 0)
+        if sketch:
+            acc.sketch = ColumnSketch.from_dict(sketch)
+        else:
+            acc.distinct_floor = profile.get("unique_count", 0)
+            top_values = pd.Series(profile.get("top_values") or {}, dtype=np.int64)
+            acc.sketch.heavy.update_counts(top_values)
+        acc.distinct_exact = False
+        return acc
+
+    def to_profile(self) -> dict:
+        profile = {
+            "dtype": self.dtype or "object",
+            "null_pct": round(self.nulls / self.rows * 100, 2) if self.rows else 0.0,
+            "null_count": self.nulls,
+        }
+        if self.distinct_exact:
+            profile["unique_count"] = len(self.distinct)
+        else:
+            profile["unique_count"] = max(self.sketch.hll.estimate(), self.distinct_floor)
+            profile["unique_count_approx"] = True
+        if self.kind == "numeric":
+            std = (self.m2 / (self.n - 1)) ** 0.5 if self.n > 1 else None
+            profile.update({
+                "mean": round(self.mean, 4) if self.n else None,
+                "std": round(std, 4) if std is not None else None,
+                "min": self.min,
+                "max": self.max,
+                "negative_count": self.negatives,
+            })
+            quantiles = self.sketch.quantiles()
+            if quantiles:
+                profile["quantiles"] = quantiles
+        elif self.kind == "bool":
+            present = self.rows - self.nulls
+            profile["true_pct"] = round(self.trues / present * 100, 2) if present else None
+        elif self.kind == "datetime":
+            if self.first is not None:
+                profile["min"] = self.first.isoformat()
+                profile["max"] = self.last.isoformat()
+        else:
+            profile["top_values"] = self.sketch.heavy.top(self.top_k)
+        return profile
+
+    def _merge_moments(self, n_b: int, mean_b: float, m2_b: float):
+        n_a = self.n
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * n_a * n_b / n
+        self.n = n
+
+    def _merge_range(self, first: pd.Timestamp, last: pd.Timestamp):
+        self.first = first if self.first is None else min(self.first, first)
+        self.last = last if self.last is None else max(self.last, last)
+
+    def _merge_dtype(self, dtype: Optional[str], kind: Optional[str]):
+        if dtype is None or dtype == self.dtype:
+            return
+        if self.dtype is None:
+            self.dtype, self.kind = dtype, kind
+        elif kind == self.kind == "numeric":
+            self.dtype = "float64"  # e.g. an int64 chunk followed by a chunk with NaNs
+        elif kind == self.kind and kind != "datetime":
+            self.dtype = "object"  # e.g. a categorical chunk followed by a string one
+        else:
+            # Mixed kinds (or datetime dtypes) across chunks: profile it as plain values
+            self.dtype, self.kind = "object", "object"
+            self.first = self.last = None
+
+
+class ReservoirSample:
+    """Uniform fixed-size row sample over a stream of DataFrame chunks (Algorithm R)."""
+
+    def __init__(self, size: int = 200, seed: int = 0):
+        self.size = size
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._rows: list[dict] = []
+
+    def update(self, chunk: pd.DataFrame):
+        n = len(chunk)
+        if n == 0:
+            return
+        fill = max(0, min(self.size - len(self._rows), n))
+        if fill:
+            self._rows.extend(chunk.iloc[:fill].to_dict(orient="records"))
+        if fill < n:
+            positions = np.arange(self.seen + fill, self.seen + n)
+            slots = self._rng.integers(0, positions + 1)
+            hits = np.nonzero(slots < self.size)[0]
+            if len(hits):
+                replacements = chunk.iloc[hits + fill].to_dict(orient="records")
+                for slot, row in zip(slots[hits], replacements):
+                    self._rows[slot] = row
+        self.seen += n
+
+    def rows(self) -> list[dict]:
+        return list(self._rows)
+
+
+class IncrementalProfiler:
+    """Folds DataFrame chunks into a profile report shaped like profile_frame."""
+
+    def __init__(self, top_k: int = 5, distinct_cap: int = 100_000):
+        self.top_k = top_k
+        self.distinct_cap = distinct_cap
+        self.rows = 0
+        self.chunks = 0
+        self.columns: dict[str, ColumnAccumulator] = {}
+
+    def update(self, chunk: pd.DataFrame):
+        numeric = numeric_stats(chunk)
+        for col in chunk.columns:
+            acc = self.columns.get(col)
+            if acc is None:
+                acc = self.columns[col] = self._new_column()
+            acc.update(chunk[col], numeric.get(col))
+        for col, acc in self.columns.items():
+            if col not in chunk.columns:
+                acc.rows += len(chunk)
+                acc.nulls += len(chunk)
+        self.rows += len(chunk)
+        self.chunks += 1
+
+    def merge(self, other: "IncrementalProfiler") -> "IncrementalProfiler":
+        for col, theirs in other.columns.items():
+            if col not in self.columns:
+                self.columns[col] = self._new_column()
+            self.columns[col].merge(theirs)
+        for col, acc in self.columns.items():
+            if col not in other.columns:
+                acc.rows += other.rows
+                acc.nulls += other.rows
+        self.rows += other.rows
+        self.chunks += other.chunks
+        return self
+
+    def report(self) -> dict:
+        return {
+            "row_count": self.rows,
+            "column_count": len(self.columns),
+            "columns": {col: acc.to_profile() for col, acc in self.columns.items()},
+            "sketches": {col: acc.sketch.to_dict() for col, acc in self.columns.items()},
+        }
+
+    @classmethod
+    def from_report(
+        cls, report: dict, top_k: int = 5, distinct_cap: int = 100_000,
+    ) -> "IncrementalProfiler":
+        profiler = cls(top_k, distinct_cap)
+        profiler.rows = report.get("row_count", 0)
+        sketches = report.get("sketches") or {}
+        for col, profile in (report.get("columns") or {}).items():
+            profiler.columns[col] = ColumnAccumulator.from_profile(
+                profile, sketches.get(col), profiler.rows, top_k, distinct_cap,
+            )
+        return profiler
+
+    def _new_column(self) -> ColumnAccumulator:
+        acc = ColumnAccumulator(self.top_k, self.distinct_cap)
+        # Columns first seen late were null for every earlier row
+        acc.rows = acc.nulls = self.rows
+        return acc
+
+
+def merge_reports(base: dict, update: dict) -> dict:
+    """Combine two profile reports (e.g. the previous sync's and an incremental batch's)."""
+    if not base:
+        return update
+    if not update:
+        return base
+    merged = IncrementalProfiler.from_report(base).merge(IncrementalProfiler.from_report(update))
+    return merged.report()
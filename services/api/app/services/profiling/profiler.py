@@ -0,0 +1,242 @@
+"""
+Column profiler — every statistic for every column in as few scans as possible.
+
+Numeric columns are reduced together as 2-D float64 slabs (count, mean, M2,
+min, max and negatives per column from one set of NumPy reductions, merged
+across slabs with Chan's formula), so memory stays bounded regardless of row
+count. Categoricals count their integer codes, and object columns derive both
+distinct count and top values from a single value_counts. Each column can also
+get mergeable sketches (see sketches.py) so later syncs can extend the profile;
+their HyperLogLog is fed the distinct values those passes already produce
+rather than every row.
+"""
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+from app.services.profiling.sketches import ColumnSketch, HyperLogLog, TDigest
+
+# Elements per numeric slab (~64 MB of float64)
+SLAB_ELEMENTS = 1 << 23
+# Elements per column group sorted together for distinct counts (~256 MB)
+SORT_ELEMENTS = 1 << 25
+
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def column_kind(series: pd.Series) -> str:
+    dtype = series.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "category"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "numeric"
+    return "object"
+
+
+def numeric_stats(df: pd.DataFrame, columns: Optional[list] = None) -> dict[str, dict]:
+    """
+    Per-column {"n", "nulls", "mean", "m2", "min", "max", "negatives"} for numeric
+    columns. `m2` is the sum of squared deviations, so results merge exactly.
+    """
+    candidates = columns if columns is not None else df.columns
+    columns = [c for c in candidates if column_kind(df[c]) == "numeric"]
+    if not columns:
+        return {}
+    width = len(columns)
+    n = np.zeros(width)
+    mean = np.zeros(width)
+    m2 = np.zeros(width)
+    lo = np.full(width, np.nan)
+    hi = np.full(width, np.nan)
+    negatives = np.zeros(width, dtype=np.int64)
+
+    slab_rows = max(SLAB_ELEMENTS // width, 1)
+    block = df[columns]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for start in range(0, len(block), slab_rows):
+            arr = block.iloc[start:start + slab_rows].to_numpy(dtype=np.float64, na_value=np.nan)
+            # fmin/fmax skip NaN without the all-NaN-slice warnings of nanmin/nanmax
+            lo = np.fmin(lo, np.fmin.reduce(arr, axis=0))
+            hi = np.fmax(hi, np.fmax.reduce(arr, axis=0))
+            nan_mask = np.isnan(arr)
+            has_nan = nan_mask.any()
+            if has_nan:
+                arr = np.where(nan_mask, 0.0, arr)
+            n_b = len(arr) - nan_mask.sum(axis=0)
+            mean_b = arr.sum(axis=0) / n_b
+            dev = arr - mean_b
+            if has_nan:
+                dev[nan_mask] = 0.0
+            m2_b = np.einsum("ij,ij->j", dev, dev)
+            negatives += (arr < 0).sum(axis=0)
+
+            total = n + n_b
+            delta = np.where(n_b > 0, mean_b - mean, 0.0)
+            weight = np.where(total > 0, n_b / total, 0.0)
+            m2 = m2 + np.where(n_b > 0, m2_b, 0.0) + delta * delta * n * weight
+            mean = mean + delta * weight
+            n = total
+
+    rows = len(df)
+    return {
+        col: {
+            "n": int(n[i]),
+            "nulls": rows - int(n[i]),
+            "mean": float(mean[i]) if n[i] else None,
+            "m2": float(m2[i]),
+            "min": float(lo[i]) if n[i] else None,
+            "max": float(hi[i]) if n[i] else None,
+            "negatives": int(negatives[i]),
+        }
+        for i, col in enumerate(columns)
+    }
+
+
+def sorted_summaries(
+    df: pd.DataFrame, columns: list, hll: bool = False,
+) -> dict[str, tuple[int, TDigest, Optional[HyperLogLog]]]:
+    """
+    Exact non-null distinct count and a t-digest per numeric column, plus with
+    `hll` a HyperLogLog. Same-dtype columns are sorted together as one 2-D block;
+    distinct values are counted as value changes down each column (several times
+    faster than hashing column by column), the sorted order feeds the digest
+    without a second sort, and only the distinct values are hashed.
+    """
+    out = {}
+    groups: dict = {}
+    for col in columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in "iuf":
+            groups.setdefault(dtype, []).append(col)
+        else:
+            digest = TDigest()
+            digest.update(df[col].to_numpy(dtype=np.float64, na_value=np.nan))
+            sketch = HyperLogLog() if hll else None
+            if sketch:
+                sketch.update(df[col])
+            out[col] = (int(df[col].nunique()), digest, sketch)
+    width = max(SORT_ELEMENTS // max(len(df), 1), 1)
+    for dtype, cols in groups.items():
+        for start in range(0, len(cols), width):
+            group = cols[start:start + width]
+            block = np.sort(df[group].to_numpy(), axis=0)
+            if len(block) == 0:
+                out.update({c: (0, TDigest(), HyperLogLog() if hll else None) for c in group})
+                continue
+            changes = block[1:] != block[:-1]
+            if dtype.kind == "f":
+                # NaNs sort last; don't count them or the boundary into them
+                changes &= ~np.isnan(block[1:])
+                present = ~np.isnan(block[0])
+                valid = (~np.isnan(block)).sum(axis=0)
+            else:
+                present = np.ones(len(group), dtype=bool)
+                valid = np.full(len(group), len(block))
+            distinct = changes.sum(axis=0) + present
+            for i, col in enumerate(group):
+                values = block[:valid[i], i]
+                digest = TDigest()
+                digest.update_sorted(values.astype(np.float64))
+                sketch = HyperLogLog() if hll else None
+                if sketch and len(values):
+                    first = np.ones(len(values), dtype=bool)
+                    first[1:] = changes[:len(values) - 1, i]
+                    # Already NaN-free: hash as hash_values does, minus its dropna copy
+                    sketch.update_hashes(pd.util.hash_array(
+                        values[first].astype(np.float64), categorize=False,
+                    ))
+                out[col] = (int(distinct[i]), digest, sketch)
+    return out
+
+
+def profile_frame(df: pd.DataFrame, top_k: int = 5, sketches: bool = True) -> dict:
+    """
+    Profile report: {"row_count", "column_count", "columns": {name: {...}}} plus,
+    with `sketches`, mergeable per-column sketches under "sketches" and quantiles
+    on numeric columns.
+    """
+    total = len(df)
+    numeric = numeric_stats(df)
+    summaries = sorted_summaries(df, list(numeric), hll=sketches)
+    columns = {}
+    column_sketches = {}
+    for col in df.columns:
+        series = df[col]
+        kind = column_kind(series)
+        sketch = ColumnSketch() if sketches else None
+        if kind == "numeric":
+            stats = numeric[col]
+            nulls = stats["nulls"]
+        else:
+            nulls = int(series.isna().sum())
+        profile = {
+            "dtype": str(series.dtype),
+            "null_pct": round(nulls / total * 100, 2) if total else 0.0,
+            "null_count": nulls,
+        }
+
+        if kind == "numeric":
+            distinct, digest, hll = summaries[col]
+            std = (stats["m2"] / (stats["n"] - 1)) ** 0.5 if stats["n"] > 1 else None
+            profile.update({
+                "unique_count": distinct,
+                "mean": round(stats["mean"], 4) if stats["mean"] is not None else None,
+                "std": round(std, 4) if std is not None else None,
+                "min": stats["min"],
+                "max": stats["max"],
+                "negative_count": stats["negatives"],
+            })
+            if sketch:
+                sketch.digest, sketch.hll = digest, hll
+                quantiles = sketch.quantiles()
+                if quantiles:
+                    profile["quantiles"] = quantiles
+        elif kind == "category":
+            codes = series.cat.codes.to_numpy()
+            counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+            order = np.argsort(counts)[::-1][:top_k]
+            profile["unique_count"] = int((counts > 0).sum())
+            profile["top_values"] = {
+                _plain(series.cat.categories[i]): int(counts[i]) for i in order if counts[i] > 0
+            }
+            if sketch:
+                categories = series.cat.categories.astype(str)
+                sketch.heavy.update_counts(pd.Series(counts, index=categories))
+                sketch.hll.update(pd.Series(categories[counts > 0], dtype=object))
+        elif kind == "bool":
+            trues = int(series.sum())
+            profile["unique_count"] = int(trues > 0) + int(total - nulls - trues > 0)
+            profile["true_pct"] = round(trues / (total - nulls) * 100, 2) if total > nulls else None
+            if sketch:
+                falses = total - nulls - trues
+                sketch.heavy.update_counts(pd.Series({"True": trues, "False": falses}))
+                sketch.hll.update(pd.Series([True] * (trues > 0) + [False] * (falses > 0)))
+        elif kind == "datetime":
+            profile["unique_count"] = int(series.nunique())
+            if nulls < total:
+                profile["min"] = series.min().isoformat()
+                profile["max"] = series.max().isoformat()
+            if sketch:
+                sketch.hll.update(series)
+        else:
+            counts = series.value_counts()
+            profile["unique_count"] = len(counts)
+            profile["top_values"] = counts.head(top_k).to_dict()
+            if sketch:
+                sketch.heavy.update_counts(counts)
+                sketch.hll.update(counts.index.to_series())
+
+        if sketch:
+            column_sketches[col] = sketch.to_dict()
+        columns[col] = profile
+
+    report = {"row_count": total, "column_count": len(df.columns), "columns": columns}
+    if sketches:
+        report["sketches"] = column_sketches
+    return report
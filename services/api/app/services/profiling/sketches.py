@@ -0,0 +1,253 @@
+"""
+Mergeable profile sketches — bounded-size summaries that combine across chunks and syncs.
+
+- HyperLogLog: distinct counts (~1.6% error at the default precision)
+- TDigest: quantiles, accurate at the tails
+- HeavyHitters: Misra-Gries frequent items (the dual of space-saving)
+
+Every sketch round-trips through to_dict()/from_dict() as plain JSON, so it can
+live in SyncRun.profile_report and be merged later without rescanning data.
+"""
+import base64
+import zlib
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+
+def hash_values(values: pd.Series) -> np.ndarray:
+    """Stable 64-bit hashes; numbers hash by value so int and float chunks agree."""
+    values = values.dropna()
+    if pd.api.types.is_bool_dtype(values.dtype):
+        arr = values.to_numpy(dtype=np.uint8)
+    elif pd.api.types.is_datetime64_any_dtype(values.dtype):
+        arr = values.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    elif pd.api.types.is_numeric_dtype(values.dtype):
+        arr = values.to_numpy(dtype=np.float64)
+    else:
+        arr = values.astype(str).to_numpy(dtype=object)
+    return pd.util.hash_array(arr, categorize=False)
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    # Exact while x < 2**53, which HyperLogLog guarantees by requiring p >= 11
+    return np.frexp(x.astype(np.float64))[1].astype(np.uint8)
+
+
+class HyperLogLog:
+    def __init__(self, p: int = 12, registers: Optional[np.ndarray] = None):
+        if not 11 <= p <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 11 and 18, got {p}")
+        self.p = p
+        self.registers = registers if registers is not None else np.zeros(1 << p, dtype=np.uint8)
+
+    def update(self, values: pd.Series):
+        self.update_hashes(hash_values(values))
+
+    def update_hashes(self, hashes: np.ndarray):
+        if not len(hashes):
+            return
+        bits = 64 - self.p
+        index = (hashes >> np.uint64(bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        rank = (bits - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.p != self.p:
+            raise ValueError(f"Cannot merge HyperLogLog p={self.p} with p={other.p}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int32)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * np.log(m / zeros)))  # linear counting for small cardinalities
+        return int(round(raw))
+
+    def to_dict(self) -> dict:
+        packed = base64.b64encode(zlib.compress(self.registers.tobytes())).decode()
+        return {"p": self.p, "registers": packed}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HyperLogLog":
+        raw = zlib.decompress(base64.b64decode(data["registers"]))
+        return cls(data["p"], np.frombuffer(raw, dtype=np.uint8).copy())
+
+
+class TDigest:
+    """Merging t-digest with the k1 (arcsine) scale; at most ~delta/2 centroids."""
+
+    def __init__(
+        self, delta: int = 200, means: Optional[np.ndarray] = None,
+        weights: Optional[np.ndarray] = None,
+    ):
+        self.delta = delta
+        self.means = means if means is not None else np.empty(0)
+        self.weights = weights if weights is not None else np.empty(0)
+        self.min: Optional[float] = float(self.means[0]) if len(self.means) else None
+        self.max: Optional[float] = float(self.means[-1]) if len(self.means) else None
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        self.update_sorted(np.sort(values[~np.isnan(values)]))
+
+    def update_sorted(self, values: np.ndarray):
+        """Fold in already-sorted, NaN-free values; clusters are cut at k-scale boundaries."""
+        n = len(values)
+        if not n:
+            return
+        k = np.arange(-self.delta // 4, self.delta // 4 + 1)
+        q = (np.sin(2 * np.pi * k / self.delta) + 1) / 2
+        starts = np.unique(np.clip(np.floor(q * n).astype(np.int64), 0, n - 1))
+        weights = np.diff(np.append(starts, n)).astype(np.float64)
+        means = np.add.reduceat(values, starts) / weights
+        self._absorb(means, weights, float(values[0]), float(values[-1]))
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        if len(other.means):
+            self._absorb(other.means, other.weights, other.min, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not len(self.means):
+            return None
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        target = q * total
+        value = float(np.interp(target, centers, self.means))
+        return min(max(value, self.min), self.max)
+
+    def _absorb(self, means: np.ndarray, weights: np.ndarray, lo: float, hi: float):
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+        means = np.concatenate([self.means, means])
+        weights = np.concatenate([self.weights, weights])
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        mid = (np.cumsum(weights) - weights / 2) / total
+        cluster = np.floor(self.delta / (2 * np.pi) * np.arcsin(2 * mid - 1))
+        starts = np.flatnonzero(np.diff(cluster, prepend=cluster[0] - 1))
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def to_dict(self) -> dict:
+        return {
+            "delta": self.delta,
+            "means": self.means.tolist(),
+            "weights": self.weights.tolist(),
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TDigest":
+        digest = cls(
+            data["delta"],
+            np.asarray(data["means"], dtype=np.float64),
+            np.asarray(data["weights"], dtype=np.float64),
+        )
+        digest.min, digest.max = data.get("min"), data.get("max")
+        return digest
+
+
+class HeavyHitters:
+    """
+    Misra-Gries summary over string-keyed items. Counts are lower bounds that
+    undercount by at most `error` (<= total / (capacity + 1)).
+    """
+
+    def __init__(self, capacity: int = 32, counts: Optional[dict[str, int]] = None, error: int = 0):
+        self.capacity = capacity
+        self.counts: dict[str, int] = counts or {}
+        self.error = error
+
+    def update(self, values: pd.Series):
+        self.update_counts(values.dropna().astype(str).value_counts())
+
+    def update_counts(self, counts: pd.Series):
+        """Fold in exact per-item counts (e.g. a chunk's value_counts())."""
+        if len(counts) > self.capacity + 1:
+            # Only the top capacity+1 items are folded in; the largest dropped
+            # count bounds how far any dropped item is undercounted
+            counts = counts.sort_values(ascending=False)
+            self.error += int(counts.iloc[self.capacity + 1])
+            counts = counts.iloc[:self.capacity + 1]
+        counts = counts.astype(np.int64).groupby(counts.index.astype(str)).sum()
+        merged = pd.Series(self.counts, dtype=np.int64).add(counts, fill_value=0).astype(np.int64)
+        self._prune(merged)
+
+    def merge(self, other: "HeavyHitters") -> "HeavyHitters":
+        self.error += other.error
+        self.update_counts(pd.Series(other.counts, dtype=np.int64))
+        return self
+
+    def top(self, k: int) -> dict[str, int]:
+        return dict(sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:k])
+
+    def _prune(self, merged: pd.Series):
+        if len(merged) > self.capacity:
+            merged = merged.sort_values(ascending=False)
+            cut = int(merged.iloc[self.capacity])
+            merged = merged.iloc[:self.capacity] - cut
+            merged = merged[merged > 0]
+            self.error += cut
+        self.counts = {str(k): int(v) for k, v in merged.items()}
+
+    def to_dict(self) -> dict:
+        return {"capacity": self.capacity, "counts": self.counts, "error": self.error}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HeavyHitters":
+        return cls(data["capacity"], dict(data["counts"]), data.get("error", 0))
+
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+class ColumnSketch:
+    """The sketches kept per profiled column; numeric columns also carry a digest."""
+
+    def __init__(
+        self,
+        hll: Optional[HyperLogLog] = None,
+        digest: Optional[TDigest] = None,
+        heavy: Optional[HeavyHitters] = None,
+    ):
+        self.hll = hll or HyperLogLog()
+        self.digest = digest
+        self.heavy = heavy or HeavyHitters()
+
+    def merge(self, other: "ColumnSketch") -> "ColumnSketch":
+        self.hll.merge(other.hll)
+        self.heavy.merge(other.heavy)
+        if other.digest is not None:
+            self.digest = (self.digest or TDigest(other.digest.delta)).merge(other.digest)
+        return self
+
+    def quantiles(self) -> Optional[dict]:
+        if self.digest is None or not len(self.digest.means):
+            return None
+        return {f"p{round(q * 100):02d}": self.digest.quantile(q) for q in QUANTILES}
+
+    def to_dict(self) -> dict:
+        data = {"hll": self.hll.to_dict(), "heavy_hitters": self.heavy.to_dict()}
+        if self.digest is not None:
+            data["tdigest"] = self.digest.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ColumnSketch":
+        return cls(
+            HyperLogLog.from_dict(data["hll"]),
+            TDigest.from_dict(data["tdigest"]) if "tdigest" in data else None,
+            HeavyHitters.from_dict(data["heavy_hitters"]),
+        )
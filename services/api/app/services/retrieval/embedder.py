@@ -0,0 +1,59 @@
+"""
+Embedding functions for the retrieval index.
+
+The default HashingEmbedder needs no model download: word unigrams and
+bigrams are feature-hashed (signed, so collisions cancel rather than pile up)
+into a fixed number of dimensions with sublinear term frequency. The index
+fits IDF weights over its own corpus, so the vectors end up TF-IDF weighted.
+Other embedders plug in through EMBEDDERS as long as they expose `name`,
+`dim`, `uses_idf` and `embed(texts) -> (n, dim) float32`.
+"""
+import re
+from itertools import chain
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    name = "hashing"
+    uses_idf = True
+
+    def __init__(self, dim: Optional[int] = None):
+        self.dim = dim or settings.RETRIEVAL_DIM
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Unnormalized (n, dim) term vectors; the index applies IDF and L2 normalization."""
+        n = len(texts)
+        features = [_features(t) for t in texts]
+        lengths = np.fromiter(map(len, features), dtype=np.int64, count=n)
+        flat = np.fromiter(chain.from_iterable(features), dtype=object, count=int(lengths.sum()))
+        if not len(flat):
+            return np.zeros((n, self.dim), dtype=np.float32)
+        hashes = pd.util.hash_array(flat, categorize=False)
+        buckets = (hashes % np.uint64(self.dim)).astype(np.int64)
+        cells = np.repeat(np.arange(n), lengths) * self.dim + buckets
+        signs = np.where(hashes >> np.uint64(63), -1.0, 1.0)
+        counts = np.bincount(cells, weights=signs, minlength=n * self.dim).reshape(n, self.dim)
+        return (np.sign(counts) * np.log1p(np.abs(counts))).astype(np.float32)
+
+
+def _features(text: str) -> list[str]:
+    words = WORD.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+EMBEDDERS = {
+    "hashing": HashingEmbedder,
+}
+
+
+def get_embedder(name: Optional[str] = None, dim: Optional[int] = None):
+    name = name or settings.RETRIEVAL_EMBEDDER
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedder: {name}")
+    return EMBEDDERS[name](dim=dim)
@@ -0,0 +1,224 @@
+"""
+Vector index over a chunk snapshot — a memory-mapped float32 matrix on disk.
+
+Layout of an index directory:
+  vectors.f32   (n, dim) unit vectors, grouped by IVF list
+  order.npy     vector row -> chunk row in the snapshot
+  records.bin   JSON records (chunk_id, source_file, page, text) in chunk order
+  offsets.npy   byte offsets into records.bin
+  centroids.npy / lists.npy   IVF centroids and each list's [start, end) rows
+  idf.npy       IDF weights applied to query vectors
+  meta.json     written last; its presence marks a complete index
+
+Small indexes are a single list and searched exhaustively in blocks; above
+RETRIEVAL_IVF_MIN_ROWS vectors are clustered with spherical k-means so a query
+only scans the `nprobe` lists nearest to it.
+"""
+import json
+import os
+import shutil
+from typing import Optional
+import numpy as np
+import structlog
+
+from app.core.config import settings
+from app.services.retrieval.embedder import get_embedder
+from app.services.snapshots.store import SnapshotReader
+
+log = structlog.get_logger()
+
+BLOCK_ROWS = 65_536
+RECORD_COLUMNS = ("chunk_id", "source_file", "page")
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.where(norms > 0, norms, 1.0)
+
+
+class VectorIndex:
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.count = self.meta["count"]
+        self.embedder = get_embedder(self.meta["embedder"], self.meta["dim"])
+        dim = self.meta["dim"]
+        if self.count:
+            self.vectors = np.memmap(
+                os.path.join(path, "vectors.f32"), dtype=np.float32, mode="r",
+                shape=(self.count, dim),
+            )
+            self.records = np.memmap(os.path.join(path, "records.bin"), dtype=np.uint8, mode="r")
+        else:
+            self.vectors = np.zeros((0, dim), np.float32)
+            self.records = None
+        self.order = np.load(os.path.join(path, "order.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+        self.centroids = np.load(os.path.join(path, "centroids.npy"))
+        self.lists = np.load(os.path.join(path, "lists.npy"))
+        self.idf = np.load(os.path.join(path, "idf.npy"))
+
+    def embed_queries(self, queries: list[str]) -> np.ndarray:
+        vecs = self.embedder.embed(queries)
+        if self.embedder.uses_idf:
+            vecs = vecs * self.idf
+        return _normalize(vecs).astype(np.float32)
+
+    def search(
+        self, queries: list[str], k: int = 5, nprobe: Optional[int] = None,
+    ) -> list[list[dict]]:
+        """Top-k chunks per query by cosine similarity, best first."""
+        if not self.count:
+            return [[] for _ in queries]
+        q = self.embed_queries(queries)
+        if len(self.lists) == 1:
+            hits = self._search_flat(q, k)
+        else:
+            nprobe = nprobe or settings.RETRIEVAL_NPROBE
+            hits = [self._search_ivf(vec, k, nprobe) for vec in q]
+        return [[self._record(row, score) for row, score in found if score > 0] for found in hits]
+
+    def _search_flat(self, q: np.ndarray, k: int) -> list[list[tuple[int, float]]]:
+        """Exhaustive batched scan: one matrix product per block for all queries."""
+        best_rows = np.empty((len(q), 0), dtype=np.int64)
+        best_scores = np.empty((len(q), 0), dtype=np.float32)
+        for start in range(0, self.count, BLOCK_ROWS):
+            scores = q @ self.vectors[start:start + BLOCK_ROWS].T
+            rows = np.broadcast_to(np.arange(start, start + scores.shape[1]), scores.shape)
+            best_rows, best_scores = _top_k(
+                np.hstack([best_rows, rows]), np.hstack([best_scores, scores]), k,
+            )
+        return [list(zip(r.tolist(), s.tolist())) for r, s in zip(best_rows, best_scores)]
+
+    def _search_ivf(self, vec: np.ndarray, k: int, nprobe: int) -> list[tuple[int, float]]:
+        nprobe = min(nprobe, len(self.centroids))
+        probes = np.argpartition(-(self.centroids @ vec), nprobe - 1)[:nprobe]
+        rows, scores = [], []
+        for c in probes:
+            start, end = self.lists[c]
+            if end > start:
+                scores.append(self.vectors[start:end] @ vec)
+                rows.append(np.arange(start, end))
+        if not rows:
+            return []
+        best_rows, best_scores = _top_k(np.concatenate(rows)[None], np.concatenate(scores)[None], k)
+        return list(zip(best_rows[0].tolist(), best_scores[0].tolist()))
+
+    def _record(self, row: int, score: float) -> dict:
+        chunk = int(self.order[row])
+        raw = bytes(self.records[self.offsets[chunk]:self.offsets[chunk + 1]])
+        return {**json.loads(raw), "score": round(float(score), 4)}
+
+
+def _top_k(rows: np.ndarray, scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    if scores.shape[1] > k:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        rows, scores = np.take_along_axis(rows, part, 1), np.take_along_axis(scores, part, 1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(rows, order, 1), np.take_along_axis(scores, order, 1)
+
+
+def build_index(
+    storage_path: str, path: str, embedder_name: Optional[str] = None,
+    snapshot_id: Optional[str] = None,
+) -> VectorIndex:
+    """
+    Embed every chunk of a snapshot into a new index at `path` (built aside, then
+    renamed into place).
+    """
+    embedder = get_embedder(embedder_name)
+    dim = embedder.dim
+    reader = SnapshotReader(storage_path)
+    n = reader.count()
+    tmp = f"{path}.building"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    schema_names = set(reader.dataset().schema.names)
+    columns = ["text"] + [c for c in RECORD_COLUMNS if c in schema_names]
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    df = np.zeros(dim, dtype=np.int64)
+    raw = np.memmap(
+        os.path.join(tmp, "raw.f32"), dtype=np.float32, mode="w+", shape=(max(n, 1), dim),
+    )
+    pos = 0
+    with open(os.path.join(tmp, "records.bin"), "wb") as records:
+        for batch in reader.iter_batches(columns=columns, batch_size=8192):
+            texts = batch["text"].fillna("").tolist()
+            vecs = embedder.embed(texts)
+            raw[pos:pos + len(texts)] = vecs
+            df += (vecs != 0).sum(axis=0)
+            rows = batch.astype(object).where(batch.notna(), None).to_dict(orient="records")
+            for i, rec in enumerate(rows):
+                blob = json.dumps(rec, default=str).encode()
+                records.write(blob)
+                offsets[pos + i + 1] = offsets[pos + i] + len(blob)
+            pos += len(texts)
+
+    if embedder.uses_idf:
+        idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+    else:
+        idf = np.ones(dim, np.float32)
+    for start in range(0, n, BLOCK_ROWS):
+        block = raw[start:start + BLOCK_ROWS]
+        raw[start:start + BLOCK_ROWS] = _normalize(block * idf if embedder.uses_idf else block)
+
+    if n >= settings.RETRIEVAL_IVF_MIN_ROWS:
+        centroids = _spherical_kmeans(raw, n, int(min(max(np.sqrt(n), 16), 4096)))
+        labels = np.concatenate([
+            np.argmax(raw[s:s + BLOCK_ROWS] @ centroids.T, axis=1) for s in range(0, n, BLOCK_ROWS)
+        ])
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(len(centroids) + 1))
+        lists = np.stack([bounds[:-1], bounds[1:]], axis=1)
+        vectors = np.memmap(
+            os.path.join(tmp, "vectors.f32"), dtype=np.float32, mode="w+", shape=(n, dim),
+        )
+        for start in range(0, n, BLOCK_ROWS):
+            idx = order[start:start + BLOCK_ROWS]
+            ranks = np.argsort(idx)  # gather in file order, then place by list order
+            block = np.empty((len(idx), dim), dtype=np.float32)
+            block[ranks] = raw[idx[ranks]]
+            vectors[start:start + len(idx)] = block
+        vectors.flush()
+        del vectors, raw
+        os.remove(os.path.join(tmp, "raw.f32"))
+    else:
+        centroids = np.zeros((1, dim), dtype=np.float32)
+        order = np.arange(n)
+        lists = np.array([[0, n]])
+        raw.flush()
+        del raw
+        os.replace(os.path.join(tmp, "raw.f32"), os.path.join(tmp, "vectors.f32"))
+
+    np.save(os.path.join(tmp, "order.npy"), order.astype(np.int64))
+    np.save(os.path.join(tmp, "offsets.npy"), offsets)
+    np.save(os.path.join(tmp, "centroids.npy"), centroids.astype(np.float32))
+    np.save(os.path.join(tmp, "lists.npy"), lists.astype(np.int64))
+    np.save(os.path.join(tmp, "idf.npy"), idf)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({
+            "count": n, "dim": dim, "embedder": embedder.name, "lists": len(lists),
+            "snapshot_id": snapshot_id, "storage_path": storage_path,
+        }, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+    log.info("retrieval.index_built", path=path, chunks=n, lists=len(lists))
+    return VectorIndex(path)
+
+
+def _spherical_kmeans(
+    vectors: np.ndarray, n: int, clusters: int, iterations: int = 10, seed: int = 0,
+) -> np.ndarray:
+    """Centroids fitted on a sample of up to 64 points per cluster."""
+    rng = np.random.default_rng(seed)
+    sample = np.asarray(vectors[np.sort(rng.choice(n, size=min(n, clusters * 64), replace=False))])
+    centroids = sample[rng.choice(len(sample), size=clusters, replace=False)].copy()
+    for _ in range(iterations):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        filled = np.bincount(labels, minlength=clusters) > 0
+        centroids[filled] = _normalize(sums[filled])  # empty clusters keep their old centroid
+    return centroids
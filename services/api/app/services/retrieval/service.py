@@ -0,0 +1,121 @@
+"""
+Retrieval service — top-k passages from indexed chunk snapshots.
+
+Every DataSnapshot with a `text` column (e.g. the unstructured connector's
+chunk table) gets a VectorIndex under STAGING_DIR/indexes/<snapshot_id>/,
+built after its sync or on first query. Open indexes are kept in a small LRU,
+so repeat queries only pay for the scan.
+"""
+import asyncio
+import os
+import shutil
+import time
+from collections import OrderedDict
+from typing import Optional
+import structlog
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.db.models import DataConnector, DataSnapshot
+from app.services.retrieval.index import VectorIndex, build_index
+from app.services.snapshots.store import latest_snapshots
+
+log = structlog.get_logger()
+
+
+def index_path(snapshot_id: str) -> str:
+    return os.path.join(settings.STAGING_DIR, "indexes", snapshot_id)
+
+
+def is_text_snapshot(snapshot: DataSnapshot) -> bool:
+    return "text" in ((snapshot.schema_json or {}).get("columns") or {})
+
+
+class IndexCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._indexes: OrderedDict[str, VectorIndex] = OrderedDict()
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def get(self, snapshot: DataSnapshot) -> VectorIndex:
+        index = self._indexes.get(snapshot.id)
+        if index is not None:
+            self._indexes.move_to_end(snapshot.id)
+            return index
+        lock = self._locks.setdefault(snapshot.id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(snapshot.id)
+            if index is None:
+                path = index_path(snapshot.id)
+                if os.path.exists(os.path.join(path, "meta.json")):
+                    index = await asyncio.to_thread(VectorIndex, path)
+                else:
+                    index = await asyncio.to_thread(
+                        build_index, snapshot.storage_path, path, None, snapshot.id,
+                    )
+                self._indexes[snapshot.id] = index
+                while len(self._indexes) > self.max_entries:
+                    self._indexes.popitem(last=False)
+        self._locks.pop(snapshot.id, None)
+        return index
+
+
+    def evict(self, snapshot_id: str):
+        self._indexes.pop(snapshot_id, None)
+
+
+index_cache = IndexCache(settings.RETRIEVAL_INDEX_CACHE_ENTRIES)
+
+
+async def index_snapshots(snapshots: list[DataSnapshot]):
+    """Build indexes for freshly synced chunk snapshots so the first query doesn't wait."""
+    for snapshot in snapshots:
+        if is_text_snapshot(snapshot):
+            try:
+                await index_cache.get(snapshot)
+            except Exception as e:
+                log.warning("retrieval.index_failed", snapshot_id=snapshot.id, error=str(e))
+
+
+def drop_indexes(snapshot_ids: list[str]):
+    """Forget and delete the indexes of snapshots that were pruned."""
+    for snapshot_id in snapshot_ids:
+        index_cache.evict(snapshot_id)
+        shutil.rmtree(index_path(snapshot_id), ignore_errors=True)
+
+
+async def _text_snapshots(
+    connector_ids: Optional[list[str]], snapshot_ids: Optional[list[str]],
+) -> list[DataSnapshot]:
+    if snapshot_ids:
+        async with AsyncSessionLocal() as db:
+            snapshots = (await db.execute(
+                select(DataSnapshot).where(DataSnapshot.id.in_(snapshot_ids))
+            )).scalars().all()
+    else:
+        if connector_ids is None:
+            async with AsyncSessionLocal() as db:
+                connector_ids = list((await db.execute(select(DataConnector.id))).scalars().all())
+        snapshots = await latest_snapshots(connector_ids)
+    return [s for s in snapshots if is_text_snapshot(s)]
+
+
+async def retrieve(
+    query: str,
+    connector_ids: Optional[list[str]] = None,
+    snapshot_ids: Optional[list[str]] = None,
+    k: Optional[int] = None,
+) -> list[dict]:
+    """Best `k` chunks for `query` across the chunk snapshots in scope, best first."""
+    k = k or settings.RETRIEVAL_TOP_K
+    started = time.perf_counter()
+    hits = []
+    for snapshot in await _text_snapshots(connector_ids, snapshot_ids):
+        index = await index_cache.get(snapshot)
+        for hit in (await asyncio.to_thread(index.search, [query], k))[0]:
+            hits.append({**hit, "snapshot_id": snapshot.id, "connector_id": snapshot.connector_id})
+    hits.sort(key=lambda h: h["score"], reverse=True)
+    ms = round((time.perf_counter() - started) * 1000, 1)
+    log.debug("retrieval.search", k=k, hits=len(hits), ms=ms)
+    return hits[:k]
@@ -92,6 +92,14 @@ class SemanticMapper:
         )
         return result
 
+    async def map_for_session(self, question: str, domain: str) -> dict:
+        """Semantic step of a session: the question grounded against the domain's semantic layer."""
+        grounding = await self.ground_nlq(question, domain)
+        return {
+            "question": question, "domain": domain, "connector_id": self.connector_id,
+            "grounding": grounding,
+        }
+
     async def _load_schema(self, table_name: Optional[str]) -> str:
         if not self.connector_id:
             return "No connector specified."
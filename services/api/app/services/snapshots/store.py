@@ -0,0 +1,349 @@
+"""
+Snapshot store — materializes connector syncs as columnar Parquet datasets.
+
+Each sync run writes one directory per table under
+STAGING_DIR/snapshots/<run_id>/<table>/ containing part files (optionally
+hive-partitioned) plus a `_common_metadata` file with the table schema.
+Readers get column projection and predicate pushdown through pyarrow.dataset.
+
+The schema is fixed by the declared types or the first part, and later parts
+are cast to it. A column whose values stop fitting its type is widened
+(int64 -> double) or, failing that, becomes a string column; parts already
+written keep their types and are cast when the dataset is read.
+
+A run that fails or is cancelled has its directory removed (discard_run), and
+each successful sync prunes its tables down to the SNAPSHOT_RETENTION newest
+snapshots (prune_snapshots). Carried-forward parts are hard links, so deleting
+an old snapshot never touches the data a newer one still uses.
+"""
+import os
+import re
+import shutil
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import structlog
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.db.models import DataSnapshot
+
+log = structlog.get_logger()
+
+METADATA_FILE = "_common_metadata"
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("._") or "table"
+
+
+def snapshot_root() -> str:
+    return os.path.join(settings.STAGING_DIR, "snapshots")
+
+
+def run_dir(run_id: str) -> str:
+    return os.path.join(snapshot_root(), _safe_name(run_id))
+
+
+class SnapshotWriter:
+    """Appends DataFrame batches to a Parquet snapshot for one table of one sync run."""
+
+    def __init__(
+        self, run_id: str, table_name: str, partition_by: Optional[list[str]] = None,
+        schema: Optional[pa.Schema] = None,
+    ):
+        self.run_id = run_id
+        self.table_name = table_name
+        self.partition_by = partition_by or []
+        self.storage_path = os.path.join(run_dir(run_id), _safe_name(table_name))
+        self.row_count = 0
+        self._parts = 0
+        self._carried = 0
+        self._replaced = 0
+        self.schema: Optional[pa.Schema] = schema
+        os.makedirs(self.storage_path, exist_ok=True)
+
+    def write(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+        table = self._conform(table)
+        basename = f"part-{self._parts:05d}-{{i}}.parquet"
+        if self.partition_by:
+            pq.write_to_dataset(
+                table, self.storage_path, partition_cols=self.partition_by,
+                basename_template=basename, existing_data_behavior="overwrite_or_ignore",
+            )
+        else:
+            pq.write_table(table, os.path.join(self.storage_path, basename.format(i=0)))
+        self._parts += 1
+        self._record(table.schema, table.num_rows)
+
+    def carry_forward(
+        self, previous_path: str, key: Optional[str] = None, replaced: Optional[set] = None,
+    ):
+        """
+        Bring an earlier snapshot's parts into this one, for incremental syncs.
+
+        Parts are hard-linked (copied where links are unsupported), so unchanged
+        data is never rewritten. With `key`/`replaced`, only parts that hold a
+        replaced key are rewritten, minus those rows; the new versions arrive
+        through write().
+        """
+        if not previous_path or not os.path.isdir(previous_path):
+            return
+        meta = os.path.join(previous_path, METADATA_FILE)
+        if os.path.exists(meta):
+            # Keeps hive partition columns, which the part files themselves don't store
+            self._merge(pq.read_schema(meta).remove_metadata())
+        for root, _, names in os.walk(previous_path):
+            for name in sorted(names):
+                if not name.endswith(".parquet"):
+                    continue
+                src = os.path.join(root, name)
+                rel_dir = os.path.relpath(root, previous_path)
+                dst_dir = os.path.normpath(os.path.join(self.storage_path, rel_dir))
+                os.makedirs(dst_dir, exist_ok=True)
+                dst = os.path.join(dst_dir, f"base-{self._carried:05d}.parquet")
+                self._carried += 1
+
+                if key and replaced:
+                    keys = pq.read_table(src, columns=[key]).column(key)
+                    stale = pc.is_in(keys, value_set=pa.array(list(replaced), type=keys.type))
+                    if pc.any(stale).as_py():
+                        table = pq.read_table(src).filter(pc.invert(stale))
+                        self._replaced += len(keys) - table.num_rows
+                        if table.num_rows:
+                            pq.write_table(table, dst)
+                            self._record(table.schema, table.num_rows)
+                        continue
+
+                try:
+                    os.link(src, dst)
+                except OSError:
+                    shutil.copy2(src, dst)
+                self._record(pq.read_schema(src), pq.read_metadata(src).num_rows)
+
+    def _record(self, schema: pa.Schema, rows: int):
+        self._merge(schema.remove_metadata())
+        self.row_count += rows
+
+    def _merge(self, schema: pa.Schema):
+        """Fold a part's schema into the table schema: new columns are added, conflicts widened."""
+        if self.schema is None:
+            self.schema = schema
+            return
+        for field in schema:
+            index = self.schema.get_field_index(field.name)
+            if index < 0:
+                self.schema = self.schema.append(field)
+                continue
+            current = self.schema.field(index)
+            if current.type != field.type:
+                widened = _widen(current.type, field.type)
+                if widened != current.type:
+                    self.schema = self.schema.set(index, current.with_type(widened))
+
+    def _conform(self, table: pa.Table) -> pa.Table:
+        """Cast a new part to the table schema, widening the schema where a column doesn't fit."""
+        if self.schema is None:
+            return table
+        for i, field in enumerate(table.schema):
+            index = self.schema.get_field_index(field.name)
+            if index < 0 or self.schema.field(index).type == field.type:
+                continue
+            target = self.schema.field(index)
+            column = _cast(table.column(i), target.type)
+            if column is None:
+                self._merge(pa.schema([field]))
+                target = self.schema.field(index)
+                column = _cast(table.column(i), target.type)
+                if column is None:
+                    target = target.with_type(pa.string())
+                    self.schema = self.schema.set(index, target)
+                    column = _cast(table.column(i), pa.string())
+                    if column is None:
+                        column = _as_strings(table.column(i))
+            table = table.set_column(i, field.with_type(target.type), column)
+        return table
+
+    def finalize(self) -> dict:
+        """Write the table schema and return the metadata recorded on DataSnapshot."""
+        schema = self.schema if self.schema is not None else pa.schema([])
+        pq.write_metadata(schema, os.path.join(self.storage_path, METADATA_FILE))
+        log.info("snapshot.written", table=self.table_name, rows=self.row_count, parts=self._parts)
+        return {
+            "table_name": self.table_name,
+            "storage_path": self.storage_path,
+            "row_count": self.row_count,
+            "schema_json": {
+                "format": "parquet",
+                "columns": {f.name: str(f.type) for f in schema},
+                "partition_by": self.partition_by,
+                "parts": self._parts,
+                "carried_parts": self._carried,
+                "replaced_rows": self._replaced,
+            },
+        }
+
+
+def _widen(current: pa.DataType, incoming: pa.DataType) -> pa.DataType:
+    if pa.types.is_null(current):
+        return incoming
+    if pa.types.is_null(incoming):
+        return current
+    try:
+        return pa.unify_schemas(
+            [pa.schema([("c", current)]), pa.schema([("c", incoming)])],
+            promote_options="permissive",
+        ).field("c").type
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return pa.string()
+
+
+def _cast(column: pa.ChunkedArray, target: pa.DataType) -> Optional[pa.ChunkedArray]:
+    try:
+        return column.cast(target)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return None
+
+
+def _as_strings(column: pa.ChunkedArray) -> pa.Array:
+    return pa.array([None if v is None else str(v) for v in column.to_pylist()], type=pa.string())
+
+
+class SnapshotReader:
+    """Column-projected, predicate-pushed reads over a Parquet snapshot directory."""
+
+    def __init__(self, storage_path: str):
+        self.storage_path = storage_path
+
+    def dataset(self) -> ds.Dataset:
+        meta = os.path.join(self.storage_path, METADATA_FILE)
+        schema = pq.read_schema(meta) if os.path.exists(meta) else None
+        files = [
+            os.path.join(root, f)
+            for root, _, names in os.walk(self.storage_path)
+            for f in sorted(names) if f.endswith(".parquet")
+        ]
+        return ds.dataset(
+            sorted(files), schema=schema, format="parquet",
+            partitioning="hive", partition_base_dir=self.storage_path,
+        )
+
+    def read(
+        self,
+        columns: Optional[list[str]] = None,
+        filters: Optional[list] = None,
+        limit: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """
+        `filters` uses pyarrow's DNF tuple form, e.g.
+        [("amount", ">", 100), ("region", "in", ["EU"])]; row groups whose statistics
+        cannot match are skipped.
+        """
+        dataset = self.dataset()
+        expr = pq.filters_to_expression(filters) if filters else None
+        if limit is not None:
+            return dataset.head(limit, columns=columns, filter=expr).to_pandas()
+        return dataset.to_table(columns=columns, filter=expr).to_pandas()
+
+    def iter_batches(
+        self,
+        columns: Optional[list[str]] = None,
+        filters: Optional[list] = None,
+        batch_size: int = 65_536,
+    ) -> Iterator[pd.DataFrame]:
+        expr = pq.filters_to_expression(filters) if filters else None
+        for batch in self.dataset().to_batches(columns=columns, filter=expr, batch_size=batch_size):
+            yield batch.to_pandas()
+
+    def head(self, n: int, columns: Optional[list[str]] = None) -> pd.DataFrame:
+        return self.read(columns=columns, limit=n)
+
+    def count(self, filters: Optional[list] = None) -> int:
+        expr = pq.filters_to_expression(filters) if filters else None
+        return self.dataset().count_rows(filter=expr)
+
+
+async def record_snapshots(
+    db: AsyncSession, connector_id: str, snapshots: list[dict], tenant_id: str = "default"
+) -> list[DataSnapshot]:
+    """Persist DataSnapshot rows for the metadata returned by SnapshotWriter.finalize()."""
+    rows = [
+        DataSnapshot(
+            connector_id=connector_id,
+            tenant_id=tenant_id,
+            table_name=meta["table_name"],
+            row_count=meta["row_count"],
+            schema_json=meta["schema_json"],
+            storage_path=meta["storage_path"],
+            created_at=datetime.now(timezone.utc),
+        )
+        for meta in snapshots
+    ]
+    db.add_all(rows)
+    return rows
+
+
+def discard_run(run_id: str):
+    """Delete everything a sync run wrote; for runs that failed before recording it."""
+    shutil.rmtree(run_dir(run_id), ignore_errors=True)
+
+
+def delete_snapshot_files(storage_paths: list[str]):
+    """Remove snapshot directories, and their run directory once it is empty."""
+    for path in storage_paths:
+        shutil.rmtree(path, ignore_errors=True)
+        parent = os.path.dirname(path)
+        if os.path.dirname(parent) == snapshot_root():
+            try:
+                os.rmdir(parent)
+            except OSError:
+                pass  # other tables of the run remain
+
+
+async def prune_snapshots(
+    db: AsyncSession, connector_id: str, keep: Optional[int] = None,
+) -> list[DataSnapshot]:
+    """
+    Delete the rows of all but the `keep` newest snapshots of each of the connector's
+    tables. Returns them, so their files can be removed once the deletion is committed.
+    """
+    keep = settings.SNAPSHOT_RETENTION if keep is None else keep
+    result = await db.execute(
+        select(DataSnapshot)
+        .where(DataSnapshot.connector_id == connector_id)
+        .order_by(DataSnapshot.created_at.desc())
+    )
+    seen: dict[str, int] = {}
+    stale = []
+    for snap in result.scalars():
+        seen[snap.table_name] = seen.get(snap.table_name, 0) + 1
+        if seen[snap.table_name] > keep:
+            stale.append(snap)
+    if stale:
+        await db.execute(delete(DataSnapshot).where(DataSnapshot.id.in_([s.id for s in stale])))
+    return stale
+
+
+async def latest_snapshots(connector_ids: list[str]) -> list[DataSnapshot]:
+    """Most recent snapshot of every table for the given connectors."""
+    if not connector_ids:
+        return []
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(DataSnapshot)
+            .where(DataSnapshot.connector_id.in_(connector_ids))
+            .order_by(DataSnapshot.created_at.desc())
+        )
+        latest: dict[tuple[str, str], DataSnapshot] = {}
+        for snap in result.scalars():
+            latest.setdefault((snap.connector_id, snap.table_name), snap)
+        return list(latest.values())
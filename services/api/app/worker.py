@@ -0,0 +1,74 @@
+"""
+Celery worker entry point — runs background jobs when JOBS_BACKEND=celery.
+
+    celery -A app.worker.celery_app worker -Q sessions,mapping,workflows -c 8
+    celery -A app.worker.celery_app worker -Q syncs,automl -c 2
+
+A single task type executes any job by id (see app.services.jobs.queue), so
+jobs keep their status, retries and cancellation in the `jobs` table whatever
+the broker does. Tasks are sent to the job type's queue, and concurrency
+limits are per worker: give heavy queues their own worker with a small -c.
+Each worker process keeps one event loop for its lifetime, so DB engines and
+client pools are reused across tasks. Run with EVENT_BUS_BACKEND=redis so
+session events reach the API's SSE streams.
+"""
+import asyncio
+from typing import Optional
+from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from app.core.config import settings
+from app.core.logging import configure_logging
+from app.services.jobs.queue import jobs
+
+celery_app = Celery("vds", broker=settings.REDIS_URL)
+celery_app.conf.update(
+    task_default_queue="default",
+    # Ack after the job ran, so a worker that dies mid-job has it redelivered
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    # Redelivery of a still-running job is skipped while its lease is live (see run_job),
+    # but keep Redis from re-sending long jobs at all
+    broker_transport_options={"visibility_timeout": settings.CELERY_VISIBILITY_TIMEOUT_S},
+    worker_prefetch_multiplier=1,
+    task_ignore_result=True,
+    broker_connection_retry_on_startup=True,
+)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop
+
+
+@worker_process_init.connect
+def _init_process(**_):
+    configure_logging()
+    _event_loop()
+
+
+@worker_process_shutdown.connect
+def _shutdown_process(**_):
+    from app.services.compute.executor import compute
+    from app.services.connectors.mongo_connector import mongo_clients
+    from app.services.connectors.postgres_connector import pg_pools
+    from app.services.llm.cache import response_cache
+    from app.services.llm.pool import client_pool
+    from app.services.orchestration.event_bus import event_bus
+
+    loop = _event_loop()
+    for close in (client_pool.aclose, response_cache.aclose, event_bus.aclose, pg_pools.aclose):
+        loop.run_until_complete(close())
+    mongo_clients.close()
+    compute.shutdown()
+    loop.close()
+
+
+@celery_app.task(name="vds.jobs.run")
+def run_job_task(job_id: str, queue: str):
+    _event_loop().run_until_complete(jobs.execute(job_id, queue))
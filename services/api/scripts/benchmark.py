@@ -0,0 +1,434 @@
+"""
+Throughput benchmark — drives the API in-process (ASGI transport) against the local LLM provider.
+
+Scenarios:
+  sessions   N concurrent sessions: POST /sessions, then follow the SSE stream to "done"
+  uploads    N concurrent CSV uploads, each profiled by its connector.sync job
+  syncs      N concurrent full syncs of previously uploaded connectors
+  nlq        N concurrent NLQ grounding requests
+  workflows  N concurrent workflow runs (agent + tool steps)
+
+Each scenario reports throughput, end-to-end latency percentiles, per-step
+latency percentiles (session agents, from the step start/complete messages),
+DB queries per operation and the process's peak RSS. Results are written as
+JSON (with the git commit) so runs can be compared across commits with
+--baseline.
+
+The app uses a fresh SQLite database, the in-memory job queue and event bus,
+and LLM_PROVIDER_OVERRIDE=local unless those are set in the environment.
+Note: httpx's ASGI transport buffers response bodies, so an SSE stream is
+timed to its end, not to its first event.
+
+Run (from services/api):
+  python scripts/benchmark.py --scenarios sessions,nlq -n 50 -c 10
+  python scripts/benchmark.py --baseline benchmark_<commit>_<timestamp>.json
+"""
+import argparse
+import asyncio
+import contextvars
+import csv
+import io
+import json
+import os
+import platform
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+
+API_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_ROOT)
+
+from test_scenarios import SCENARIOS  # noqa: E402
+
+API = "/api/v1"
+SCENARIO_NAMES = ["sessions", "uploads", "syncs", "nlq", "workflows"]
+FINAL_JOB_STATUSES = ("succeeded", "failed", "cancelled")
+STEP_START = re.compile(r"Starting: \*\*(.+)\*\*")
+STEP_DONE = re.compile(r"✅ (.+) complete\.")
+
+WORKFLOW_STEPS = [
+    {"id": "frame", "type": "specialist_agent",
+     "config": {"agent_class": "ProblemFramerAgent"}},
+    {"id": "query", "type": "tool", "config": {"tool_name": "sql_query"}},
+    {"id": "narrate", "type": "specialist_agent",
+     "config": {"agent_class": "InsightNarratorAgent"}},
+]
+
+# Harness requests (job polling, step timing reads) are excluded from the query counts
+_harness = contextvars.ContextVar("benchmark_harness", default=False)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def install(self, engine):
+        from sqlalchemy import event
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _count(*_):
+            if not _harness.get():
+                self.count += 1
+
+
+class harness_only:
+    def __enter__(self):
+        self._token = _harness.set(True)
+
+    def __exit__(self, *exc):
+        _harness.reset(self._token)
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pct(q):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 4)
+
+    return {
+        "count": len(ordered), "mean": round(sum(ordered) / len(ordered), 4),
+        "p50": pct(0.5), "p90": pct(0.9), "p95": pct(0.95), "p99": pct(0.99),
+        "max": round(ordered[-1], 4),
+    }
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=API_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def csv_payload(rows: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow([
+        "customer_id", "region", "tier", "orders", "revenue", "last_order_date", "churned",
+    ])
+    for i in range(rows):
+        writer.writerow([
+            f"C{seed:04d}{i:06d}",
+            rng.choice(["NA", "EMEA", "APAC", "LATAM"]),
+            rng.choice(["SMB", "Mid-Market", "Enterprise"]),
+            rng.randint(1, 60),
+            round(rng.uniform(50, 50_000), 2),
+            f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            int(rng.random() < 0.2),
+        ])
+    return out.getvalue().encode()
+
+
+class Benchmark:
+    def __init__(self, client: httpx.AsyncClient, queries: QueryCounter, args):
+        self.client = client
+        self.queries = queries
+        self.args = args
+        self.connector_ids: list[str] = []
+
+    async def run_scenario(self, name: str) -> dict:
+        op = getattr(self, f"_{name}")
+        await getattr(self, f"_setup_{name}", self._no_setup)()
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        latencies: list[float] = []
+        steps: dict[str, list[float]] = {}
+        errors: dict[str, int] = {}
+
+        async def one(i: int):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    step_times = await asyncio.wait_for(op(i), self.args.timeout)
+                except Exception as e:
+                    key = f"{type(e).__name__}: {str(e)[:80]}"
+                    errors[key] = errors.get(key, 0) + 1
+                    return
+                latencies.append(time.perf_counter() - started)
+                for step, seconds in (step_times or {}).items():
+                    steps.setdefault(step, []).append(seconds)
+
+        queries_before = self.queries.count
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(self.args.n)))
+        wall = time.perf_counter() - started
+        queries = self.queries.count - queries_before
+        return {
+            "scenario": name,
+            "operations": self.args.n,
+            "concurrency": self.args.concurrency,
+            "completed": len(latencies),
+            "failed": self.args.n - len(latencies),
+            "errors": errors,
+            "wall_s": round(wall, 3),
+            "throughput_per_min": round(len(latencies) / wall * 60, 2) if wall else 0.0,
+            "latency_s": percentiles(latencies),
+            "steps_s": {step: percentiles(values) for step, values in steps.items()},
+            "db_queries": queries,
+            "db_queries_per_op": round(queries / self.args.n, 1),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    async def _no_setup(self):
+        pass
+
+    async def _post(self, path: str, **kwargs) -> dict:
+        r = await self.client.post(f"{API}{path}", **kwargs)
+        if r.status_code >= 400:
+            raise RuntimeError(f"POST {path} -> {r.status_code}: {r.text[:200]}")
+        return r.json()
+
+    async def _wait_job(self, job_id: str) -> dict:
+        while True:
+            with harness_only():
+                job = (await self.client.get(f"{API}/jobs/{job_id}")).json()
+            if job.get("status") in FINAL_JOB_STATUSES:
+                if job["status"] != "succeeded":
+                    raise RuntimeError(f"job {job['status']}: {job.get('error')}")
+                return job
+            await asyncio.sleep(self.args.poll_interval)
+
+    # ── sessions ──────────────────────────────────────────────────────────────
+
+    async def _setup_sessions(self):
+        for domain in sorted({s["domain"] for s in SCENARIOS}):
+            await self.client.post(f"{API}/semantic/domains/{domain}/install")
+
+    async def _sessions(self, i: int) -> dict:
+        scenario = SCENARIOS[i % len(SCENARIOS)]
+        session = await self._post("/sessions/", json={
+            "question": f"{scenario['question']} (benchmark run {i})",
+            "domain": scenario["domain"],
+            # Approval checkpoints would stall the run waiting for a human
+            "autonomy_level": "autonomous",
+        })
+        status = None
+        async with self.client.stream("GET", f"{API}/sessions/{session['id']}/stream") as stream:
+            async for line in stream.aiter_lines():
+                if line.startswith("data:") and '"event": "done"' in line:
+                    status = json.loads(line[5:])["status"]
+        if status != "done":
+            raise RuntimeError(f"session {status}")
+        with harness_only():
+            messages = (await self.client.get(f"{API}/sessions/{session['id']}/messages")).json()
+        return self._step_times(messages)
+
+    @staticmethod
+    def _step_times(messages: list[dict]) -> dict:
+        started, times = {}, {}
+        for m in messages:
+            at = datetime.fromisoformat(m["created_at"])
+            if m["agent"] == "supervisor" and (match := STEP_START.search(m["content"])):
+                started[match.group(1)] = at
+            elif (match := STEP_DONE.search(m["content"])) and match.group(1) in started:
+                times[m["agent"] or match.group(1)] = (at - started[match.group(1)]).total_seconds()
+        return times
+
+    # ── uploads and syncs ─────────────────────────────────────────────────────
+
+    async def _upload(self, i: int) -> dict:
+        payload = csv_payload(self.args.rows, seed=i)
+        files = {"file": (f"bench_{i}.csv", payload, "text/csv")}
+        return await self._post("/uploads/csv", files=files)
+
+    async def _uploads(self, i: int) -> dict:
+        started = time.perf_counter()
+        upload = await self._upload(i)
+        accepted = time.perf_counter() - started
+        await self._wait_job(upload["job_id"])
+        return {"accept": accepted, "profile": time.perf_counter() - started - accepted}
+
+    async def _setup_syncs(self):
+        if self.connector_ids:
+            return
+        for i in range(min(self.args.n, self.args.concurrency)):
+            upload = await self._upload(10_000 + i)
+            await self._wait_job(upload["job_id"])
+            self.connector_ids.append(upload["connector_id"])
+
+    async def _syncs(self, i: int) -> dict:
+        connector_id = self.connector_ids[i % len(self.connector_ids)]
+        run = await self._post(f"/connectors/{connector_id}/sync", params={"incremental": "false"})
+        await self._wait_job(run["job_id"])
+
+    # ── NLQ grounding ─────────────────────────────────────────────────────────
+
+    async def _setup_nlq(self):
+        await self._setup_sessions()
+
+    async def _nlq(self, i: int) -> dict:
+        scenario = SCENARIOS[i % len(SCENARIOS)]
+        await self._post("/semantic/nlq/ground", json={
+            "question": f"{scenario['question']} (benchmark run {i})", "domain": scenario["domain"],
+        })
+
+    # ── workflows ─────────────────────────────────────────────────────────────
+
+    async def _workflows(self, i: int) -> dict:
+        workflow = await self._post("/agents/", json={
+            "name": f"benchmark workflow {i}", "steps": WORKFLOW_STEPS,
+        })
+        run = await self._post(f"/agents/{workflow['id']}/run")
+        await self._wait_job(run["job_id"])
+
+
+def configure_environment(args):
+    """Settings are read at import, so this must run before the app is imported."""
+    workdir = tempfile.mkdtemp(prefix="vds-bench-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{workdir}/bench.db")
+    os.environ.setdefault("STAGING_DIR", os.path.join(workdir, "staging"))
+    os.environ.setdefault("JOBS_BACKEND", "memory")
+    os.environ.setdefault("EVENT_BUS_BACKEND", "memory")
+    os.environ.setdefault("LLM_PROVIDER_OVERRIDE", "local")
+    os.environ["LLM_LOCAL_SEED"] = str(args.seed)
+    os.environ["LLM_LOCAL_LATENCY"] = json.dumps(
+        {"default": {"median_s": args.llm_latency, "sigma": args.llm_sigma}}
+    )
+    os.environ["LLM_LOCAL_FAILURES"] = json.dumps({"server_error": args.llm_failure_rate})
+    if args.queue_concurrency:
+        pairs = (item.split("=") for item in args.queue_concurrency.split(","))
+        os.environ["JOB_QUEUE_CONCURRENCY"] = json.dumps({queue: int(n) for queue, n in pairs})
+
+
+async def run(args) -> dict:
+    from app.main import app
+    from app.core.config import settings
+    from app.db.models import Tenant
+    from app.db.session import AsyncSessionLocal, engine
+    from app.services.llm.limiter import llm_limiter
+
+    queries = QueryCounter()
+    queries.install(engine)
+    results = []
+    async with app.router.lifespan_context(app):
+        async with AsyncSessionLocal() as db:
+            if not await db.get(Tenant, "default"):
+                db.add(Tenant(id="default", name="Default", slug="default"))
+                await db.commit()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=args.timeout,
+        ) as client:
+            bench = Benchmark(client, queries, args)
+            for name in args.scenarios:
+                print(f"▶ {name}: {args.n} operations, concurrency {args.concurrency}", flush=True)
+                result = await bench.run_scenario(name)
+                results.append(result)
+                print(_summary_line(result), flush=True)
+        llm = llm_limiter.metrics()
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+            "database": settings.DATABASE_URL.split(":", 1)[0],
+            "llm_provider": settings.LLM_PROVIDER_OVERRIDE or settings.DEFAULT_LLM_PROVIDER,
+            "job_queue_concurrency": settings.JOB_QUEUE_CONCURRENCY,
+        },
+        "scenarios": results,
+        "llm_admission": llm,
+    }
+
+
+def _summary_line(result: dict) -> str:
+    latency = result["latency_s"]
+    return (
+        f"  {result['completed']}/{result['operations']} ok in {result['wall_s']}s — "
+        f"{result['throughput_per_min']}/min, "
+        f"p50 {latency.get('p50', '-')}s, p95 {latency.get('p95', '-')}s, "
+        f"{result['db_queries_per_op']} queries/op, peak RSS {result['peak_rss_mb']} MB"
+        + (f", errors {result['errors']}" if result["errors"] else "")
+    )
+
+
+def compare(current: dict, baseline: dict):
+    """Print throughput, p95 and query deltas against a previous results file."""
+    previous = {r["scenario"]: r for r in baseline.get("scenarios", [])}
+    print(f"\nvs {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for result in current["scenarios"]:
+        before = previous.get(result["scenario"])
+        if not before:
+            continue
+        deltas = []
+        for label, now, then in (
+            ("throughput", result["throughput_per_min"], before["throughput_per_min"]),
+            ("p95", result["latency_s"].get("p95"), before["latency_s"].get("p95")),
+            ("queries/op", result["db_queries_per_op"], before["db_queries_per_op"]),
+        ):
+            if now is not None and then:
+                deltas.append(f"{label} {then} → {now} ({(now - then) / then * 100:+.1f}%)")
+        print(f"  {result['scenario']}: " + ", ".join(deltas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--scenarios", default=",".join(SCENARIO_NAMES),
+        help="comma-separated: " + ", ".join(SCENARIO_NAMES),
+    )
+    parser.add_argument("-n", type=int, default=20, help="operations per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-operation timeout (s)")
+    parser.add_argument("--rows", type=int, default=5000, help="rows per uploaded CSV")
+    parser.add_argument(
+        "--poll-interval", type=float, default=0.05, help="job status poll interval (s)",
+    )
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.2, help="local LLM median latency (s)",
+    )
+    parser.add_argument("--llm-sigma", type=float, default=0.4, help="local LLM lognormal sigma")
+    parser.add_argument(
+        "--llm-failure-rate", type=float, default=0.0, help="local LLM injected 503 rate",
+    )
+    parser.add_argument(
+        "--queue-concurrency", default="", help="job workers per queue, e.g. sessions=16,syncs=4",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output", default=None, help="results file (default benchmark_<commit>_<timestamp>.json)",
+    )
+    parser.add_argument("--baseline", default=None, help="previous results file to compare against")
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIO_NAMES)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    configure_environment(args)
+    results = asyncio.run(run(args))
+
+    output = args.output or "benchmark_{}_{}.json".format(
+        results["meta"]["commit"] or "nocommit",
+        datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+    )
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+# Settings are read at import: point the app at a throwaway database and staging area first
+_workdir = tempfile.mkdtemp(prefix="vds-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_workdir}/test.db")
+os.environ.setdefault("STAGING_DIR", os.path.join(_workdir, "staging"))
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+async def db():
+    """
+    Tables and the default tenant; the engine's connections are dropped after each
+    test's loop.
+    """
+    from app.db.models import Tenant
+    from app.db.session import AsyncSessionLocal, Base, engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as session:
+        if not await session.get(Tenant, "default"):
+            session.add(Tenant(id="default", name="Default", slug="default"))
+            await session.commit()
+    yield AsyncSessionLocal
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client(db):
+    """API client against the app in-process, without running its lifespan."""
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
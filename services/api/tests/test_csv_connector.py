@@ -0,0 +1,53 @@
+import base64
+import io
+
+import pandas as pd
+
+from app.db.models import DataConnector, SyncRun
+from app.services.connectors.csv_connector import CSVConnector, _Base64Reader
+from app.services.jobs.queue import jobs
+
+# Non-ASCII in every row, CRLF line endings, and a length no block size divides evenly
+CSV = "".join(
+    f"{i},Zoë Müller {i},€{i * 7}.5,東京\r\n" for i in range(997)
+).encode()
+CSV = b"id,name,amount,city\r\n" + CSV
+
+
+def _read(encoded: str, block_chars: int) -> pd.DataFrame:
+    return pd.read_csv(io.BufferedReader(_Base64Reader(encoded, block_chars=block_chars)))
+
+
+def test_base64_reader_decodes_across_slice_boundaries():
+    expected = pd.read_csv(io.BytesIO(CSV))
+    single_line = base64.b64encode(CSV).decode()
+    wrapped = base64.encodebytes(CSV).decode()  # a line break every 76 characters
+    for encoded in (single_line, wrapped):
+        for block_chars in (7, 64, 1000, 4096):
+            pd.testing.assert_frame_equal(_read(encoded, block_chars), expected)
+
+
+async def test_sample_reads_wrapped_base64_uploads():
+    config = {"file_content_b64": base64.encodebytes(CSV).decode()}
+    df = await CSVConnector().sample(config, None, limit=10)
+    assert df["name"].tolist()[:2] == ["Zoë Müller 0", "Zoë Müller 1"]
+    assert df["city"].eq("東京").all()
+
+
+async def test_uploaded_csv_grounds_nlq_with_its_schema(db, client, monkeypatch):
+    monkeypatch.setattr(jobs, "backend", "memory")
+    try:
+        response = await client.post(
+            "/api/v1/uploads/csv", files={"file": ("orders.csv", CSV, "text/csv")},
+        )
+        assert response.status_code == 202
+        await jobs.drain()
+    finally:
+        await jobs.aclose()
+
+    async with db() as s:
+        connector = await s.get(DataConnector, response.json()["connector_id"])
+        run = await s.get(SyncRun, response.json()["run_id"])
+    assert run.status == "completed"
+    assert connector.schema_manifest == run.semantic_pack
+    assert connector.schema_manifest
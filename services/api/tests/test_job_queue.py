@@ -0,0 +1,163 @@
+import asyncio
+import uuid
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.db.models import Job
+from app.db.session import AsyncSessionLocal
+from app.services.jobs import queue
+from app.services.jobs.queue import CANCELLED, FAILED, RUNNING, SUCCEEDED, JobType, jobs, run_job
+from app.services.orchestration.event_bus import event_bus, job_channel
+
+calls: list[str] = []
+
+
+async def flaky(tag: str):
+    calls.append(tag)
+    if calls.count(tag) == 1:
+        raise RuntimeError("first attempt fails")
+    return {"tag": tag}
+
+
+async def slow(tag: str, seconds: float = 30.0):
+    calls.append(tag)
+    await asyncio.sleep(seconds)
+    return {"tag": tag}
+
+
+@pytest.fixture(autouse=True)
+async def memory_queue(db, monkeypatch):
+    monkeypatch.setattr(jobs, "backend", "memory")
+    for name in ("flaky", "slow"):
+        job_type = JobType(f"{__name__}:{name}", "tests", max_attempts=2)
+        monkeypatch.setitem(queue.JOB_TYPES, f"test.{name}", job_type)
+    monkeypatch.setattr(settings, "JOB_RETRY_BACKOFF_S", 0.01)
+    monkeypatch.setattr(settings, "JOB_LEASE_S", 0.3)
+    calls.clear()
+    yield
+    await jobs.aclose()
+
+
+async def _job(job_id: str) -> Job:
+    async with AsyncSessionLocal() as db:
+        return await db.get(Job, job_id)
+
+
+async def _until(predicate, timeout: float = 5.0):
+    async def poll():
+        while not await predicate():
+            await asyncio.sleep(0.01)
+    await asyncio.wait_for(poll(), timeout)
+
+
+async def _running(job_id: str) -> bool:
+    return (await _job(job_id)).status == RUNNING
+
+
+async def _interrupted_job(tag: str, attempts: int, lease_s: float) -> str:
+    """A job row left "running" by another (or a crashed) process."""
+    job_id = str(uuid.uuid4())
+    async with AsyncSessionLocal() as db:
+        db.add(Job(
+            id=job_id, name="test.slow", queue="tests", args=[tag, 0.0], kwargs={}, status=RUNNING,
+            attempts=attempts, max_attempts=2,
+            lease_expires_at=queue._now() + timedelta(seconds=lease_s),
+        ))
+        await db.commit()
+    return job_id
+
+
+async def test_failed_attempt_is_retried():
+    job_id = await jobs.enqueue("test.flaky", args=["retry"])
+    await jobs.drain()
+
+    job = await _job(job_id)
+    assert (job.status, job.attempts, job.result) == (SUCCEEDED, 2, {"tag": "retry"})
+    assert job.lease_expires_at is None
+    assert calls == ["retry", "retry"]
+
+
+async def test_cancel_stops_a_running_job():
+    job_id = await jobs.enqueue("test.slow", args=["cancel"])
+    await _until(lambda: _running(job_id))
+    await jobs.cancel(job_id)
+    await jobs.drain()
+
+    job = await _job(job_id)
+    assert (job.status, job.attempts) == (CANCELLED, 1)
+
+
+async def _request_cancel_elsewhere(job_id: str):
+    """Set the flag the way another process's JobQueue.cancel does, minus its notification."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Job).where(Job.id == job_id).values(cancel_requested=True))
+        await db.commit()
+
+
+async def test_cancel_requested_elsewhere_is_picked_up_at_lease_renewal():
+    job_id = await jobs.enqueue("test.slow", args=["watchdog"])
+    await _until(lambda: _running(job_id))
+    await _request_cancel_elsewhere(job_id)
+    await asyncio.wait_for(jobs.drain(), 5)
+    assert (await _job(job_id)).status == CANCELLED
+
+
+async def test_cancel_notification_reaches_the_watchdog_between_renewals(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_LEASE_S", 60.0)
+    job_id = await jobs.enqueue("test.slow", args=["notified"])
+    await _until(lambda: _running(job_id))
+    await _request_cancel_elsewhere(job_id)
+    await event_bus.publish(job_channel(job_id), {"type": "cancel"})
+    await asyncio.wait_for(jobs.drain(), 1)
+    assert (await _job(job_id)).status == CANCELLED
+
+
+async def test_redelivered_job_is_not_run_twice_while_its_lease_is_renewed():
+    job_id = await jobs.enqueue("test.slow", args=["long", 0.8])
+    await _until(lambda: _running(job_id))
+
+    # Outlives the initial 0.3s lease: the watchdog keeps renewing it
+    await asyncio.sleep(0.5)
+    assert queue._lease_left(await _job(job_id)) > 0
+    delay = await run_job(job_id)  # a broker redelivery, or another process's startup recovery
+    assert delay is not None and delay > 0
+    await jobs.drain()
+
+    job = await _job(job_id)
+    assert (job.status, job.attempts) == (SUCCEEDED, 1)
+    assert calls == ["long"]
+
+
+async def test_concurrent_deliveries_claim_the_attempt_once():
+    job_id = await jobs.enqueue("test.slow", args=["claim", 0.0])
+    await asyncio.gather(run_job(job_id), run_job(job_id))
+    await jobs.drain()
+    assert calls == ["claim"]
+    assert (await _job(job_id)).attempts == 1
+
+
+async def test_restart_waits_for_a_live_lease_before_recovering():
+    job_id = await _interrupted_job("leased", attempts=1, lease_s=0.3)
+    await jobs.start()
+    await asyncio.sleep(0.1)
+    assert calls == []  # another process may still be running it
+
+    await asyncio.wait_for(jobs.drain(), 5)
+    job = await _job(job_id)
+    assert (job.status, job.attempts) == (SUCCEEDED, 2)
+    assert calls == ["leased"]
+
+
+async def test_restart_fails_an_interrupted_job_out_of_attempts():
+    retried = await _interrupted_job("retried", attempts=1, lease_s=-1)
+    exhausted = await _interrupted_job("exhausted", attempts=2, lease_s=-1)
+    await jobs.start()
+    await jobs.drain()
+
+    assert (await _job(retried)).status == SUCCEEDED
+    job = await _job(exhausted)
+    assert (job.status, job.error) == (FAILED, "Interrupted")
+    assert calls == ["retried"]
@@ -0,0 +1,48 @@
+import pytest
+
+from app.services.llm.cache import cache_key, response_cache
+from app.services.llm.client import LLMClient
+
+MESSAGES = [{"role": "user", "content": "Summarize Q1 pipeline"}]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    response_cache.clear()
+    yield
+    response_cache.clear()
+
+
+def _client(monkeypatch, responses: list[str]) -> tuple[LLMClient, list]:
+    client = LLMClient(provider="local", agent_id="cache_test", cache=True)
+    calls = []
+
+    async def dispatch(*args):
+        calls.append(args)
+        return responses[min(len(calls), len(responses)) - 1]
+
+    monkeypatch.setattr(client, "_dispatch", dispatch)
+    return client, calls
+
+
+def test_max_tokens_is_part_of_the_key():
+    short = cache_key("openai", "gpt-4o", "sys", MESSAGES, 0.0, max_tokens=64)
+    long = cache_key("openai", "gpt-4o", "sys", MESSAGES, 0.0, max_tokens=4096)
+    assert short != long
+
+
+async def test_responses_cut_short_by_max_tokens_are_not_served_to_larger_requests(monkeypatch):
+    client, calls = _client(monkeypatch, ["truncated", "full answer"])
+    assert await client.chat(MESSAGES, max_tokens=8) == "truncated"
+    assert await client.chat(MESSAGES, max_tokens=8) == "truncated"
+    assert await client.chat(MESSAGES, max_tokens=2048) == "full answer"
+    assert len(calls) == 2
+
+
+async def test_unparseable_json_is_not_cached(monkeypatch):
+    client, calls = _client(monkeypatch, ['{"summary": "cut', '{"summary": "ok"}'])
+    first = await client.json_chat(MESSAGES, system_prompt="sys")
+    assert first["error"] == "JSON parsing failed"
+    assert await client.json_chat(MESSAGES, system_prompt="sys") == {"summary": "ok"}
+    assert await client.json_chat(MESSAGES, system_prompt="sys") == {"summary": "ok"}
+    assert len(calls) == 2
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.llm.limiter import LLMLimiter
+
+LIMITS = {"default": {"rpm": 600, "tpm": 1_000_000, "concurrency": 8}}
+
+
+async def test_each_process_admits_its_share_of_the_budget(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_RATE_LIMITS", LIMITS)
+    monkeypatch.setattr(settings, "LLM_PROCESS_COUNT", 4)
+    limiter = LLMLimiter()
+
+    async def call():
+        async with limiter.slot("openai", tokens=10) as slot:
+            slot.completed(10)
+
+    # 600 rpm over 4 processes: a burst of 150, then one request every 0.4s
+    await asyncio.gather(*(call() for _ in range(150)))
+    late = asyncio.create_task(call())
+    await asyncio.sleep(0.1)
+    assert not late.done()
+    late.cancel()
+
+    metrics = limiter.metrics()
+    assert metrics["process_count"] == 4
+    assert metrics["providers"]["openai"]["max_concurrency"] == 2
+
+
+async def test_a_single_process_gets_the_whole_budget(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_RATE_LIMITS", LIMITS)
+    monkeypatch.setattr(settings, "LLM_PROCESS_COUNT", 1)
+    limiter = LLMLimiter()
+    async with limiter.slot("openai", tokens=10) as slot:
+        slot.completed(10)
+    provider = limiter.metrics()["providers"]["openai"]
+    assert provider["max_concurrency"] == 8
+    assert 599 <= provider["requests_available"] < 600
+
+
+class _RateLimited(Exception):
+    status_code = 429
+
+
+async def test_429s_are_retried_once_per_attempt_without_holding_a_slot(monkeypatch):
+    from app.services.llm import client as client_module
+    from app.services.llm.client import LLMClient
+
+    monkeypatch.setattr(settings, "LLM_RATE_LIMITS", LIMITS)
+    monkeypatch.setattr(settings, "LLM_RATE_LIMIT_BACKOFF_S", 0.01)
+    monkeypatch.setattr(settings, "LLM_FAILOVER", False)
+    monkeypatch.setattr(settings, "LLM_HEDGE", False)
+    limiter = LLMLimiter()
+    monkeypatch.setattr(client_module, "llm_limiter", limiter)
+    in_flight = []
+
+    async def call(self, *args):
+        in_flight.append(limiter.in_flight)
+        raise _RateLimited("slow down")
+
+    monkeypatch.setattr(LLMClient, "_call", call)
+    client = LLMClient(provider="openai", model="gpt-4o", cache=False)
+    with pytest.raises(_RateLimited):
+        await client.chat([{"role": "user", "content": "hi"}])
+    assert in_flight == [1] * settings.LLM_RETRY_ATTEMPTS
+    assert limiter.metrics()["providers"]["openai"]["throttled"] == settings.LLM_RETRY_ATTEMPTS
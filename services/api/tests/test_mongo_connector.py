@@ -0,0 +1,124 @@
+from datetime import datetime, timezone
+from itertools import islice
+
+import pytest
+from bson import ObjectId
+from mongomock_motor import AsyncCursor, AsyncMongoMockClient
+
+from app.core.config import settings
+from app.services.connectors.mongo_connector import MongoConnector
+from app.services.snapshots.store import SnapshotReader
+
+CONFIG = {"connection_string": "mongodb://stub", "database": "crm", "collection": "customers"}
+
+
+@pytest.fixture(autouse=True)
+def staging(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STAGING_DIR", str(tmp_path))
+
+
+@pytest.fixture
+def mongo(db, monkeypatch):
+    # `db` because the semantic-layer projection lookup reads SyncRun rows
+    async def to_list(self, length=None):
+        # mongomock-motor drains the cursor whatever `length` is; Motor returns one batch per call
+        return list(islice(self._AsyncCursor__cursor, length))
+
+    monkeypatch.setattr(AsyncCursor, "to_list", to_list)
+    return AsyncMongoMockClient()
+
+
+def _connector(mongo) -> MongoConnector:
+    return MongoConnector(client_factory=lambda _: mongo)
+
+
+def _customer(i: int, **extra) -> dict:
+    return {
+        "_id": ObjectId(f"{i:024x}"),
+        "name": f"Customer {i}",
+        "address": {"city": "Lisbon", "geo": {"lat": 38.7, "lng": -9.1}},
+        "tags": ["b2b", f"tier{i % 3}"],
+        "signed_up": datetime(2024, 1, i + 1, tzinfo=timezone.utc),
+        **extra,
+    }
+
+
+async def _sync(mongo, run_id: str, **kwargs) -> dict:
+    config = {**CONFIG, **kwargs.pop("config", {})}
+    kwargs.setdefault("incremental", False)
+    return await _connector(mongo).sync(config, None, run_id=run_id, **kwargs)
+
+
+def _read(result: dict):
+    return SnapshotReader(result["snapshots"][0]["storage_path"]).read()
+
+
+async def test_nested_documents_flatten_to_dotted_columns(mongo, monkeypatch):
+    monkeypatch.setattr(settings, "MONGO_FLATTEN_MAX_DEPTH", 1)
+    await mongo.crm.customers.insert_many([_customer(i) for i in range(3)])
+    result = await _sync(mongo, "run-1")
+
+    df = _read(result)
+    assert {"name", "address.city", "address.geo", "tags", "signed_up"} <= set(df.columns)
+    row = df.set_index("_id").loc[str(ObjectId(f"{1:024x}"))]
+    assert row["address.city"] == "Lisbon"
+    assert row["address.geo"] == '{"lat": 38.7, "lng": -9.1}'  # deeper than max_depth: JSON text
+    assert row["tags"] == '["b2b", "tier1"]'
+    assert str(df["signed_up"].dtype).startswith("datetime64")
+
+
+async def test_projection_is_pushed_down(mongo, monkeypatch):
+    await mongo.crm.customers.insert_many([_customer(i) for i in range(3)])
+    coll = mongo.crm.customers
+    finds = []
+    original = type(coll).find
+
+    def find(self, *args, **kwargs):
+        finds.append(dict(args[1]))
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(coll), "find", find)
+    result = await _sync(mongo, "run-1", config={"projection": ["name", "address.city"]})
+
+    assert finds == [{"name": 1, "address.city": 1}]
+    assert set(_read(result).columns) == {"_id", "name", "address.city"}
+
+
+async def test_incremental_sync_resumes_after_the_last_id(mongo):
+    await mongo.crm.customers.insert_many([_customer(i) for i in range(3)])
+    first = await _sync(mongo, "run-1")
+    watermark = first["watermarks"]["customers"]
+    assert watermark["last_id"] == {"type": "objectid", "value": str(ObjectId(f"{2:024x}"))}
+
+    await mongo.crm.customers.insert_many([_customer(i) for i in range(3, 5)])
+    second = await _sync(mongo, "run-2", incremental=True, watermarks=first["watermarks"])
+
+    assert second["rows_read"] == 2
+    assert second["incremental"] is True
+    assert second["snapshots"][0]["row_count"] == 5
+    assert sorted(_read(second)["name"]) == [f"Customer {i}" for i in range(5)]
+    assert second["watermarks"]["customers"]["last_id"]["value"] == str(ObjectId(f"{4:024x}"))
+
+    third = await _sync(mongo, "run-3", incremental=True, watermarks=second["watermarks"])
+    assert third["rows_read"] == 0
+    last_id = second["watermarks"]["customers"]["last_id"]
+    assert third["watermarks"]["customers"]["last_id"] == last_id
+
+
+async def test_field_types_stay_fixed_across_batches(mongo):
+    docs = [
+        _customer(0, amount=120, code="A1"),
+        _customer(1, amount=75.5, code="B2"),
+        _customer(2, amount="n/a", code=7),
+        _customer(3, amount=None, code=8),
+    ]
+    await mongo.crm.customers.insert_many(docs)
+    result = await _sync(mongo, "run-1", config={"batch_size": 2})
+
+    columns = result["snapshots"][0]["schema_json"]["columns"]
+    assert columns["amount"] == "double"
+    assert columns["code"] == "string"
+    df = _read(result).sort_values("name")
+    assert df["amount"].tolist()[:2] == [120.0, 75.5]
+    assert df["amount"].isna().tolist()[2:] == [True, True]
+    assert df["code"].tolist() == ["A1", "B2", "7", "8"]
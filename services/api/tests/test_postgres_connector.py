@@ -0,0 +1,71 @@
+import ipaddress
+import uuid
+
+import pandas as pd
+import pytest
+
+from app.core.config import settings
+from app.services.connectors.postgres_connector import COPY_NULL, PostgresConnector, _TableState
+from app.services.snapshots.store import SnapshotReader, SnapshotWriter
+
+TYPES = {"id": "int4", "account_id": "uuid", "client_ip": "inet", "payload": "bytea"}
+ACCOUNT = uuid.UUID("3f2b8c1e-9a4d-4e2f-8b7a-1c5d6e7f8a90")
+
+
+@pytest.fixture(autouse=True)
+def staging(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STAGING_DIR", str(tmp_path))
+
+
+def _state(table: str) -> _TableState:
+    return _TableState(SnapshotWriter("run-1", table), TYPES, cursor_column=None, key="id")
+
+
+def _copy_read(state: _TableState, tmp_path):
+    """What COPY ... (FORMAT csv) writes for the same rows: every value as text."""
+    path = tmp_path / "spool.csv"
+    path.write_text(
+        "id,account_id,client_ip,payload\n"
+        f"1,{ACCOUNT},10.0.0.1,\\x00ff\n"
+        f"2,{COPY_NULL},192.168.1.0/24,{COPY_NULL}\n"
+    )
+    PostgresConnector()._ingest_csv(str(path), 1000, state)
+
+
+def _cursor_read(state: _TableState):
+    """What asyncpg returns for the same rows: Python objects for uuid, inet and bytea."""
+    records = [
+        (3, ACCOUNT, ipaddress.IPv4Address("10.0.0.1"), b"\x00\xff"),
+        (4, None, ipaddress.IPv4Interface("192.168.1.0/24"), None),
+    ]
+    state.add(pd.DataFrame.from_records(records, columns=list(TYPES)))
+
+
+def test_cursor_values_match_copy_text(tmp_path):
+    copy, cursor = _state("copy"), _state("cursor")
+    _copy_read(copy, tmp_path)
+    _cursor_read(cursor)
+
+    copy_meta, cursor_meta = copy.writer.finalize(), cursor.writer.finalize()
+    assert cursor_meta["schema_json"]["columns"] == copy_meta["schema_json"]["columns"]
+    assert cursor_meta["schema_json"]["columns"]["account_id"] == "string"
+
+    copied = SnapshotReader(copy_meta["storage_path"]).read().drop(columns="id")
+    fetched = SnapshotReader(cursor_meta["storage_path"]).read().drop(columns="id")
+    pd.testing.assert_frame_equal(fetched, copied)
+
+
+def test_copy_and_cursor_partitions_share_one_snapshot(tmp_path):
+    # A partitioned read COPYs the key ranges and reads the NULL-key rows with a cursor
+    state = _state("orders")
+    _copy_read(state, tmp_path)
+    _cursor_read(state)
+
+    meta = state.writer.finalize()
+    df = SnapshotReader(meta["storage_path"]).read()
+    assert meta["row_count"] == 4
+    assert meta["schema_json"]["columns"]["client_ip"] == "string"
+    assert df.set_index("id")["client_ip"].to_dict() == {
+        1: "10.0.0.1", 2: "192.168.1.0/24", 3: "10.0.0.1", 4: "192.168.1.0/24",
+    }
+    assert df.set_index("id")["account_id"].to_dict()[3] == str(ACCOUNT)
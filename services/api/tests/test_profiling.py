@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from app.services.profiling.incremental import IncrementalProfiler, merge_reports
+from app.services.profiling.profiler import profile_frame
+
+
+def _frame(rows: int = 1_000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "amount": rng.normal(100, 15, rows),
+        "seats": rng.integers(1, 50, rows),
+        "empty": np.full(rows, np.nan),
+        "plan": rng.choice(["free", "pro", "team"], rows),
+        "tier": pd.Categorical(rng.choice(["a", "b"], rows)),
+        "churned": rng.random(rows) < 0.2,
+        "signed_up": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), "D"),
+    })
+
+
+def _streamed(df: pd.DataFrame, chunk_rows: int = 300) -> dict:
+    profiler = IncrementalProfiler()
+    for start in range(0, len(df), chunk_rows):
+        profiler.update(df.iloc[start:start + chunk_rows])
+    return profiler.report()
+
+
+def _fields(columns: dict) -> dict:
+    # Merged reports flag distinct counts that came from a HyperLogLog; that's about
+    # precision, not shape
+    return {col: set(p) - {"unique_count_approx"} for col, p in columns.items()}
+
+
+def test_streamed_profile_has_the_same_fields_as_profile_frame():
+    df = _frame()
+    whole = profile_frame(df)["columns"]
+    streamed = _streamed(df)["columns"]
+    assert {c: set(p) for c, p in streamed.items()} == {c: set(p) for c, p in whole.items()}
+    assert streamed["churned"]["true_pct"] == whole["churned"]["true_pct"]
+    assert streamed["signed_up"]["min"] == whole["signed_up"]["min"]
+    assert streamed["signed_up"]["max"] == whole["signed_up"]["max"]
+
+
+def test_merged_reports_keep_bool_and_datetime_fields():
+    df = _frame()
+    base, update = profile_frame(df.iloc[:600]), _streamed(df.iloc[600:])
+    merged = merge_reports(base, update)["columns"]
+    whole = profile_frame(df)["columns"]
+    assert _fields(merged) == _fields(whole)
+    assert merged["churned"]["true_pct"] == whole["churned"]["true_pct"]
+    assert merged["signed_up"]["min"] == whole["signed_up"]["min"]
+    assert merged["signed_up"]["max"] == whole["signed_up"]["max"]
@@ -0,0 +1,200 @@
+import asyncio
+import csv
+import io
+import json
+import re
+from urllib.parse import unquote
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.connectors.salesforce_connector import SALESFORCE_OBJECTS, SalesforceConnector
+from app.services.snapshots.store import SnapshotReader
+
+CONFIG = {"instance_url": "https://stub.my.salesforce.com", "access_token": "token"}
+API = "/services/data/v59.0"
+FIELDS = {"Id": "id", "Name": "string", "Amount": "currency", "SystemModstamp": "datetime"}
+
+
+def _records(obj: str, n: int) -> list[dict]:
+    return [
+        {"Id": f"{obj[:3]}{i:05d}", "Name": f"{obj} {i}", "Amount": 100.0 * i,
+         "SystemModstamp": f"2024-03-{i + 1:02d}T10:00:00.000+0000"}
+        for i in range(n)
+    ]
+
+
+class StubOrg:
+    """Just enough of the REST query, describe and Bulk API 2.0 query endpoints."""
+
+    def __init__(self, sizes: dict[str, int], page_size: int = 2):
+        self.data = {obj: _records(obj, sizes.get(obj, 0)) for obj in SALESFORCE_OBJECTS}
+        self.page_size = page_size
+        self.requests: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.jobs: dict[str, dict] = {}
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.005)
+            assert request.headers["Authorization"] == "Bearer token"
+            query = unquote(request.url.query.decode())
+            self.requests.append(f"{request.method} {request.url.path}?{query}")
+            return self.route(request)
+        finally:
+            self.in_flight -= 1
+
+    def route(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path[len(API):]
+        if path == "/query":
+            soql = request.url.params["q"]
+            obj = re.search(r"FROM (\w+)", soql).group(1)
+            if "COUNT()" in soql:
+                body = {"totalSize": len(self.data[obj]), "done": True, "records": []}
+                return httpx.Response(200, json=body)
+            limit = re.search(r"LIMIT (\d+)", soql)
+            records = self.data[obj][: int(limit.group(1))] if limit else self.data[obj]
+            return self._page(obj, records, 0)
+        if match := re.fullmatch(r"/query/(\w+)-(\d+)", path):
+            obj, offset = match.groups()
+            return self._page(obj, self.data[obj], int(offset))
+        if match := re.fullmatch(r"/sobjects/(\w+)/describe", path):
+            fields = [{"name": k, "type": v} for k, v in FIELDS.items()]
+            fields.append({"name": "BillingAddress", "type": "address"})
+            return httpx.Response(200, json={"name": match.group(1), "fields": fields})
+        if path == "/jobs/query" and request.method == "POST":
+            soql = json.loads(request.content)["query"]
+            obj = re.search(r"FROM (\w+)", soql).group(1)
+            assert "BillingAddress" not in soql
+            job_id = f"750{obj}"
+            self.jobs[job_id] = {"obj": obj, "polls": 0}
+            return httpx.Response(200, json={"id": job_id, "state": "UploadComplete"})
+        if match := re.fullmatch(r"/jobs/query/(\w+)", path):
+            job = self.jobs[match.group(1)]
+            job["polls"] += 1
+            state = "JobComplete" if job["polls"] > 1 else "InProgress"
+            return httpx.Response(200, json={"id": match.group(1), "state": state})
+        if match := re.fullmatch(r"/jobs/query/(\w+)/results", path):
+            return self._bulk_page(self.jobs[match.group(1)]["obj"], request.url.params)
+        return httpx.Response(404, json=[{"errorCode": "NOT_FOUND", "message": path}])
+
+    def _page(self, obj: str, records: list[dict], offset: int) -> httpx.Response:
+        chunk = records[offset:offset + self.page_size]
+        body = {
+            "totalSize": len(records),
+            "done": offset + self.page_size >= len(records),
+            "records": [{"attributes": {"type": obj}, **r} for r in chunk],
+        }
+        if not body["done"]:
+            body["nextRecordsUrl"] = f"{API}/query/{obj}-{offset + self.page_size}"
+        return httpx.Response(200, json=body)
+
+    def _bulk_page(self, obj: str, params: httpx.QueryParams) -> httpx.Response:
+        offset = int(params.get("locator", 0))
+        size = int(params["maxRecords"])
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=list(FIELDS))
+        writer.writeheader()
+        for r in self.data[obj][offset:offset + size]:
+            writer.writerow({**r, "SystemModstamp": r["SystemModstamp"].replace("+0000", "Z")})
+        more = offset + size < len(self.data[obj])
+        return httpx.Response(
+            200, content=out.getvalue().encode(),
+            headers={
+                "Content-Type": "text/csv",
+                "Sforce-Locator": str(offset + size) if more else "null",
+            },
+        )
+
+
+@pytest.fixture(autouse=True)
+def sf_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STAGING_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "SALESFORCE_BULK_THRESHOLD", 6)
+    monkeypatch.setattr(settings, "SALESFORCE_BATCH_ROWS", 3)
+    monkeypatch.setattr(settings, "SALESFORCE_BULK_POLL_S", 0)
+    monkeypatch.setattr(settings, "SALESFORCE_MAX_CONCURRENCY", 2)
+
+
+async def _sync(org: StubOrg, **kwargs) -> dict:
+    connector = SalesforceConnector(transport=org.transport())
+    return await connector.sync(CONFIG, None, run_id="run-1", **kwargs)
+
+
+async def test_count_picks_rest_or_bulk_per_object():
+    org = StubOrg({"Account": 5, "Opportunity": 7})
+    result = await _sync(org, incremental=False)
+
+    counts = [r for r in org.requests if "COUNT" in r]
+    assert len(counts) == len(SALESFORCE_OBJECTS)
+    extraction = result["profile_report"]["extraction"]
+    assert extraction["account"] == "rest"
+    assert extraction["opportunity"] == "bulk"
+    assert result["profile_report"]["row_counts"]["account"] == 5
+    assert result["rows_read"] == 12
+
+
+async def test_rest_query_follows_next_records_url():
+    org = StubOrg({"Account": 5}, page_size=2)
+    result = await _sync(org, incremental=False)
+
+    pages = [r for r in org.requests if "/query/Account-" in r]
+    assert [p.split("?")[0] for p in pages] == [
+        f"GET {API}/query/Account-2", f"GET {API}/query/Account-4",
+    ]
+    snapshot = next(s for s in result["snapshots"] if s["table_name"] == "sf_account")
+    df = SnapshotReader(snapshot["storage_path"]).read()
+    assert sorted(df["Id"]) == [f"Acc{i:05d}" for i in range(5)]
+    assert "attributes" not in df.columns
+    assert result["watermarks"]["sf_account"]["SystemModstamp"] == "2024-03-05T10:00:00.000+0000"
+
+
+async def test_bulk_job_reads_every_locator_page():
+    org = StubOrg({"Opportunity": 7})
+    result = await _sync(org, incremental=False)
+
+    results = f"GET {API}/jobs/query/750Opportunity/results"
+    pages = [r for r in org.requests if r.startswith(results)]
+    assert len(pages) == 3  # 3 + 3 + 1 rows at maxRecords=3
+    assert "locator=3" in pages[1] and "locator=6" in pages[2]
+    snapshot = next(s for s in result["snapshots"] if s["table_name"] == "sf_opportunity")
+    df = SnapshotReader(snapshot["storage_path"]).read()
+    assert len(df) == 7
+    assert df["Amount"].dtype == "float64"
+
+
+async def test_incremental_sync_filters_on_the_watermark():
+    org = StubOrg({"Account": 3})
+    first = await _sync(org, incremental=False)
+    org.requests.clear()
+    await _sync(org, incremental=True, watermarks=first["watermarks"])
+    count = next(r for r in org.requests if "COUNT" in r and "Account" in r)
+    assert "WHERE SystemModstamp >= 2024-03-03T10:00:00Z" in count
+
+
+async def test_objects_are_extracted_concurrently_within_the_bound():
+    org = StubOrg({obj: 4 for obj in SALESFORCE_OBJECTS})
+    await _sync(org, incremental=False)
+    assert org.max_in_flight == settings.SALESFORCE_MAX_CONCURRENCY
+
+
+async def test_sample_pages_up_to_the_limit():
+    org = StubOrg({"Account": 9}, page_size=2)
+    df = await SalesforceConnector(transport=org.transport()).sample(CONFIG, None, limit=5)
+    assert len(df) == 5
+    assert org.requests[0].endswith("LIMIT 5")
+    assert len(org.requests) == 3
+
+
+async def test_sample_endpoint_bounds_the_limit(client):
+    response = await client.get(
+        "/api/v1/connectors/missing/sample", params={"limit": settings.SAMPLE_MAX_ROWS + 1},
+    )
+    assert response.status_code == 422
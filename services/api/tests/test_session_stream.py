@@ -0,0 +1,72 @@
+import asyncio
+import uuid
+
+from app.core.config import settings
+from app.db.models import AutonomyLevel, SessionStatus, VDSSession
+from app.services.orchestration.event_bus import event_bus, session_channel
+from app.services.orchestration.supervisor import SupervisorAgent
+
+
+async def _published(partials: list, step_id: str = "narrate") -> list[dict]:
+    supervisor = SupervisorAgent(
+        str(uuid.uuid4()), "Why did churn rise?", "generic", AutonomyLevel.assist, [],
+    )
+    publish = supervisor._partial_publisher(step_id)
+    async with event_bus.subscribe(session_channel(supervisor.session_id)) as sub:
+        for partial in partials:
+            await publish(partial)
+        return [sub.queue.get_nowait()["delta"] for _ in range(sub.queue.qsize())]
+
+
+async def test_stream_ends_when_overflow_dropped_the_final_status(db, client, monkeypatch):
+    monkeypatch.setattr(event_bus, "queue_size", 2)
+    session_id = str(uuid.uuid4())
+    async with db() as s:
+        s.add(VDSSession(id=session_id, tenant_id="default", status=SessionStatus.executing))
+        await s.commit()
+
+    stream = asyncio.create_task(client.get(f"/api/v1/sessions/{session_id}/stream"))
+    while event_bus.subscriber_count(session_channel(session_id)) == 0:
+        await asyncio.sleep(0.01)
+    # Once this is consumed the stream is past its catch-up read and following live events
+    (sub,) = event_bus._subscribers[session_channel(session_id)]
+    channel = session_channel(session_id)
+    partial = {"type": "partial", "agent": "eda"}
+    await event_bus.publish(channel, {**partial, "delta": {"append": "start"}})
+    while not sub.queue.empty():
+        await asyncio.sleep(0.01)
+
+    async with db() as s:
+        (await s.get(VDSSession, session_id)).status = SessionStatus.done
+        await s.commit()
+    # In-process publishing doesn't yield, so the burst overflows the queue and the status
+    # is dropped
+    for i in range(5):
+        await event_bus.publish(channel, {**partial, "delta": {"append": str(i)}})
+    await event_bus.publish(channel, {"type": "status", "status": "done"})
+
+    response = await asyncio.wait_for(stream, timeout=5)
+    assert response.text.rstrip().endswith('{"event": "done", "status": "done"}')
+
+
+async def test_partials_are_published_as_deltas():
+    text = await _published(["Churn", "Churn rose 4%", "Churn rose 4%"])
+    assert text == [{"replace": "Churn"}, {"append": " rose 4%"}]
+
+    obj = await _published([
+        {"summary": "Churn"},
+        {"summary": "Churn rose", "findings": ["SMB"]},
+        {"summary": "Churn rose", "findings": ["SMB", "EMEA"]},
+    ])
+    assert obj == [
+        {"replace": {"summary": "Churn"}},
+        {"append": {"summary": " rose"}, "set": {"findings": ["SMB"]}},
+        {"set": {"findings": ["SMB", "EMEA"]}},
+    ]
+
+
+async def test_partials_stop_at_the_per_step_cap(monkeypatch):
+    monkeypatch.setattr(settings, "SSE_PARTIAL_MAX_CHARS", 100)
+    deltas = await _published(["x" * n for n in range(20, 400, 20)])
+    assert sum(len(d.get("append", d.get("replace", ""))) for d in deltas) <= 100
+    assert deltas[0] == {"replace": "x" * 20}
@@ -0,0 +1,122 @@
+import os
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from sqlalchemy import select
+
+from app.api.v1.connectors import execute_sync
+from app.core.config import settings
+from app.db.models import ConnectorType, DataConnector, DataSnapshot, SyncRun
+from app.services.connectors.registry import ConnectorRegistry
+from app.services.snapshots.store import SnapshotReader, SnapshotWriter, run_dir
+
+
+@pytest.fixture(autouse=True)
+def staging(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STAGING_DIR", str(tmp_path))
+
+
+def test_column_that_turns_textual_becomes_string():
+    writer = SnapshotWriter("run-1", "accounts")
+    writer.write(pd.DataFrame({"id": [1, 2], "code": [10, 20]}))
+    writer.write(pd.DataFrame({"id": [3, 4], "code": ["A-30", "B-40"]}))
+    writer.write(pd.DataFrame({"id": [5], "code": [50]}))
+    meta = writer.finalize()
+
+    assert meta["schema_json"]["columns"] == {"id": "int64", "code": "string"}
+    df = SnapshotReader(meta["storage_path"]).read()
+    assert df["code"].tolist() == ["10", "20", "A-30", "B-40", "50"]
+    assert meta["row_count"] == 5
+
+
+def test_numeric_columns_widen_and_nulls_take_the_later_type():
+    writer = SnapshotWriter("run-1", "orders")
+    writer.write(pd.DataFrame({"qty": [1, 2], "note": [None, None]}))
+    writer.write(pd.DataFrame({"qty": [2.5], "note": ["late"], "region": ["EU"]}))
+    meta = writer.finalize()
+
+    assert meta["schema_json"]["columns"] == {"qty": "double", "note": "string", "region": "string"}
+    df = SnapshotReader(meta["storage_path"]).read()
+    assert df["qty"].tolist() == [1.0, 2.0, 2.5]
+    assert df["region"].tolist()[-1] == "EU"
+
+
+def test_declared_schema_is_kept():
+    schema = pa.schema([("id", pa.int64()), ("amount", pa.float64())])
+    writer = SnapshotWriter("run-1", "deals", schema=schema)
+    writer.write(pd.DataFrame({"id": [1], "amount": [100]}))
+    meta = writer.finalize()
+    assert meta["schema_json"]["columns"] == {"id": "int64", "amount": "double"}
+
+
+def test_carried_parts_with_a_conflicting_type():
+    first = SnapshotWriter("run-1", "accounts")
+    first.write(pd.DataFrame({"id": [1, 2], "zip": [94107, 10001]}))
+    previous = first.finalize()
+
+    second = SnapshotWriter("run-2", "accounts")
+    second.carry_forward(previous["storage_path"])
+    second.write(pd.DataFrame({"id": [3], "zip": ["SW1A 1AA"]}))
+    meta = second.finalize()
+
+    assert meta["schema_json"]["columns"]["zip"] == "string"
+    df = SnapshotReader(meta["storage_path"]).read().sort_values("id")
+    assert df["zip"].tolist() == ["94107", "10001", "SW1A 1AA"]
+
+
+class _WritingConnector:
+    """Writes one snapshot per sync; fails after writing when `fail` is set."""
+
+    fail = False
+
+    async def sync(self, config, secret_ref, incremental, run_id, watermarks):
+        writer = SnapshotWriter(run_id, "accounts")
+        writer.write(pd.DataFrame({"id": [1, 2]}))
+        if self.fail:
+            raise RuntimeError("source went away")
+        return {"rows_read": 2, "snapshots": [writer.finalize()]}
+
+
+async def _synced_connector(db, monkeypatch) -> str:
+    monkeypatch.setattr(ConnectorRegistry, "get", classmethod(lambda cls, t: _WritingConnector()))
+    connector_id = str(uuid.uuid4())
+    async with db() as s:
+        s.add(DataConnector(
+            id=connector_id, tenant_id="default", name="crm", connector_type=ConnectorType.csv,
+        ))
+        await s.commit()
+    return connector_id
+
+
+async def _sync(db, connector_id: str) -> SyncRun:
+    run_id = str(uuid.uuid4())
+    async with db() as s:
+        s.add(SyncRun(id=run_id, connector_id=connector_id))
+        await s.commit()
+    await execute_sync(connector_id, run_id, incremental=False)
+    async with db() as s:
+        return await s.get(SyncRun, run_id)
+
+
+async def test_failed_sync_leaves_no_snapshot_files(db, monkeypatch):
+    connector_id = await _synced_connector(db, monkeypatch)
+    monkeypatch.setattr(_WritingConnector, "fail", True)
+    run = await _sync(db, connector_id)
+    assert run.status == "failed"
+    assert not os.path.exists(run_dir(run.id))
+
+
+async def test_successful_syncs_keep_the_newest_snapshots(db, monkeypatch):
+    monkeypatch.setattr(settings, "SNAPSHOT_RETENTION", 2)
+    connector_id = await _synced_connector(db, monkeypatch)
+    runs = [await _sync(db, connector_id) for _ in range(3)]
+
+    async with db() as s:
+        kept = (await s.execute(
+            select(DataSnapshot.storage_path).where(DataSnapshot.connector_id == connector_id)
+        )).scalars().all()
+    assert sorted(kept) == sorted(os.path.join(run_dir(r.id), "accounts") for r in runs[1:])
+    assert not os.path.exists(run_dir(runs[0].id))
+    assert all(os.path.isdir(path) for path in kept)
@@ -0,0 +1,90 @@
+import asyncio
+import uuid
+
+from sqlalchemy import func, select
+
+from app.db.models import AutonomyLevel, Job, SessionMessage, SessionStatus, VDSSession
+from app.services.jobs.queue import CANCELLED, jobs
+from app.services.orchestration import supervisor as supervisor_module
+from app.services.orchestration.event_bus import event_bus, session_channel
+from app.services.orchestration.supervisor import SupervisorAgent
+
+
+class _Agent:
+    started: list = []
+    delay = 0.0
+
+    def __init__(self, **kwargs):
+        pass
+
+    async def run(self, question: str) -> dict:
+        type(self).started.append(self)
+        await asyncio.sleep(self.delay)
+        return {"summary": "ok"}
+
+
+class _SlowAgent(_Agent):
+    delay = 0.5
+
+
+async def test_cancelling_the_run_cancels_its_steps(db, monkeypatch):
+    monkeypatch.setattr(supervisor_module, "STEP_AGENTS", [
+        ("frame", "Problem Framer", _Agent, ()),
+        ("quality", "Data Quality", _SlowAgent, ("frame",)),
+        ("eda", "EDA & Hypothesis", _SlowAgent, ("frame",)),
+    ])
+    monkeypatch.setattr(_SlowAgent, "started", [])
+    session_id = str(uuid.uuid4())
+    async with db() as s:
+        s.add(VDSSession(id=session_id, tenant_id="default", status=SessionStatus.created))
+        await s.commit()
+
+    supervisor = SupervisorAgent(
+        session_id, "Why did churn rise?", "generic", AutonomyLevel.autonomous, [],
+    )
+    run = asyncio.create_task(supervisor.run())
+    while len(_SlowAgent.started) < 2:
+        await asyncio.sleep(0.01)
+    run.cancel()
+    await asyncio.gather(run, return_exceptions=True)
+    assert run.cancelled()
+
+    async def message_count() -> int:
+        async with db() as s:
+            return await s.scalar(
+                select(func.count()).select_from(SessionMessage)
+                .where(SessionMessage.session_id == session_id)
+            )
+
+    posted = await message_count()
+    await asyncio.sleep(_SlowAgent.delay + 0.2)
+    assert await message_count() == posted
+
+
+async def test_cancelled_pipeline_job_ends_the_session(db, client, monkeypatch):
+    monkeypatch.setattr(supervisor_module, "STEP_AGENTS", [
+        ("frame", "Problem Framer", _SlowAgent, ()),
+    ])
+    monkeypatch.setattr(jobs, "backend", "memory")
+    monkeypatch.setattr(_SlowAgent, "started", [])
+    try:
+        response = await client.post("/api/v1/sessions/", json={
+            "question": "Why did churn rise?", "autonomy_level": "autonomous",
+        })
+        session = response.json()
+        async with db() as s:
+            job_id = (await s.get(VDSSession, session["id"])).context["job_id"]
+
+        async with event_bus.subscribe(session_channel(session["id"])) as sub:
+            while not _SlowAgent.started:
+                await asyncio.sleep(0.01)
+            await jobs.cancel(job_id)
+            await jobs.drain()
+            events = [sub.queue.get_nowait() for _ in range(sub.queue.qsize())]
+
+        async with db() as s:
+            assert (await s.get(Job, job_id)).status == CANCELLED
+            assert (await s.get(VDSSession, session["id"])).status == SessionStatus.failed
+        assert events[-1] == {"type": "status", "status": "failed"}
+    finally:
+        await jobs.aclose()
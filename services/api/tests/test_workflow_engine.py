@@ -0,0 +1,34 @@
+import asyncio
+import uuid
+
+from app.db.models import AgentWorkflow, WorkflowRun, WorkflowRunStatus
+from app.services.orchestration.workflow_engine import WorkflowEngine
+
+
+async def test_cancelled_run_is_closed_out(db, monkeypatch):
+    started = asyncio.Event()
+
+    async def slow_node(self, node_type, config):
+        started.set()
+        await asyncio.sleep(30)
+
+    monkeypatch.setattr(WorkflowEngine, "_execute_node", slow_node)
+    workflow_id = str(uuid.uuid4())
+    async with db() as s:
+        s.add(AgentWorkflow(
+            id=workflow_id, tenant_id="default", name="weekly digest",
+            steps=[{"id": "narrate", "type": "tool", "config": {}}],
+        ))
+        await s.commit()
+
+    engine = WorkflowEngine(workflow_id)
+    run = asyncio.create_task(engine.execute())
+    await asyncio.wait_for(started.wait(), 5)
+    run.cancel()
+    await asyncio.gather(run, return_exceptions=True)
+    assert run.cancelled()
+
+    async with db() as s:
+        record = await s.get(WorkflowRun, engine.run_id)
+    assert (record.status, record.error) == (WorkflowRunStatus.failed, "Cancelled")
+    assert record.finished_at is not None